@@ -4,14 +4,23 @@
 # Agents perform searches on puzzles
 
 from SearchNode import SearchNode
-from WrigglerMover import MoveWriggler
+from WrigglerMover import MoveBody, MoveBodySteps, GetChangedCells
 from SearchNode import State
+from State import MakeInitialState
 from PuzzleReader import ReadPuzzle
 from WrigglerReader import FindWrigglers
 from Move import Move
+from PartialOrder import GetMoveFootprint, PruneCommutedMoves
+from FrontierSearch import FrontierSearch
+from ExternalSearch import ExternalBreadthFirstSearch
+from ParallelIDAStar import ParallelIDAStar
+from SearchBudget import SearchBudget, SearchStopped
+from SearchResult import SearchResult
+from Solvability import ProveUnsolvable
 
 # Used to maintain a strict weak ordering on 
 import heapq
+from cStringIO import StringIO
 
 ## Perform a search on the puzzle.
 class Agent:
@@ -21,30 +30,57 @@ class Agent:
    def __init__(self, initialSearchNode):
       self.currentSearchNode = None
       self.frontier = [initialSearchNode]
+      self.usePartialOrder = True
+      self.useMacroMoves = False
+      self.frontierSearch = None
+      self.externalSearch = None
+      self.checkpoint = None
+      self.heuristicWeight = 1
+      self.parallelSearch = None
+      self.hooks = None
+      self.profiler = None
+      self.budget = None
+      self.activeBudget = None
+      self.depthCutoff = False
+      self.checkSolvability = True
 
    ## Perform an A* graph search for the goal node
+   # @return SearchResult of the search
    def AStarSearch(self):
+      return self.RunSearch(self.SearchAStar)
+
+   ## Run the A* graph search, see AStarSearch
+   # @return The goal SearchNode, None if there is none
+   def SearchAStar(self):
       # frontier contains the initial search node,
       # initialize an explored set as a hash table
       explored = dict() 
       # Reduce time required to check if node is already in frontier
       frontierDict = dict()
+      checkpoint = self.checkpoint
+      hooks = self.hooks
+      budget = self.activeBudget
 
       # remove the initial searchnode
       evalNode = self.frontier.pop()
       evalNode.useHeuristicAndPathCost = True
+      if checkpoint is not None:
+         evalNode = self.StartCheckpoint(evalNode, 'A*', explored, \
+                                         frontierDict)
 
       # now, while the next node is not a goal node:
-      while not evalNode.ContainsGoalState():
+      while evalNode is not None and not evalNode.ContainsGoalState():
          # generate all actions
-         nextMoves = evalNode.Actions()
+         nextMoves = self.GetSearchableMoves(evalNode)
 
          # and for each action
          for nextMove in nextMoves:
             # generate a SearchNode
             newNode = self.GenerateSearchNodeFromMove(evalNode, nextMove)
             newNode.useHeuristicAndPathCost = True
-            nodeHash = newNode.state.GetDirectPuzzleString()
+            if hooks is not None:
+               hooks.OnGenerate(newNode, evalNode)
+            nodeHash = newNode.state.GetStateKey()
             # check if it's already in the explored set
             # Note that it is not possible to generate a state that
             # appears in both the frontier and explored set due to the
@@ -53,15 +89,41 @@ class Agent:
                if not frontierDict.has_key(nodeHash):
                   # not in explored set, go ahead and add to Frontier
                   heapq.heappush(self.frontier, newNode)
-                  frontierDict[nodeHash] = True
+                  frontierDict[nodeHash] = newNode
+                  if checkpoint is not None:
+                     checkpoint.AddNode(newNode, True)
+               else:
+                  seenNode = frontierDict[nodeHash]
+                  if hooks is not None:
+                     hooks.OnDuplicate(newNode, seenNode)
+                  if self.MergeFootprints(seenNode, newNode) and \
+                        checkpoint is not None:
+                     checkpoint.ClearFootprint(seenNode)
             else:
-               seenNodeCost = explored[nodeHash]
-               if seenNodeCost > newNode.pathCost:
+               seenNode = explored[nodeHash]
+               if hooks is not None:
+                  hooks.OnDuplicate(newNode, seenNode)
+               if seenNode.pathCost > newNode.pathCost:
+                  heapq.heappush(self.frontier, newNode)
+                  if checkpoint is not None:
+                     checkpoint.AddNode(newNode, False)
+               elif seenNode.pathCost == newNode.pathCost and \
+                     self.MergeFootprints(seenNode, newNode):
+                  # expand once more, without pruning, to generate
+                  # what the first expansion pruned
+                  newNode.footprint = None
                   heapq.heappush(self.frontier, newNode)
-                  
+                  if checkpoint is not None:
+                     checkpoint.ClearFootprint(seenNode)
+                     checkpoint.AddNode(newNode, False)
 
          # add evaluated node to explored set
-         explored[evalNode.state.GetDirectPuzzleString()] = evalNode.pathCost
+         explored[evalNode.state.GetStateKey()] = evalNode
+         if checkpoint is not None:
+            checkpoint.Expanded(evalNode, self.frontier)
+         if hooks is not None:
+            hooks.OnExpand(evalNode, self.frontier)
+         budget.Expanded(evalNode)
          
          # pop the next node to be evaluated from the queue
          if len(self.frontier) > 0:
@@ -71,28 +133,158 @@ class Agent:
             evalNode = None
             break
 
+      if checkpoint is not None:
+         checkpoint.Finish()
+
       # return goal node. algorithm is complete for same reason
       # ID-DFTS is complete
       return evalNode
 
+   ## Continue a graph search from its checkpoint file, if it has one,
+   # otherwise start a new checkpoint file for it
+   # @param rootNode The root SearchNode, already taken off the frontier
+   # @param kind Name of the search
+   # @param explored Explored set of the search
+   # @param frontierDict Frontier dictionary of the search, None if unused
+   # @return The node to expand first, None if the open list is empty
+   def StartCheckpoint(self, rootNode, kind, explored, frontierDict):
+      heap = self.checkpoint.Restore(self, rootNode, kind, explored, \
+                                     frontierDict)
+      if heap is None:
+         self.checkpoint.Start(rootNode, kind)
+         return rootNode
+
+      print "Resuming after " + str(self.checkpoint.expanded) + \
+         " expansions, " + str(len(heap)) + " nodes on the open list"
+      self.frontier = heap
+      if len(self.frontier) > 0:
+         return heapq.heappop(self.frontier)
+      return None
+
+   ## Perform a frontier search (see FrontierSearch) for the goal node.
+   # Only the open list is kept, so no explored set grows; the moves are
+   # then replayed from the root to give an ordinary path of SearchNodes.
+   # Partial-order reduction and macros do not apply, and no closest node
+   # is kept when the budget runs out.
+   # @param useHeuristic True for A* order, False for breadth-first order
+   # @return SearchResult of the search
+   def FrontierSearchSolve(self, useHeuristic=True):
+      return self.RunSearch(self.SearchFrontier, useHeuristic)
+
+   ## Run the frontier search, see FrontierSearchSolve
+   # @param useHeuristic True for A* order, False for breadth-first order
+   # @return The goal SearchNode, None if there is none
+   def SearchFrontier(self, useHeuristic):
+      self.frontierSearch = FrontierSearch(self, useHeuristic, \
+                                           self.activeBudget)
+      return self.ReplayMoves(self.frontierSearch.Solve(self.frontier[0].state))
+
+   ## Perform a breadth-first search with its layers on disk (see
+   # ExternalSearch); the moves are then replayed from the root to give
+   # an ordinary path of SearchNodes.
+   # @param scratchDir (optional) Directory for the layer files
+   # @param report (optional) File object the size of each layer is
+   # written to as the search goes
+   # @return SearchResult of the search
+   def ExternalSearchSolve(self, scratchDir=None, report=None):
+      return self.RunSearch(self.SearchExternal, scratchDir, report)
+
+   ## Run the disk-backed breadth-first search, see ExternalSearchSolve
+   # @param scratchDir Directory for the layer files, None for a
+   # temporary one
+   # @param report File object layer sizes are written to, None for none
+   # @return The goal SearchNode, None if there is none
+   def SearchExternal(self, scratchDir, report):
+      self.externalSearch = ExternalBreadthFirstSearch( \
+         self.frontier[0].state, scratchDir, report=report, \
+         budget=self.activeBudget)
+      return self.ReplayMoves(self.externalSearch.Solve())
+
+   ## Replay moves from the root to give an ordinary path of SearchNodes
+   # @param codes List of packed move codes, None if there is no path
+   # @return The last SearchNode, None if codes is None
+   def ReplayMoves(self, codes):
+      if codes is None:
+         return None
+      goalNode = self.frontier[0]
+      for code in codes:
+         goalNode = self.GenerateSearchNodeFromMove(goalNode, code)
+      return goalNode
+
+   ## Run a search within the budget, if one is set. A puzzle shown to be
+   # unsolvable beforehand (see Solvability) is not searched at all.
+   # The profiler, if any, samples the search while it runs.
+   # @param search Method running the search and returning the goal
+   # SearchNode or None
+   # @param arguments Arguments of the method
+   # @return SearchResult of the search
+   def RunSearch(self, search, *arguments):
+      self.activeBudget = self.budget
+      if self.activeBudget is None:
+         # unlimited, it only counts
+         self.activeBudget = SearchBudget()
+      budget = self.activeBudget
+      budget.Start()
+      if self.checkSolvability:
+         reason = ProveUnsolvable(self.frontier[0].state)
+         if reason is not None:
+            return SearchResult(SearchResult.UNSOLVABLE, None, 0, \
+                                budget.GetElapsed(), reason)
+      if self.profiler is not None:
+         self.profiler.Start()
+      try:
+         goalNode = search(*arguments)
+      except SearchStopped as stop:
+         # graph searches stop between expansions, so the checkpoint is
+         # consistent and the search can be resumed from it
+         if self.checkpoint is not None and \
+               self.checkpoint.outFile is not None:
+            self.checkpoint.Save(self.frontier)
+         return SearchResult(stop.status, budget.bestNode, budget.expanded, \
+                             budget.GetElapsed())
+      finally:
+         if self.profiler is not None:
+            self.profiler.Stop()
+
+      if goalNode is None:
+         return SearchResult(SearchResult.UNSOLVABLE, budget.bestNode, \
+                             budget.expanded, budget.GetElapsed())
+      if self.hooks is not None:
+         self.hooks.OnGoal(goalNode)
+      return SearchResult(SearchResult.SOLVED, goalNode, budget.expanded, \
+                          budget.GetElapsed())
+
    ## Perform a greedy, best-first search for the goal node
+   # @return SearchResult of the search
    def GreedyBestFirstGraphSearch(self):
+      return self.RunSearch(self.SearchGreedyBestFirst)
+
+   ## Run the greedy, best-first search, see GreedyBestFirstGraphSearch
+   # @return The goal SearchNode, None if there is none
+   def SearchGreedyBestFirst(self):
       # frontier contains the initial search node,
       # initialize an explored set as a hash table
       explored = dict()
+      checkpoint = self.checkpoint
+      hooks = self.hooks
+      budget = self.activeBudget
 
       # remove the initial searchnode
       evalNode = self.frontier.pop()
+      if checkpoint is not None:
+         evalNode = self.StartCheckpoint(evalNode, 'GBFS', explored, None)
 
       # now, while the next node is not a goal node:
-      while not evalNode.ContainsGoalState():
+      while evalNode is not None and not evalNode.ContainsGoalState():
          # generate all actions
-         nextMoves = evalNode.Actions()
+         nextMoves = self.GetSearchableMoves(evalNode)
 
          # and for each action
          for nextMove in nextMoves:
             # generate a SearchNode
             newNode = self.GenerateSearchNodeFromMove(evalNode, nextMove)
+            if hooks is not None:
+               hooks.OnGenerate(newNode, evalNode)
             nodeHash = newNode.GetNodeHash()
             # check if it's already in the explored set
             # Note that it is not possible to generate a state that
@@ -101,50 +293,100 @@ class Agent:
             if not explored.has_key(nodeHash):
                # not in explored set, go ahead and add to Frontier
                heapq.heappush(self.frontier, newNode)
+               if checkpoint is not None:
+                  checkpoint.AddNode(newNode, False)
             else:
-               seenNodeCost = explored[nodeHash]
+               seenNode = explored[nodeHash]
+               if hooks is not None:
+                  hooks.OnDuplicate(newNode, seenNode)
+               seenNodeCost = seenNode.state.GetHeuristicCost()
                if seenNodeCost > newNode.state.GetHeuristicCost():
-                  print "Pushing lower cost new node"
                   heapq.heappush(self.frontier, newNode)
+                  if checkpoint is not None:
+                     checkpoint.AddNode(newNode, False)
+               elif self.MergeFootprints(seenNode, newNode):
+                  # expand once more, without pruning, to generate
+                  # what the first expansion pruned
+                  newNode.footprint = None
+                  heapq.heappush(self.frontier, newNode)
+                  if checkpoint is not None:
+                     checkpoint.ClearFootprint(seenNode)
+                     checkpoint.AddNode(newNode, False)
 
          # add evaluated node to explored set
-         explored[evalNode.GetNodeHash()] = evalNode.state.GetHeuristicCost()
+         explored[evalNode.GetNodeHash()] = evalNode
+         if checkpoint is not None:
+            checkpoint.Expanded(evalNode, self.frontier)
+         if hooks is not None:
+            hooks.OnExpand(evalNode, self.frontier)
+         budget.Expanded(evalNode)
          
          # pop the next node to be evaluated from the queue
          if len(self.frontier) > 0:
-            print "Frontier is " + str(len(self.frontier))
             evalNode = heapq.heappop(self.frontier)
-            print "Heuristic cost " + str(evalNode.state.heuristic)
          else:
             # ... just in case, set eval node to none and break
             evalNode = None
             break
 
+      if checkpoint is not None:
+         checkpoint.Finish()
+
       # return goal node. algorithm is complete for same reason
       # ID-DFTS is complete
       return evalNode
 
 
    ## Perform a ID-DTFS search for the goal node
+   # @return SearchResult of the search
    def IterativeDepthDTFS_Solve(self):
+      return self.RunSearch(self.SearchIterativeDeepening)
+
+   ## Run the ID-DTFS search, see IterativeDepthDTFS_Solve
+   # @return The goal SearchNode, None if there is none
+   def SearchIterativeDeepening(self):
       # Start with a max depth of 1
       currMax = 1
 
       rootNode = self.frontier[0]
 
+      self.depthCutoff = False
       goalNode = self.RecursiveDFTS_Eval(rootNode, currMax)
 
-      # while this max depth doesn't yield a goal
-      while goalNode is None:
+      # while this max depth doesn't yield a goal, and some path was
+      # cut off by it
+      while goalNode is None and self.depthCutoff:
          # increment the max
          currMax += 1
          # and try again
+         self.depthCutoff = False
          goalNode = self.RecursiveDFTS_Eval(rootNode, currMax)
 
       # ID-DFTS is complete because all path costs
       # are non-negative and the depth factor is finite
       return goalNode
 
+   ## Perform an IDA* search spread over worker processes (see
+   # ParallelIDAStar)
+   # @param numWorkers (optional) Number of worker processes, one per
+   # processor by default
+   # @param splitDepth Moves from the root at which work items start
+   # @return SearchResult of the search
+   def ParallelIDAStarSolve(self, numWorkers=None, splitDepth=3):
+      return self.RunSearch(self.SearchParallelIDAStar, numWorkers, \
+                            splitDepth)
+
+   ## Run the parallel IDA* search, see ParallelIDAStarSolve
+   # @param numWorkers Number of worker processes, None for one per
+   # processor
+   # @param splitDepth Moves from the root at which work items start
+   # @return The goal SearchNode, None if there is none
+   def SearchParallelIDAStar(self, numWorkers, splitDepth):
+      self.parallelSearch = ParallelIDAStar(self, self.frontier[0], \
+                                            numWorkers, splitDepth, \
+                                            self.activeBudget)
+      return self.parallelSearch.Solve()
+
    ## Given a search node and depth beyond the node to search,
    # perform a depth-limited evaluation of this node
    # @param searchNode The starting search node
@@ -159,15 +401,21 @@ class Agent:
       # otherwise, determine if this is as deep as we're checking
       if maxDepth == 0:
          # and return no goal found
+         self.depthCutoff = True
          return None
 
       # otherwise, get a list of complete moves
-      nextMoves = searchNode.Actions()
+      nextMoves = self.GetSearchableMoves(searchNode)
+      if self.hooks is not None:
+         self.hooks.OnExpand(searchNode, None)
+      self.activeBudget.Expanded(searchNode)
 
       # and for each move
       for nextMove in nextMoves:
          # generate a new node
          nextNode = self.GenerateSearchNodeFromMove(searchNode, nextMove)
+         if self.hooks is not None:
+            self.hooks.OnGenerate(nextNode, searchNode)
          # and recursively evaluate that node, but allowing one less depth
          goalNode = self.RecursiveDFTS_Eval(nextNode, maxDepth - 1)
 
@@ -176,39 +424,55 @@ class Agent:
             # then break out
             return goalNode
 
-   ## Perform a BFTS for goal node
+   ## Perform a BFTS for goal node. The goal node is also left in
+   # currentSearchNode.
+   # @return SearchResult of the search
    def BFTS_Solve(self):
-      iterCnt = 0
-      foundGoal = False
+      return self.RunSearch(self.SearchBreadthFirst)
+
+   ## Run the BFTS, see BFTS_Solve
+   # @return The goal SearchNode, None if there is none
+   def SearchBreadthFirst(self):
       # while we're not in the goal state
-      # and we haven't interated for "too long"
-      while not foundGoal and iterCnt < 1000000000:
+      # (the budget stops searches that run for "too long")
+      while len(self.frontier) != 0:
          # expand the frontier BFTS style
-         if len(self.frontier) != 0:
-            self.currentSearchNode = self.frontier[0]
-            self.frontier.remove(self.frontier[0]) # This will kill my time!
-            foundGoal = self.currentSearchNode.ContainsGoalState()
+         self.currentSearchNode = self.frontier[0]
+         self.frontier.remove(self.frontier[0]) # This will kill my time!
+         if self.currentSearchNode.ContainsGoalState():
+            return self.currentSearchNode
 
-            self.BFTS_ExpandFrontier()
-         else:
-            break
+         self.BFTS_ExpandFrontier()
+         if self.hooks is not None:
+            self.hooks.OnExpand(self.currentSearchNode, self.frontier)
+         self.activeBudget.Expanded(self.currentSearchNode)
 
-      return foundGoal
+      return None
 
    ## If we're in a goal state, construct the solution
    # suitable to be submitted
    def ConstructSolutionString(self, searchNode):
-      solutionString = ''
+      solution = StringIO()
+      self.WriteSolution(searchNode, solution)
+      return solution.getvalue()
+
+   ## If we're in a goal state, write the solution to a file as it is
+   # produced: the moves from the root in order, then the final puzzle.
+   # Takes time linear in the number of moves and constant extra memory.
+   # @param searchNode The goal node
+   # @param outFile File-like object to write to
+   def WriteSolution(self, searchNode, outFile):
       if searchNode.ContainsGoalState():
-         goalPath = searchNode.BackTrack()
-         for node in goalPath:
+         moves = searchNode.state.puzzle.GetLayout().moves
+         for node in searchNode.WalkFromRoot():
             # root node will not have an action
-            if node.action is not None:
-               solutionString += str(node.action)
-
-         solutionString += str(searchNode.state.ConstructSolution())
+            if isinstance(node.action, tuple):
+               for code in node.action:
+                  outFile.write(moves.Format(code))
+            elif node.action is not None:
+               outFile.write(moves.Format(node.action))
 
-      return solutionString
+         searchNode.state.WritePuzzle(outFile)
 
    ## Return the path cost of the current search node
    def GetCurrentSearchNodeCost(self):
@@ -233,54 +497,112 @@ class Agent:
    ## Create all possible child states from the current state
    def BFTS_ExpandFrontier(self):
       # Query the state for all valid moves for this state
-      allMoves = self.currentSearchNode.Actions()
+      allMoves = self.GetSearchableMoves(self.currentSearchNode)
 
       # for each move generate a new search node
       for move in allMoves:
          newSearchNode = self.GenerateSearchNodeFromMove(self.currentSearchNode, move)
+         if self.hooks is not None:
+            self.hooks.OnGenerate(newSearchNode, self.currentSearchNode)
          # and add it to the frontier
          self.frontier.append(newSearchNode)
 
+   ## Return the moves to search from a node. With partial-order
+   # reduction on, moves that commute with the node's own move and
+   # belong before it are left out (see PartialOrder).
+   # With macro moves on, corridor macros are added as well.
+   # @param searchNode The node being expanded
+   def GetSearchableMoves(self, searchNode):
+      nextMoves = searchNode.Actions()
+      if self.usePartialOrder:
+         nextMoves = PruneCommutedMoves(searchNode.footprint, nextMoves, \
+                        searchNode.state.puzzle.GetLayout().moves)
+      if self.useMacroMoves:
+         nextMoves.extend(searchNode.state.MacroActions())
+      searchNode.state.ReleaseOccupancy()
+      return nextMoves
+
+   ## Combine the pruning of two nodes holding the same state.
+   # Either path may be the one pruning relies on, so a node reached
+   # through different moves must not prune at all.
+   # @param seenNode The node already in the frontier or explored set
+   # @param newNode The node just generated
+   # @return True if seenNode had been pruning and no longer does
+   def MergeFootprints(self, seenNode, newNode):
+      if seenNode.footprint is None or \
+            seenNode.footprint == newNode.footprint:
+         return False
+      seenNode.footprint = None
+      return True
+
    ## Generate a new search node given the current state
    # and a valid move
-   # @param move The move to apply
-   def GenerateSearchNodeFromMove(self, searchNode, move):
+   # @param code The packed code of the move to apply, or a tuple
+   # of codes for a corridor macro
+   def GenerateSearchNodeFromMove(self, searchNode, code):
+      if isinstance(code, tuple):
+         return self.GenerateSearchNodeFromMacro(searchNode, code)
+      state = searchNode.state
+      layout = state.puzzle.GetLayout()
+      # the interned Move carries the unpacked details
+      move = layout.moves.GetMove(code)
       # First, determine which wriggler will move
-      # and which are not important
-      wrigglerDivide = self.SeparateMoveWrigglerFromOthers(searchNode, move)
-      # Next, create a new puzzle and wriggler based on the move
-      updatedStateInternals = MoveWriggler(wrigglerDivide[0], \
-                                          move, \
-                                          searchNode.state.puzzle)   
-
-      # put the updated wriggler back with all others
-      allWrigglers = [updatedStateInternals[0]]
-      if len(wrigglerDivide[1]) > 0:
-         allWrigglers.extend(wrigglerDivide[1])
-         
-      # updateStateInternals = (new wriggler, new world)
-      newState = State(updatedStateInternals[1], allWrigglers)
-      newSearchNode = SearchNode(newState, \
+      bodyIndex = state.GetBodyIndex(move.tailNumber)
+      oldBody = state.bodies[bodyIndex]
+      # Next, create its new body, all others are shared
+      newBody = MoveBody(oldBody, move.pieceMoved, \
+                         layout.moves.GetDestIndex(code), layout)
+
+      newSearchNode = SearchNode(self.GenerateState(state, bodyIndex, \
+                                                    newBody), \
                                  searchNode, \
-                                 move, \
+                                 code, \
                                  searchNode.pathCost+1)
+      newSearchNode.footprint = GetMoveFootprint(oldBody, move)
+      if self.heuristicWeight != 1:
+         self.WeighHeuristic(newSearchNode)
 
       return newSearchNode
 
-   ## Generate a tuple where the first entry is the wriggler
-   # affected by a specific move and the second entry is a list
-   # of all other wrigglers
-   # @param move The move to apply
-   def SeparateMoveWrigglerFromOthers(self, searchNode, move):
-      otherWrigglers = []
-      moveWriggler = None
-      for wriggler in searchNode.state.wrigglers:
-         if wriggler.tail.idNumber != move.tailNumber:
-            otherWrigglers.append(wriggler)
-         else:
-            moveWriggler = wriggler
+   ## Generate a new search node given the current state
+   # and a corridor macro. The node costs one per step taken.
+   # @param macro Tuple of packed codes moving the same wriggler
+   def GenerateSearchNodeFromMacro(self, searchNode, macro):
+      state = searchNode.state
+      layout = state.puzzle.GetLayout()
+      steps = [layout.moves.GetMove(code) for code in macro]
+      bodyIndex = state.GetBodyIndex(steps[0].tailNumber)
+      newBody = MoveBodySteps(state.bodies[bodyIndex], steps, layout)
+
+      # footprint stays None: nothing is pruned after a macro
+      newSearchNode = SearchNode(self.GenerateState(state, bodyIndex, \
+                                                    newBody), \
+                                 searchNode, \
+                                 macro, \
+                                 searchNode.pathCost + len(macro))
+      if self.heuristicWeight != 1:
+         self.WeighHeuristic(newSearchNode)
+      return newSearchNode
 
-      return (moveWriggler, otherWrigglers)
+   ## Order a node for A* by its path cost plus the weighted heuristic.
+   # A weight w above 1 finds solutions at most w times the optimal cost,
+   # usually after far fewer expansions; 0 orders by path cost alone.
+   # @param searchNode The node to reorder
+   def WeighHeuristic(self, searchNode):
+      searchNode.totalCost = searchNode.pathCost + \
+         self.heuristicWeight * searchNode.state.GetHeuristicCost()
+
+   ## Generate the state in which one wriggler has a new body
+   # @param state The state before the move
+   # @param bodyIndex Position of the moved wriggler in state.bodies
+   # @param newBody Cells of the moved wriggler after the move
+   def GenerateState(self, state, bodyIndex, newBody):
+      bodies = list(state.bodies)
+      oldBody = bodies[bodyIndex]
+      bodies[bodyIndex] = newBody
+      # only the moved wriggler's tiles changed
+      return State(state.puzzle, tuple(bodies), state.tailIds, \
+                   state, GetChangedCells(oldBody, newBody))
 
    ## @var currentSearchNode
    # The current state under examination by the agent
@@ -288,6 +610,51 @@ class Agent:
    ## @var frontier
    # Collection of states yet to be explored
 
+   ## @var usePartialOrder
+   # Prune orderings of independent moves (see PartialOrder)
+
+   ## @var useMacroMoves
+   # Also generate corridor macros (see State.MacroActions)
+
+   ## @var frontierSearch
+   # The FrontierSearch of the last FrontierSearchSolve, for its statistics
+
+   ## @var externalSearch
+   # The ExternalBreadthFirstSearch of the last ExternalSearchSolve, for
+   # its statistics
+
+   ## @var parallelSearch
+   # The ParallelIDAStar of the last ParallelIDAStarSolve, for its
+   # statistics
+
+   ## @var hooks
+   # SearchHooks told of the events of the A*, greedy, ID-DFTS and BFTS
+   # searches, None if nobody follows the search
+
+   ## @var profiler
+   # SamplingProfiler sampling every search, None for no profiling
+
+   ## @var budget
+   # SearchBudget limiting every search, None for no limits
+
+   ## @var activeBudget
+   # SearchBudget of the search running, an unlimited one if budget is
+   # None
+
+   ## @var depthCutoff
+   # Set when a depth-limited evaluation reached its maximum depth; if
+   # none does, deeper iterations can find nothing new
+
+   ## @var checkSolvability
+   # True to try proving the puzzle unsolvable before each search
+
+   ## @var heuristicWeight
+   # Weight of the heuristic in the A* order (see WeighHeuristic)
+
+   ## @var checkpoint
+   # SearchCheckpoint the graph searches save their progress to, and
+   # resume from, None for no checkpoints
+
 # BELOW is simple testing code
 
 ## Test BFTS iterations
@@ -295,7 +662,7 @@ def TestBFTS_Iter():
    puzz1 = ReadPuzzle('puzz1.pz')
    wrig = FindWrigglers(puzz1)
 
-   initialState = State(puzz1, wrig)
+   initialState = MakeInitialState(puzz1, wrig)
    initialSearchNode = SearchNode(initialState, None, None, 0)
    ag = Agent(initialSearchNode)
 
@@ -311,7 +678,7 @@ def TestFrontierExpand():
    puzz1 = ReadPuzzle('puzz1.pz')
    wrig = FindWrigglers(puzz1)
 
-   initialState = State(puzz1, wrig)
+   initialState = MakeInitialState(puzz1, wrig)
    initialSearchNode = SearchNode(initialState, None, None, 0)
    ag = Agent(initialSearchNode)
    ag.BFTS_ExpandFrontier()
@@ -324,21 +691,23 @@ def TestSearchNodeGen():
    puzz1 = ReadPuzzle('puzz1.pz')
    wrig = FindWrigglers(puzz1)
 
-   initialState = State(puzz1, wrig)
+   initialState = MakeInitialState(puzz1, wrig)
    initialSearchNode = SearchNode(initialState, None, None, 0)
    ag = Agent(initialSearchNode)
-   mv = Move(0, Move.HEAD, 1, 3)
+   moves = puzz1.GetLayout().moves
+   mv = moves.Encode(0, Move.HEAD, puzz1.GetLinearIndex(1, 3))
    newSearchNode = ag.GenerateSearchNodeFromMove(initialSearchNode, mv)
 
    path = newSearchNode.BackTrack()
 
-   print str(initialSearchNode.state.puzzle)
+   print str(initialSearchNode.state)
    print ""
    for node in path:
-      print str(node.action) + " total cost: " + str(node.pathCost)
+      if node.action is not None:
+         print moves.Format(node.action) + " total cost: " + str(node.pathCost)
 
    print ""
-   print str(newSearchNode.state.puzzle)
+   print str(newSearchNode.state)
    print "===="
    print str(newSearchNode)
 
@@ -354,8 +723,9 @@ if __name__ == "__main__":
    puzz = Puzzle()
    puzz.numCols = 3
    puzz.numRows = 3
+   puzz.puzzle = ['e'] * 9
 
-   state = State(puzz, [goalWriggler])
+   state = MakeInitialState(puzz, [goalWriggler])
    agent = Agent(SearchNode(state, None, None, 0))
 
    if not agent.currentSearchNode.ContainsGoalState():
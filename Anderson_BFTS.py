@@ -6,9 +6,33 @@
 from PuzzleReader import ReadPuzzle
 from WrigglerReader import FindWrigglers
 from Agent import Agent
-from SearchNode import State, SearchNode
+from Relevance import FreezeIrrelevantWrigglers
+from SearchNode import SearchNode
+from State import MakeInitialState
+from SearchBudget import ParseBudgetArguments
+from SamplingProfiler import ParseProfileArguments
+import sys
 import time
 
+# --frontier keeps only the open list (see FrontierSearch)
+useFrontierSearch = '--frontier' in sys.argv[1:]
+# --external keeps the layers on disk (see ExternalSearch), in a
+# temporary directory or the one given by --scratch=DIR
+useExternalSearch = '--external' in sys.argv[1:]
+scratchDir = None
+for argument in sys.argv[1:]:
+   if argument.startswith('--scratch='):
+      scratchDir = argument[len('--scratch='):]
+
+# --time-limit=SECONDS and --node-limit=NODES bound the search (see
+# SearchBudget)
+budget = ParseBudgetArguments(sys.argv[1:])
+
+# --profile[=MILLISECONDS] samples the search every MILLISECONDS of
+# processor time (default 1) and writes the stacks to <puzzle>.folded
+# (see SamplingProfiler)
+profiler = ParseProfileArguments(sys.argv[1:])
+
 # prompt for file name
 puzzleFile = raw_input('Enter filename of puzzle: ')
 
@@ -20,13 +44,36 @@ if initialPuzzle is not None:
    wrigglers = FindWrigglers(initialPuzzle)
 
    if len(wrigglers) > 0:
-      initialState = State(initialPuzzle, wrigglers)
+      # wrigglers walled off from the blue wriggler never need to move
+      (wrigglers, relevanceReport) = \
+         FreezeIrrelevantWrigglers(initialPuzzle, wrigglers)
+      print relevanceReport
+
+      initialState = MakeInitialState(initialPuzzle, wrigglers)
       initialSearchNode = SearchNode(initialState, None, None, 0)
 
       smith = Agent(initialSearchNode)
+      smith.budget = budget
+      smith.profiler = profiler
       startTime = time.clock()
-      foundGoal = smith.BFTS_Solve()
+      if useFrontierSearch:
+         result = smith.FrontierSearchSolve(False)
+      elif useExternalSearch:
+         result = smith.ExternalSearchSolve(scratchDir, sys.stdout)
+      else:
+         result = smith.BFTS_Solve()
       endTime = time.clock()
+      smith.currentSearchNode = result.node
+      foundGoal = result.IsSolved()
+      print str(result)
+      if useFrontierSearch:
+         print str(smith.frontierSearch)
+      elif useExternalSearch and smith.externalSearch is not None:
+         print str(smith.externalSearch)
+      print str(initialPuzzle.GetLayout().heuristicCache)
+      if profiler is not None:
+         print str(profiler)
+         profiler.WriteFolded(puzzleFile + '.folded')
 
       if foundGoal:
          solution = smith.ConstructSolutionString(smith.currentSearchNode)
@@ -6,9 +6,34 @@
 from PuzzleReader import ReadPuzzle
 from WrigglerReader import FindWrigglers
 from Agent import Agent
-from SearchNode import State, SearchNode
+from Relevance import FreezeIrrelevantWrigglers
+from SearchNode import SearchNode
+from State import MakeInitialState
+from SearchBudget import ParseBudgetArguments
+from SamplingProfiler import ParseProfileArguments
+import sys
 import time
 
+# --parallel-ida[=WORKERS] runs IDA* over a pool of processes, one per
+# processor by default (see ParallelIDAStar)
+parallelWorkers = None
+useParallelSearch = False
+for argument in sys.argv[1:]:
+   if argument == '--parallel-ida':
+      useParallelSearch = True
+   elif argument.startswith('--parallel-ida='):
+      useParallelSearch = True
+      parallelWorkers = int(argument[len('--parallel-ida='):])
+
+# --time-limit=SECONDS and --node-limit=NODES bound the search (see
+# SearchBudget)
+budget = ParseBudgetArguments(sys.argv[1:])
+
+# --profile[=MILLISECONDS] samples the search every MILLISECONDS of
+# processor time (default 1) and writes the stacks to <puzzle>.folded
+# (see SamplingProfiler)
+profiler = ParseProfileArguments(sys.argv[1:])
+
 # prompt for file name
 puzzleFile = raw_input('Enter filename of puzzle: ')
 
@@ -20,17 +45,35 @@ if initialPuzzle is not None:
    wrigglers = FindWrigglers(initialPuzzle)
 
    if len(wrigglers) > 0:
-      initialState = State(initialPuzzle, wrigglers)
+      # wrigglers walled off from the blue wriggler never need to move
+      (wrigglers, relevanceReport) = \
+         FreezeIrrelevantWrigglers(initialPuzzle, wrigglers)
+      print relevanceReport
+
+      initialState = MakeInitialState(initialPuzzle, wrigglers)
       initialSearchNode = SearchNode(initialState, None, None, 0)
 
       smith = Agent(initialSearchNode)
+      smith.budget = budget
+      smith.profiler = profiler
       startTime = time.clock()
-      foundGoal = smith.IterativeDepthDTFS_Solve()
+      if useParallelSearch:
+         result = smith.ParallelIDAStarSolve(parallelWorkers)
+      else:
+         result = smith.IterativeDepthDTFS_Solve()
       endTime = time.clock()
+      foundGoal = result.GetGoalNode()
+      print str(result)
+      if useParallelSearch:
+         print str(smith.parallelSearch)
+      print str(initialPuzzle.GetLayout().heuristicCache)
+      if profiler is not None:
+         print str(profiler)
+         profiler.WriteFolded(puzzleFile + '.folded')
 
       if foundGoal is not None:
-         solution = smith.ConstructSolutionString(foundGoal)
          solnFile = open(puzzleFile + '.sln', 'w')
-         solnFile.write(solution + '\n')
+         smith.WriteSolution(foundGoal, solnFile)
+         solnFile.write('\n')
          solnFile.write(str(endTime - startTime) + '\n')
          solnFile.write(str(foundGoal.pathCost) + '\n')
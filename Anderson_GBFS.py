@@ -6,9 +6,43 @@
 from PuzzleReader import ReadPuzzle
 from WrigglerReader import FindWrigglers
 from Agent import Agent
-from SearchNode import State, SearchNode
+from Relevance import FreezeIrrelevantWrigglers
+from SearchNode import SearchNode
+from State import MakeInitialState
+from SearchBudget import ParseBudgetArguments
+from SamplingProfiler import ParseProfileArguments
+from SearchTrace import SearchTrace
+from Checkpoint import SearchCheckpoint
+import sys
 import time
 
+# --checkpoint[=SECONDS] saves the search to <puzzle>.ckpt and its open
+# list to <puzzle>.ckpt.open every SECONDS (default
+# SearchCheckpoint.DEFAULT_INTERVAL), --resume continues from those
+# files (see Checkpoint)
+checkpointInterval = None
+resumeSearch = '--resume' in sys.argv[1:]
+for argument in sys.argv[1:]:
+   if argument == '--checkpoint':
+      checkpointInterval = SearchCheckpoint.DEFAULT_INTERVAL
+   elif argument.startswith('--checkpoint='):
+      checkpointInterval = float(argument[len('--checkpoint='):])
+if resumeSearch and checkpointInterval is None:
+   checkpointInterval = SearchCheckpoint.DEFAULT_INTERVAL
+
+# --time-limit=SECONDS and --node-limit=NODES bound the search (see
+# SearchBudget)
+budget = ParseBudgetArguments(sys.argv[1:])
+
+# --profile[=MILLISECONDS] samples the search every MILLISECONDS of
+# processor time (default 1) and writes the stacks to <puzzle>.folded
+# (see SamplingProfiler)
+profiler = ParseProfileArguments(sys.argv[1:])
+
+# --trace records every expansion to <puzzle>.trace (see SearchTrace and
+# Anderson_TraceReport)
+traceSearch = '--trace' in sys.argv[1:]
+
 # prompt for file name
 puzzleFile = raw_input('Enter filename of puzzle: ')
 
@@ -20,17 +54,40 @@ if initialPuzzle is not None:
    wrigglers = FindWrigglers(initialPuzzle)
 
    if len(wrigglers) > 0:
-      initialState = State(initialPuzzle, wrigglers)
+      # wrigglers walled off from the blue wriggler never need to move
+      (wrigglers, relevanceReport) = \
+         FreezeIrrelevantWrigglers(initialPuzzle, wrigglers)
+      print relevanceReport
+
+      initialState = MakeInitialState(initialPuzzle, wrigglers)
       initialSearchNode = SearchNode(initialState, None, None, 0)
 
       smith = Agent(initialSearchNode)
+      smith.budget = budget
+      smith.profiler = profiler
+      if traceSearch:
+         smith.hooks = SearchTrace(puzzleFile + '.trace')
+      if checkpointInterval is not None:
+         smith.checkpoint = SearchCheckpoint(puzzleFile + '.ckpt', \
+                                             checkpointInterval, resumeSearch)
       startTime = time.clock()
-      foundGoal = smith.GreedyBestFirstGraphSearch()
+      result = smith.GreedyBestFirstGraphSearch()
       endTime = time.clock()
+      foundGoal = result.GetGoalNode()
+      print str(result)
+      if smith.checkpoint is not None:
+         print str(smith.checkpoint)
+      print str(initialPuzzle.GetLayout().heuristicCache)
+      if traceSearch:
+         smith.hooks.Close()
+         print str(smith.hooks)
+      if profiler is not None:
+         print str(profiler)
+         profiler.WriteFolded(puzzleFile + '.folded')
 
       if foundGoal is not None:
-         solution = smith.ConstructSolutionString(foundGoal)
          solnFile = open(puzzleFile + '.sln', 'w')
-         solnFile.write(solution + '\n')
+         smith.WriteSolution(foundGoal, solnFile)
+         solnFile.write('\n')
          solnFile.write(str(endTime - startTime) + '\n')
          solnFile.write(str(foundGoal.pathCost) + '\n')
@@ -0,0 +1,70 @@
+## @file Anderson_Portfolio.py
+# @author Mathew Anderson
+# @brief Implementation of main method
+# for racing several searches on the same puzzle (see Portfolio)
+
+from PuzzleReader import ReadPuzzle
+from WrigglerReader import FindWrigglers
+from Agent import Agent
+from Relevance import FreezeIrrelevantWrigglers
+from SearchNode import SearchNode
+from State import MakeInitialState
+from Portfolio import Portfolio, ParseStrategies, SummariseHistory, \
+   DEFAULT_STRATEGIES
+import sys
+import time
+
+# --strategies=LIST races the given algorithm[:heuristic[:weight]] list,
+# --bound=B accepts solutions at most B times the optimal cost (default
+# 1, optimal only), --time-limit=SECONDS stops every search after that
+# long, --history=FILE is where each race is recorded
+strategiesText = DEFAULT_STRATEGIES
+requiredBound = 1.0
+timeLimit = None
+historyPath = 'portfolio.history'
+for argument in sys.argv[1:]:
+   if argument.startswith('--strategies='):
+      strategiesText = argument[len('--strategies='):]
+   elif argument.startswith('--bound='):
+      requiredBound = float(argument[len('--bound='):])
+   elif argument.startswith('--time-limit='):
+      timeLimit = float(argument[len('--time-limit='):])
+   elif argument.startswith('--history='):
+      historyPath = argument[len('--history='):]
+
+# prompt for file name
+puzzleFile = raw_input('Enter filename of puzzle: ')
+
+# attempt to construct the initial state
+initialPuzzle = ReadPuzzle(puzzleFile)
+
+if initialPuzzle is not None:
+   # attempt to extract all wriggler info
+   wrigglers = FindWrigglers(initialPuzzle)
+
+   if len(wrigglers) > 0:
+      # wrigglers walled off from the blue wriggler never need to move
+      (wrigglers, relevanceReport) = \
+         FreezeIrrelevantWrigglers(initialPuzzle, wrigglers)
+      print relevanceReport
+
+      initialState = MakeInitialState(initialPuzzle, wrigglers)
+      initialSearchNode = SearchNode(initialState, None, None, 0)
+
+      portfolio = Portfolio(ParseStrategies(strategiesText), requiredBound, \
+                            historyPath, timeLimit)
+      startTime = time.time()
+      foundGoal = portfolio.Solve(initialSearchNode, puzzleFile)
+      endTime = time.time()
+      print str(portfolio)
+      print "Wins so far:"
+      print SummariseHistory(historyPath)
+
+      if foundGoal is not None:
+         solnFile = open(puzzleFile + '.sln', 'w')
+         Agent(initialSearchNode).WriteSolution(foundGoal, solnFile)
+         solnFile.write('\n')
+         solnFile.write(str(endTime - startTime) + '\n')
+         solnFile.write(str(foundGoal.pathCost) + '\n')
+      else:
+         print "DID NOT FIND GOAL!"
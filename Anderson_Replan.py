@@ -0,0 +1,60 @@
+## @file Anderson_Replan.py
+# @author Mathew Anderson
+# @brief Implementation of main method
+# for solving a puzzle again after each edit of its walls
+# (see IncrementalPlanner)
+
+from PuzzleReader import ReadPuzzle
+from WrigglerReader import FindWrigglers
+from Agent import Agent
+from IncrementalPlanner import IncrementalPlanner
+from SearchBudget import ParseBudgetArguments
+import sys
+
+# --time-limit=SECONDS and --node-limit=NODES bound each solve (see
+# SearchBudget)
+budget = ParseBudgetArguments(sys.argv[1:])
+
+# prompt for file name
+puzzleFile = raw_input('Enter filename of puzzle: ')
+
+# attempt to construct the initial state
+initialPuzzle = ReadPuzzle(puzzleFile)
+
+if initialPuzzle is not None:
+   # attempt to extract all wriggler info
+   wrigglers = FindWrigglers(initialPuzzle)
+
+   if len(wrigglers) > 0:
+      # every wriggler is kept, as an edit may bring any of them into play
+      planner = IncrementalPlanner(initialPuzzle, wrigglers)
+      planner.budget = budget
+
+      editLine = ''
+      while editLine is not None:
+         result = planner.Solve()
+         foundGoal = result.GetGoalNode()
+         print str(result)
+         print str(planner)
+
+         if foundGoal is not None:
+            solnFile = open(puzzleFile + '.sln', 'w')
+            Agent(planner.GetRootNode()).WriteSolution(foundGoal, solnFile)
+            solnFile.write('\n')
+            solnFile.write(str(result.seconds) + '\n')
+            solnFile.write(str(foundGoal.pathCost) + '\n')
+            solnFile.close()
+         else:
+            print "DID NOT FIND GOAL!"
+
+         # edits are "col row tile" triples, tile x or e
+         editLine = raw_input('Enter edits (col row tile ...), ' + \
+                              'or nothing to stop: ').split()
+         if len(editLine) == 0:
+            editLine = None
+         else:
+            edits = {}
+            for start in xrange(0, len(editLine) - 2, 3):
+               position = (int(editLine[start]), int(editLine[start + 1]))
+               edits[planner.layout.GetIndex(position)] = editLine[start + 2]
+            planner.EditTiles(edits)
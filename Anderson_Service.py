@@ -0,0 +1,28 @@
+## @file Anderson_Service.py
+# @author Mathew Anderson
+# @brief Implementation of main method
+# for serving puzzle solutions to local clients (see SolverService)
+
+from SolverService import Serve
+import multiprocessing
+import sys
+
+# --port=N serves on localhost TCP port N (default 3470),
+# --socket=PATH on a Unix socket instead, --solvers=N runs N solver
+# processes (default one per processor)
+address = ('127.0.0.1', 3470)
+numSolvers = multiprocessing.cpu_count()
+for argument in sys.argv[1:]:
+   if argument.startswith('--port='):
+      address = ('127.0.0.1', int(argument[len('--port='):]))
+   elif argument.startswith('--socket='):
+      address = argument[len('--socket='):]
+   elif argument.startswith('--solvers='):
+      numSolvers = int(argument[len('--solvers='):])
+
+print "Serving on " + str(address) + " with " + str(numSolvers) + \
+   " solvers"
+try:
+   Serve(address, numSolvers)
+except KeyboardInterrupt:
+   pass
@@ -0,0 +1,50 @@
+## @file Anderson_Session.py
+# @author Mathew Anderson
+# @brief Implementation of main method
+# for solving many puzzles on the same walls (see SolverSession)
+
+from PuzzleReader import ReadPuzzle
+from Agent import Agent
+from SolverSession import SolverSession
+from SearchBudget import ParseBudgetArguments
+import sys
+
+# --time-limit=SECONDS and --node-limit=NODES bound each solve (see
+# SearchBudget)
+budget = ParseBudgetArguments(sys.argv[1:])
+
+session = None
+puzzleFile = raw_input('Enter filename of puzzle, or nothing to stop: ')
+while puzzleFile != '':
+   result = None
+   try:
+      puzzle = ReadPuzzle(puzzleFile)
+      if puzzle is not None:
+         # the first puzzle sets the walls of every later one
+         if session is None:
+            session = SolverSession(puzzle)
+            session.budget = budget
+         (rootNode, result) = session.Solve(session.GetPlacements(puzzle))
+   except Exception as e:
+      # a missing file, a puzzle on other walls or one with a bad
+      # wriggler is skipped, the session goes on with the next one
+      print "Skipping " + puzzleFile + ": " + str(e)
+
+   if result is not None:
+      foundGoal = result.GetGoalNode()
+      print str(result)
+
+      if foundGoal is not None:
+         solnFile = open(puzzleFile + '.sln', 'w')
+         Agent(rootNode).WriteSolution(foundGoal, solnFile)
+         solnFile.write('\n')
+         solnFile.write(str(result.seconds) + '\n')
+         solnFile.write(str(foundGoal.pathCost) + '\n')
+         solnFile.close()
+      else:
+         print "DID NOT FIND GOAL!"
+
+   puzzleFile = raw_input('Enter filename of puzzle, or nothing to stop: ')
+
+if session is not None:
+   print str(session)
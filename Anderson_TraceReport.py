@@ -0,0 +1,11 @@
+## @file Anderson_TraceReport.py
+# @author Mathew Anderson
+# @brief Implementation of main method
+# for reporting on a search trace written with --trace (see TraceReport)
+
+from TraceReport import TraceReport
+
+# prompt for file name
+traceFile = raw_input('Enter filename of trace: ')
+
+print str(TraceReport(traceFile))
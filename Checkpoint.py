@@ -0,0 +1,405 @@
+## @file Checkpoint.py
+# @author Mathew Anderson
+# @brief Periodic, incremental checkpoints of a best-first graph search.
+# A checkpoint is kept in two files. The journal starts with a header
+# naming the puzzle and is followed by one segment per checkpoint. A
+# segment holds only what changed since the one before:
+#    - a record (parent number, action, footprint) per node pushed since
+#    - the numbers of the nodes whose footprint was cleared since
+#    - the numbers of the nodes expanded, and added to the frontier
+#      dictionary, since
+# Nodes are numbered in the order they are recorded. The journal is only
+# ever appended to; nothing in it goes stale.
+#
+# The open list, as node numbers in heap order, and the counters go to a
+# snapshot file of their own, next to the journal. Only the latest one
+# is of any use, so each checkpoint writes a new snapshot beside the old
+# one and renames it over it. The snapshot names the length of the
+# journal it goes with; a resume reads the journal up to there and
+# carries on appending from that point, so a checkpoint killed between
+# its two writes falls back on the one before. A checkpoint so costs
+# the node records since the last one plus one write of the open list,
+# never a pass over the whole journal.
+#
+# States are not written at all: a node's state is rebuilt on resume by
+# replaying its action on its parent's state. Restoring the open list in
+# exactly its heap order makes the resumed search pop the same nodes in
+# the same order, so it finds the same solution as an uninterrupted one.
+#
+# Each segment, and the snapshot, carries its length and a CRC, so one
+# cut short by the process being killed is recognised and dropped on
+# resume. Writing a checkpoint takes about a microsecond per node
+# recorded since the last one, a few tenths of a second at the default
+# interval.
+
+import array
+import marshal
+import os
+import struct
+import time
+import zlib
+
+## The SearchCheckpoint class records the progress of a search to a file
+# and restores it.
+class SearchCheckpoint:
+
+   ## Tag at the start of every journal
+   MAGIC = 'WRIGCKPT2\n'
+
+   ## Tag at the start of every open list snapshot
+   OPEN_MAGIC = 'WRIGOPEN2\n'
+
+   ## Length and CRC in front of each segment
+   SEGMENT_HEADER = struct.Struct('>Ii')
+
+   ## Default seconds of search between checkpoints
+   DEFAULT_INTERVAL = 60.0
+
+   ## Ctor prepares checkpointing to a file
+   # @param path Name of the journal; the open list snapshot is kept
+   # next to it, with '.open' added
+   # @param interval Seconds of search between checkpoints
+   # @param resume True to continue from the file if it holds a
+   # checkpoint of the same search, False to always start afresh
+   def __init__(self, path, interval=DEFAULT_INTERVAL, resume=False):
+      self.path = path
+      self.openPath = path + '.open'
+      self.interval = interval
+      self.resume = resume
+      self.outFile = None
+      self.validLength = 0
+      self.numRecorded = 0
+      self.expanded = 0
+      self.elapsedBefore = 0.0
+      self.startTime = time.time()
+      self.lastSaveTime = self.startTime
+      self.ClearPending()
+
+   ## Forget everything waiting to be written
+   def ClearPending(self):
+      self.pendingNodes = []
+      self.pendingCleared = array.array('i')
+      self.pendingExplored = array.array('i')
+      self.pendingFrontierDict = array.array('i')
+
+   ## Return a description of the search identifying its checkpoints:
+   # the puzzle, the initial wriggler bodies and the search kind.
+   # @param rootNode The root SearchNode
+   # @param kind Name of the search
+   def GetFingerprint(self, rootNode, kind):
+      state = rootNode.state
+      return (kind, state.puzzle.GetPuzzleString(), state.bodies, \
+              state.tailIds)
+
+   ## Start a new checkpoint for a search
+   # @param rootNode The root SearchNode, recorded as node 0
+   # @param kind Name of the search
+   def Start(self, rootNode, kind):
+      # a snapshot of an earlier search would not match the new journal
+      if os.path.exists(self.openPath):
+         os.remove(self.openPath)
+      self.outFile = open(self.path, 'wb')
+      self.outFile.write(self.MAGIC)
+      self.WriteSegment(self.outFile, self.GetFingerprint(rootNode, kind))
+      self.AddNode(rootNode, False)
+
+   ## Restore a search from the checkpoint, if there is one for the same
+   # puzzle, and keep appending to its journal.
+   # @param agent Agent used to replay the actions
+   # @param rootNode The root SearchNode
+   # @param kind Name of the search
+   # @param explored Explored dictionary to fill in
+   # @param frontierDict Frontier dictionary to fill in, None if unused
+   # @return The open list in heap order, None if nothing was restored
+   def Restore(self, agent, rootNode, kind, explored, frontierDict):
+      if not self.resume or not os.path.exists(self.path) or \
+            not os.path.exists(self.openPath):
+         return None
+      snapshot = next(self.ReadSegments(self.openPath, self.OPEN_MAGIC), \
+                      None)
+      if snapshot is None:
+         return None
+      (journalLength, heapString, counters) = snapshot
+      segments = self.ReadSegments(self.path, self.MAGIC, journalLength)
+      if next(segments, None) != self.GetFingerprint(rootNode, kind):
+         return None
+
+      nodes = [rootNode]
+      for (parents, actions, footprints, clearedString, exploredString, \
+           frontierDictString) in segments:
+         parentArray = array.array('i')
+         parentArray.fromstring(parents)
+         for index in xrange(len(parentArray)):
+            if parentArray[index] < 0:
+               continue
+            node = agent.GenerateSearchNodeFromMove(
+               nodes[parentArray[index]], actions[index])
+            node.footprint = footprints[index]
+            node.useHeuristicAndPathCost = rootNode.useHeuristicAndPathCost
+            node.serial = len(nodes)
+            nodes.append(node)
+
+         clearedArray = array.array('i')
+         clearedArray.fromstring(clearedString)
+         for serial in clearedArray:
+            nodes[serial].footprint = None
+
+         exploredArray = array.array('i')
+         exploredArray.fromstring(exploredString)
+         for serial in exploredArray:
+            explored[nodes[serial].state.GetStateKey()] = nodes[serial]
+         if frontierDict is not None:
+            frontierArray = array.array('i')
+            frontierArray.fromstring(frontierDictString)
+            for serial in frontierArray:
+               frontierDict[nodes[serial].state.GetStateKey()] = \
+                  nodes[serial]
+      if self.validLength != journalLength:
+         # the journal lost segments the snapshot relies on
+         explored.clear()
+         if frontierDict is not None:
+            frontierDict.clear()
+         return None
+
+      heapArray = array.array('i')
+      heapArray.fromstring(heapString)
+      heap = [nodes[serial] for serial in heapArray]
+      (self.expanded, self.elapsedBefore) = counters
+      self.numRecorded = len(nodes)
+      self.ClearPending()
+
+      # carry on appending, past any segment the snapshot does not know
+      self.outFile = open(self.path, 'r+b')
+      self.outFile.seek(journalLength)
+      self.outFile.truncate()
+      self.startTime = time.time()
+      self.lastSaveTime = self.startTime
+      return heap
+
+   ## Read the complete segments of a file one at a time. Sets
+   # validLength to the length of the file up to the last segment read.
+   # @param path Name of the file
+   # @param magic Tag the file must start with
+   # @param limit (optional) Length of the file to read up to, all of
+   # it if None
+   # @return Generator of the decoded segments, the journal's header
+   # first; nothing if the file does not start with the tag
+   def ReadSegments(self, path, magic, limit=None):
+      inFile = open(path, 'rb')
+      headerSize = self.SEGMENT_HEADER.size
+      try:
+         if inFile.read(len(magic)) != magic:
+            return
+         self.validLength = len(magic)
+         while limit is None or self.validLength < limit:
+            header = inFile.read(headerSize)
+            if len(header) != headerSize:
+               break
+            (length, crc) = self.SEGMENT_HEADER.unpack(header)
+            payload = inFile.read(length)
+            if len(payload) != length or zlib.crc32(payload) != crc:
+               break
+            self.validLength += headerSize + length
+            yield marshal.loads(payload)
+      finally:
+         inFile.close()
+
+   ## Note a node that is pushed on the open list
+   # @param node The new SearchNode
+   # @param inFrontierDict True if it is also added to the frontier
+   # dictionary
+   def AddNode(self, node, inFrontierDict):
+      node.serial = self.numRecorded
+      self.numRecorded += 1
+      self.pendingNodes.append(node)
+      if inFrontierDict:
+         self.pendingFrontierDict.append(node.serial)
+
+   ## Note that pruning was switched off for a recorded node
+   # @param node The SearchNode whose footprint was cleared
+   def ClearFootprint(self, node):
+      self.pendingCleared.append(node.serial)
+
+   ## Note an expanded node, and write a checkpoint if one is due. Call
+   # once the node is in the explored set and before the next is popped.
+   # @param node The SearchNode just expanded
+   # @param heap The open list
+   def Expanded(self, node, heap):
+      self.pendingExplored.append(node.serial)
+      self.expanded += 1
+      # only look at the clock every so often
+      if self.expanded & 0xff == 0 and \
+            time.time() - self.lastSaveTime >= self.interval:
+         self.Save(heap)
+
+   ## Append a segment with everything since the last checkpoint to the
+   # journal, then replace the open list snapshot
+   # @param heap The open list
+   def Save(self, heap):
+      parents = array.array('i')
+      actions = []
+      footprints = []
+      for node in self.pendingNodes:
+         if node.parent is None:
+            parents.append(-1)
+         else:
+            parents.append(node.parent.serial)
+         actions.append(node.action)
+         footprints.append(node.footprint)
+
+      now = time.time()
+      self.WriteSegment(self.outFile, (parents.tostring(), actions, \
+                                       footprints, \
+                                       self.pendingCleared.tostring(), \
+                                       self.pendingExplored.tostring(), \
+                                       self.pendingFrontierDict.tostring()))
+      self.ClearPending()
+
+      # the new snapshot only replaces the old one once it is complete
+      heapArray = array.array('i', [node.serial for node in heap])
+      snapshotPath = self.openPath + '.tmp'
+      snapshotFile = open(snapshotPath, 'wb')
+      snapshotFile.write(self.OPEN_MAGIC)
+      self.WriteSegment(snapshotFile, (self.outFile.tell(), \
+                                       heapArray.tostring(), \
+                                       (self.expanded, self.GetElapsed())))
+      snapshotFile.close()
+      os.rename(snapshotPath, self.openPath)
+      self.lastSaveTime = now
+
+   ## Write one segment and make sure it reached the disk
+   # @param outFile File to append it to
+   # @param value Object to store, of types marshal supports
+   def WriteSegment(self, outFile, value):
+      payload = marshal.dumps(value)
+      outFile.write(self.SEGMENT_HEADER.pack(len(payload), \
+                                             zlib.crc32(payload)))
+      outFile.write(payload)
+      outFile.flush()
+      os.fsync(outFile.fileno())
+
+   ## Return the seconds searched, over this run and any it resumed
+   def GetElapsed(self):
+      return self.elapsedBefore + time.time() - self.startTime
+
+   ## Remove the checkpoint files once the search has finished
+   def Finish(self):
+      if self.outFile is not None:
+         self.outFile.close()
+         self.outFile = None
+      for path in (self.path, self.openPath):
+         if os.path.exists(path):
+            os.remove(path)
+
+   ## Summarise the work done
+   def __str__(self):
+      return "Checkpointed search: " + str(self.expanded) + \
+         " expansions in " + ('%.1f' % self.GetElapsed()) + \
+         " seconds, over all runs"
+
+   ## @var path
+   # Name of the journal
+
+   ## @var openPath
+   # Name of the open list snapshot
+
+   ## @var interval
+   # Seconds of search between checkpoints
+
+   ## @var resume
+   # True to continue from an existing checkpoint of the same search
+
+   ## @var outFile
+   # The journal being appended to
+
+   ## @var numRecorded
+   # Number of nodes recorded so far, the number of the next one
+
+   ## @var expanded
+   # Number of nodes expanded, over this run and any it resumed
+
+   ## @var elapsedBefore
+   # Seconds searched by the runs this one resumed
+
+   ## @var startTime
+   # Wall clock time this run started or resumed searching
+
+   ## @var lastSaveTime
+   # Wall clock time of the last checkpoint
+
+   ## @var validLength
+   # Length of the file last read up to its last complete segment
+
+   ## @var pendingNodes
+   # SearchNodes pushed since the last checkpoint
+
+   ## @var pendingCleared
+   # Numbers of the nodes whose footprint was cleared since then
+
+   ## @var pendingExplored
+   # Numbers of the nodes expanded since then
+
+   ## @var pendingFrontierDict
+   # Numbers of the nodes added to the frontier dictionary since then
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from Agent import Agent
+
+   ## Stands in for the process being killed
+   class Interrupted(Exception):
+      pass
+
+   ## Checkpoints after every expansion and stops after a few
+   class StoppingCheckpoint(SearchCheckpoint):
+      def Expanded(self, node, heap):
+         SearchCheckpoint.Expanded(self, node, heap)
+         self.Save(heap)
+         if self.expanded == 200:
+            raise Interrupted()
+
+   ## Return the moves A* finds for puzz2
+   def Solve(checkpoint):
+      puzz = ReadPuzzle('puzz2.pz')
+      agent = Agent(SearchNode(MakeInitialState(puzz, FindWrigglers(puzz)), \
+                               None, None, 0))
+      agent.checkpoint = checkpoint
+      goalNode = agent.AStarSearch().GetGoalNode()
+      return [node.action for node in goalNode.BackTrack()]
+
+   path = 'puzz2.pz.ckpt'
+   expected = Solve(None)
+   stopping = StoppingCheckpoint(path)
+   try:
+      Solve(stopping)
+      print "FAILED to interrupt the search"
+   except Interrupted:
+      pass
+   # the journal holds node records alone, one segment per checkpoint
+   journalSize = os.path.getsize(path)
+   numSegments = len(list(stopping.ReadSegments(path, stopping.MAGIC)))
+   if numSegments != 201 or stopping.validLength != journalSize:
+      print "FAILED to append one segment per checkpoint"
+   print str(numSegments) + " segments, " + str(journalSize) + \
+      " bytes of journal, " + str(os.path.getsize(path + '.open')) + \
+      " bytes of open list"
+
+   # a checkpoint killed between its journal segment and its snapshot:
+   # the segment, which would not even replay, is not read
+   stopping.outFile = open(path, 'ab')
+   stopping.WriteSegment(stopping.outFile, \
+      (array.array('i', [1 << 20]).tostring(), [0], [None], '', '', ''))
+   stopping.outFile.close()
+   # and a segment cut short after it
+   open(path, 'ab').write('\x00\x00\x10\x00torn')
+
+   resumed = SearchCheckpoint(path, SearchCheckpoint.DEFAULT_INTERVAL, True)
+   if Solve(resumed) != expected:
+      print "FAILED to find the same solution after resuming"
+   if resumed.expanded <= 200 or os.path.exists(path) or \
+         os.path.exists(path + '.open'):
+      print "FAILED to resume from the checkpoint and remove it"
+   print str(resumed)
@@ -0,0 +1,267 @@
+## @file CornerLines.py
+# @author Mathew Anderson
+# @brief Bresenham lines from the tiles to the lower right corner.
+# The goal never moves, so the line the heuristic digests from either
+# end of the blue wriggler only depends on the tile it starts from, and
+# so does what it costs over the static tiles: the walls and the frozen
+# wrigglers. A state only has to correct the cost for the steps of the
+# line that look at tiles held by the wrigglers that move.
+#
+# A line is built the first time a search asks for it, as a compact
+# array of the linear indices of its points, and priced once over the
+# static tiles. Each step of a Bresenham line moves one tile along its
+# longer axis, so the steps that look at a tile follow from the tile's
+# position alone and no table of them is kept.
+
+from array import array
+from Bres import BresLine
+
+## The CornerLineTable class stores, per tile, the Bresenham line to
+# the lower right corner and the cost State.DigestBresLines gives it
+# over the static tiles of a puzzle, built the first time it is needed.
+class CornerLineTable:
+
+   ## Ctor
+   # @param layout Layout of the puzzle
+   # @param staticClasses Tile class (see State.TILE_CLASSES) per linear
+   # index of the static puzzle: walls, empty tiles and frozen wrigglers
+   # @param GetCostOfClass Function giving the cost of a tile class
+   def __init__(self, layout, staticClasses, GetCostOfClass):
+      self.numCols = layout.numCols
+      self.GetCostOfClass = GetCostOfClass
+      self.staticCosts = array('i', [GetCostOfClass(tileClass) \
+                                     for tileClass in staticClasses])
+      self.corner = layout.GetPosition(layout.numCells - 1)
+      self.lines = [None] * layout.numCells
+      self.stepCosts = [None] * layout.numCells
+      self.lineCosts = array('i', [0]) * layout.numCells
+
+   ## Return the line from a tile, building it the first time
+   # @param index Linear index of the tile
+   # @return array of the linear indices of the points of the line
+   def GetLine(self, index):
+      line = self.lines[index]
+      if line is None:
+         numCols = self.numCols
+         line = array('i', [row * numCols + col for (col, row) in \
+                            BresLine((index % numCols, index // numCols), \
+                                     self.corner)])
+         stepCosts = array('i', [self.GetStepCost(line, step, {}) \
+                                 for step in xrange(len(line) - 1)])
+         self.stepCosts[index] = stepCosts
+         self.lineCosts[index] = sum(stepCosts)
+         self.lines[index] = line
+      return line
+
+   ## Return the tiles State.GetCostOfMovement looks at between two
+   # points of a line, down the column then along the row and along the
+   # row then down the column. A step moves one tile along each axis at
+   # most, and never left or up.
+   # @param line Points of the line (see GetLine)
+   # @param step Number of the step, from point step to the next
+   # @return Tuple of the two paths, each a tuple of linear indices
+   def GetStepCells(self, line, step):
+      start = line[step]
+      end = line[step + 1]
+      if end - start == self.numCols + 1:
+         return ((start + self.numCols, end), (start + 1, end))
+      return ((end,), (end,))
+
+   ## Return the cost of one step of a line
+   # @param line Points of the line (see GetLine)
+   # @param step Number of the step
+   # @param occupancy Dictionary from the linear index of each tile a
+   # wriggler that may move holds to its tile class, the other tiles
+   # being priced as static ones
+   def GetStepCost(self, line, step, occupancy):
+      GetCostOfClass = self.GetCostOfClass
+      staticCosts = self.staticCosts
+      return min([sum([GetCostOfClass(occupancy[cell]) if cell in occupancy \
+                       else staticCosts[cell] for cell in path]) \
+                  for path in self.GetStepCells(line, step)])
+
+   ## Return the length of the line from a tile, in steps: the distance
+   # to the corner along the longer axis
+   # @param index Linear index of the tile
+   def GetLength(self, index):
+      (cornerCol, cornerRow) = self.corner
+      return max(cornerCol - index % self.numCols, \
+                 cornerRow - index // self.numCols)
+
+   ## Return the cost State.DigestBresLines gives the line from a tile,
+   # with some tiles held by wrigglers. Only the steps looking at those
+   # tiles are priced again.
+   # @param index Linear index of the tile
+   # @param occupancy Dictionary from the linear index of each tile a
+   # wriggler that may move holds to its tile class
+   def GetLineCost(self, index, occupancy):
+      line = self.GetLine(index)
+      numCols = self.numCols
+      (startCol, startRow) = (index % numCols, index // numCols)
+      numSteps = len(line) - 1
+      colMajor = self.corner[0] - startCol >= self.corner[1] - startRow
+      diagonal = numCols + 1
+      # point k of the line is k tiles along the longer axis, and step k
+      # only looks at tiles k or k + 1 tiles along it (see GetStepCells)
+      touched = set()
+      for cell in occupancy:
+         if colMajor:
+            along = cell % numCols - startCol
+         else:
+            along = cell // numCols - startRow
+         for step in (along - 1, along):
+            if 0 <= step < numSteps:
+               start = line[step]
+               end = line[step + 1]
+               if cell == end or (end - start == diagonal and \
+                     (cell == start + numCols or cell == start + 1)):
+                  touched.add(step)
+      cost = self.lineCosts[index]
+      stepCosts = self.stepCosts[index]
+      for step in touched:
+         cost += self.GetStepCost(line, step, occupancy) - stepCosts[step]
+      return cost
+
+   ## @var numCols
+   # Total number of columns (width) of the puzzle
+
+   ## @var GetCostOfClass
+   # Function giving the cost of a tile class
+
+   ## @var staticCosts
+   # Per linear index, the cost of the static tile
+
+   ## @var corner
+   # (col, row) of the lower right corner
+
+   ## @var lines
+   # Per linear index, the points of its line (see GetLine), None until
+   # the line is first needed
+
+   ## @var stepCosts
+   # Per linear index, an array of the cost of each step of its line
+   # over the static tiles, once the line is built
+
+   ## @var lineCosts
+   # Per linear index, the cost of its whole line over the static tiles,
+   # once the line is built
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import State, MakeInitialState
+   from Puzzle import Puzzle
+   from Relevance import FreezeIrrelevantWrigglers
+   from SearchNode import SearchNode
+   from Agent import Agent
+   import time
+
+   ## Costs that tell every tile class apart, to check the corrections
+   SAMPLE_COSTS = {'e': 1, 's': 3, 'o': 2}
+
+   ## Price the line from a position the long way, looking up every tile
+   def DigestLine(state, start, GetCostOfClass):
+      line = BresLine(start, state.puzzle.GetLowerRightCornerPosition())
+      numCols = state.puzzle.numCols
+      cost = 0
+      for step in xrange(len(line) - 1):
+         ((startCol, startRow), (endCol, endRow)) = line[step:step + 2]
+         colFirst = [(startCol, row) for row in xrange(startRow + 1, endRow + 1)] + \
+            [(col, endRow) for col in xrange(startCol + 1, endCol + 1)]
+         rowFirst = [(col, startRow) for col in xrange(startCol + 1, endCol + 1)] + \
+            [(endCol, row) for row in xrange(startRow + 1, endRow + 1)]
+         cost += min([sum([GetCostOfClass(state.GetTileClass(row * numCols + col)) \
+                           for (col, row) in path]) \
+                      for path in (colFirst, rowFirst)])
+      return cost
+
+   ## Check every line of a state against the one digested tile by tile
+   def CheckLines(state, label):
+      layout = state.puzzle.GetLayout()
+      table = state.GetCornerLines()
+      sampleTable = CornerLineTable(layout, state.staticClasses, \
+                                    SAMPLE_COSTS.get)
+      occupancy = state.GetOccupancy()
+      corner = state.puzzle.GetLowerRightCornerPosition()
+      for index in xrange(layout.numCells):
+         if layout.walls[index]:
+            continue
+         position = layout.GetPosition(index)
+         if table.GetLength(index) != len(BresLine(position, corner)) - 1:
+            print "FAILED " + label + " length of " + str(position)
+         if table.GetLineCost(index, occupancy) != \
+               state.DigestBresLines(position, corner):
+            print "FAILED " + label + " cost of " + str(position)
+         if sampleTable.GetLineCost(index, occupancy) != \
+               DigestLine(state, position, SAMPLE_COSTS.get):
+            print "FAILED " + label + " sample cost of " + str(position)
+
+   for puzzleFile in ('puzz1.pz', 'puzz2.pz', 'puzz.pz', 'puzz4.pz'):
+      puzz = ReadPuzzle(puzzleFile)
+      state = MakeInitialState(puzz, FindWrigglers(puzz))
+      CheckLines(state, puzzleFile)
+      # and again with the wrigglers somewhere else
+      root = SearchNode(state, None, None, 0)
+      for code in state.Actions()[:2]:
+         CheckLines(Agent(root).GenerateSearchNodeFromMove(root, code).state, \
+                    puzzleFile + ' moved')
+
+      # the lookup against the line digested tile by tile
+      table = state.GetCornerLines()
+      occupancy = state.GetOccupancy()
+      layout = state.puzzle.GetLayout()
+      corner = state.puzzle.GetLowerRightCornerPosition()
+      blueHead = state.bodies[state.indexOfBlue][0]
+      headPos = layout.GetPosition(blueHead)
+      startTime = time.time()
+      for count in xrange(1000):
+         state.DigestBresLines(headPos, corner)
+      digestSeconds = time.time() - startTime
+      startTime = time.time()
+      for count in xrange(1000):
+         table.GetLineCost(blueHead, occupancy)
+      lookupSeconds = time.time() - startTime
+      print puzzleFile + ': 1000 lines from the blue head ' + \
+         ('%.4f' % digestSeconds) + ' s digested, ' + \
+         ('%.4f' % lookupSeconds) + ' s looked up'
+
+   # wriggler 1 is walled off on the right and frozen into the static
+   # tiles, which are priced with the walls
+   puzz = Puzzle()
+   puzz.numCols = 5
+   puzz.numRows = 3
+   puzz.numWrigglers = 2
+   puzz.puzzle = ['R', '0', 'e', 'x', 'e', \
+                  'e', 'e', 'e', 'x', 'D', \
+                  'e', 'e', 'e', 'x', '1']
+   (wrigglers, report) = FreezeIrrelevantWrigglers(puzz, FindWrigglers(puzz))
+   state = MakeInitialState(puzz, wrigglers)
+   if len(state.bodies) != 1:
+      print "FAILED to freeze the walled off wriggler"
+   CheckLines(state, 'frozen')
+
+   # lines are only built when asked for, and only hold their points
+   for size in (80, 160):
+      puzz = Puzzle()
+      puzz.numCols = size
+      puzz.numRows = size
+      puzz.numWrigglers = 1
+      puzz.puzzle = [Puzzle.WALL_SQUARE if index % 7 == 3 and \
+                     (index // size) % 5 != 0 else Puzzle.EMPTY_SQUARE \
+                     for index in xrange(size * size)]
+      startTime = time.time()
+      state = State(puzz, ((0,),), (0,))
+      table = state.GetCornerLines()
+      other = State(puzz, ((size + 1,),), (0,))
+      if other.GetCornerLines() is not table:
+         print "FAILED to share the table of a layout"
+      stateSeconds = time.time() - startTime
+      numBuilt = len([line for line in table.lines if line is not None])
+      if numBuilt != 2:
+         print "FAILED to build the lines lazily: " + str(numBuilt)
+      startTime = time.time()
+      for index in xrange(size * size):
+         table.GetLine(index)
+      print str(size) + 'x' + str(size) + ': two states in ' + \
+         ('%.3f' % stateSeconds) + ' s, every line in ' + \
+         ('%.3f' % (time.time() - startTime)) + ' s'
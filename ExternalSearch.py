@@ -0,0 +1,430 @@
+## @file ExternalSearch.py
+# @author Mathew Anderson
+# @brief Disk-backed breadth-first search with delayed duplicate detection.
+# Only one block of states is ever held in memory. Each layer of the
+# search is a file of fixed-width packed states, sorted and free of
+# duplicates. The next layer is produced by streaming the current one
+# from disk, writing its children in sorted runs, then merging the runs
+# while dropping duplicates. Every move can be undone, so a child of
+# layer d can only already be in layer d - 1 or d itself. Merging against
+# those two files, which are sorted as well, removes the rest.
+#
+# The layer files are kept until the search ends. The solution path is
+# recovered backwards from the goal: each predecessor is a neighbour
+# found, by binary search, in the layer before.
+#
+# Records are expanded straight from their bodies, without building a
+# State: a state's heuristic is of no use to a breadth-first search.
+
+import heapq
+import os
+import shutil
+import struct
+import tempfile
+
+from Move import Move
+
+## The ExternalBreadthFirstSearch class runs a breadth-first search from
+# a state with its layers on disk.
+class ExternalBreadthFirstSearch:
+
+   ## Default number of states sorted in memory per run file
+   DEFAULT_RUN_RECORDS = 1 << 20
+
+   ## Number of records read from a file at once
+   READ_RECORDS = 4096
+
+   ## Ctor prepares a search
+   # @param rootState The initial State
+   # @param scratchDir (optional) Directory the layer files are kept in,
+   # the system's temporary directory if None. They go in a new directory
+   # of their own within it, which is removed when the search ends.
+   # @param runRecords States sorted in memory per run file
+   # @param report (optional) File object layer sizes are written to,
+   # None to write them nowhere
+   # @param budget (optional) SearchBudget charged for every expansion
+   def __init__(self, rootState, scratchDir=None, \
+                runRecords=DEFAULT_RUN_RECORDS, report=None, budget=None):
+      self.rootState = rootState
+      self.scratchDir = scratchDir
+      self.workDir = None
+      self.runRecords = runRecords
+      self.report = report
+      self.budget = budget
+      self.totalStates = 0
+      self.numLayers = 0
+
+      # every state has the same number of cells per wriggler
+      self.bodyLengths = [len(body) for body in rootState.bodies]
+      numCells = rootState.puzzle.GetLayout().numCells
+      if numCells <= 0xffff:
+         cellFormat = 'H'
+      else:
+         cellFormat = 'I'
+      # big-endian, so byte order is the order of the cell numbers
+      self.recordFormat = struct.Struct('>' + \
+                                        cellFormat * sum(self.bodyLengths))
+      self.recordSize = self.recordFormat.size
+
+   ## Pack the bodies of a state into a fixed-width record
+   # @param bodies Tuple of bodies, as State.bodies
+   def PackState(self, bodies):
+      cells = []
+      for body in bodies:
+         cells.extend(body)
+      return self.recordFormat.pack(*cells)
+
+   ## Rebuild the bodies of a state from its record
+   # @param record Packed state
+   def UnpackState(self, record):
+      cells = self.recordFormat.unpack(record)
+      bodies = []
+      start = 0
+      for length in self.bodyLengths:
+         bodies.append(cells[start:start + length])
+         start += length
+      return tuple(bodies)
+
+   ## Search breadth-first for a goal state
+   # @return List of packed move codes from the root to the nearest
+   # goal, None if no reachable state is a goal
+   def Solve(self):
+      self.workDir = tempfile.mkdtemp(prefix='wriggler_bfs_', \
+                                      dir=self.scratchDir)
+      try:
+         return self.Search()
+      finally:
+         shutil.rmtree(self.workDir, True)
+         self.workDir = None
+
+   ## Run the layers of the search, see Solve
+   def Search(self):
+      rootRecord = self.PackState(self.rootState.bodies)
+      layerFiles = [self.GetLayerPath(0)]
+      self.WriteRecords(layerFiles[0], [rootRecord])
+      self.totalStates = 1
+      self.numLayers = 1
+      self.Report(0, 1, 1)
+      if self.rootState.BlueWrigglerInLowerRightCorner():
+         return []
+
+      depth = 0
+      while True:
+         runFiles = self.ExpandLayer(layerFiles[depth], depth)
+         previousFiles = layerFiles[max(0, depth - 1):depth + 1]
+         layerFiles.append(self.GetLayerPath(depth + 1))
+         (numStates, numGenerated, goalRecord) = \
+            self.MergeLayer(runFiles, previousFiles, layerFiles[-1])
+         for runFile in runFiles:
+            os.remove(runFile)
+         depth += 1
+         self.totalStates += numStates
+         if numStates > 0:
+            self.numLayers += 1
+         self.Report(depth, numStates, numGenerated)
+
+         if goalRecord is not None:
+            return self.TracePath(goalRecord, layerFiles)
+         if numStates == 0:
+            if self.report is not None:
+               self.report.write("Reachable states: " + \
+                                 str(self.totalStates) + "\n")
+            return None
+
+   ## Expand every state of a layer into sorted run files of children
+   # @param layerFile Path of the layer to expand
+   # @param depth Depth of the layer
+   # @return List of the run file paths
+   def ExpandLayer(self, layerFile, depth):
+      runFiles = []
+      children = []
+      for record in self.ReadRecords(layerFile):
+         for (code, childBodies) in \
+               self.GetChildren(self.UnpackState(record)):
+            children.append(self.PackState(childBodies))
+         if self.budget is not None:
+            self.budget.Charge(1)
+         if len(children) >= self.runRecords:
+            runFiles.append(self.WriteRun(children, depth, len(runFiles)))
+            children = []
+      if children or not runFiles:
+         runFiles.append(self.WriteRun(children, depth, len(runFiles)))
+      return runFiles
+
+   ## Sort a block of records and write it, without duplicates, to a run
+   # @param records List of packed states
+   # @param depth Depth of the layer being expanded
+   # @param runNumber Number of the run within the layer
+   # @return Path of the run file
+   def WriteRun(self, records, depth, runNumber):
+      records.sort()
+      runFile = os.path.join(self.workDir, \
+                             'run%05d_%05d.dat' % (depth, runNumber))
+      self.WriteRecords(runFile, UniqueRecords(records))
+      return runFile
+
+   ## Merge the runs of a layer into the next layer file, dropping
+   # duplicates and states already in the previous layers
+   # @param runFiles Paths of the sorted runs
+   # @param previousFiles Paths of the layers a child may already be in
+   # @param layerFile Path of the layer file to write
+   # @return (states in the new layer, records in the runs, record of
+   # a goal state in the new layer or None)
+   def MergeLayer(self, runFiles, previousFiles, layerFile):
+      counts = {'generated': 0, 'states': 0}
+      goalRecords = []
+
+      merged = heapq.merge(*[self.ReadRecords(runFile, counts) \
+                             for runFile in runFiles])
+      previous = heapq.merge(*[self.ReadRecords(previousFile) \
+                               for previousFile in previousFiles])
+
+      def NewRecords():
+         for record in SubtractRecords(UniqueRecords(merged), previous):
+            counts['states'] += 1
+            if not goalRecords and self.IsGoalRecord(record):
+               goalRecords.append(record)
+            yield record
+
+      self.WriteRecords(layerFile, NewRecords())
+      goalRecord = None
+      if goalRecords:
+         goalRecord = goalRecords[0]
+      return (counts['states'], counts['generated'], goalRecord)
+
+   ## Determine if a packed state has the blue wriggler in the corner
+   # @param record Packed state
+   def IsGoalRecord(self, record):
+      corner = self.rootState.puzzle.GetLayout().numCells - 1
+      blueBody = self.UnpackState(record)[self.rootState.indexOfBlue]
+      return blueBody[0] == corner or blueBody[-1] == corner
+
+   ## Recover the moves to a goal by walking back through the layers
+   # @param goalRecord Packed goal state, in the last layer
+   # @param layerFiles Paths of every layer, root first
+   # @return List of packed move codes from the root
+   def TracePath(self, goalRecord, layerFiles):
+      codes = []
+      bodies = self.UnpackState(goalRecord)
+      for depth in xrange(len(layerFiles) - 2, -1, -1):
+         layer = open(layerFiles[depth], 'rb')
+         try:
+            # moves can be undone, so the predecessor is a neighbour
+            for (ignored, predecessor) in self.GetChildren(bodies):
+               if self.FindRecord(layer, self.PackState(predecessor)):
+                  break
+            else:
+               raise Exception("External search lost a layer of its path!")
+         finally:
+            layer.close()
+
+         for (code, childBodies) in self.GetChildren(predecessor):
+            if childBodies == bodies:
+               codes.append(code)
+               break
+         bodies = predecessor
+
+      codes.reverse()
+      return codes
+
+   ## Return the bodies of every child of a state with its move, in the
+   # order State.Actions lists the moves
+   # @param bodies The bodies of the state to expand, as State.bodies
+   # @return List of (packed move code, bodies of the child)
+   def GetChildren(self, bodies):
+      root = self.rootState
+      layout = root.puzzle.GetLayout()
+      neighbours = layout.neighbours
+      staticClasses = root.staticClasses
+      occupied = set()
+      for body in bodies:
+         occupied.update(body)
+
+      children = []
+      for (bodyIndex, body) in enumerate(bodies):
+         tailNum = root.tailIds[bodyIndex]
+         headBase = layout.moves.Encode(tailNum, Move.HEAD, 0)
+         tailBase = layout.moves.Encode(tailNum, Move.TAIL, 0)
+         for newHead in neighbours[body[0]]:
+            if staticClasses[newHead] == 'e' and newHead not in occupied:
+               children.append((headBase + newHead, bodies[:bodyIndex] + \
+                                ((newHead,) + body[:-1],) + \
+                                bodies[bodyIndex + 1:]))
+         for newTail in neighbours[body[-1]]:
+            if staticClasses[newTail] == 'e' and newTail not in occupied:
+               children.append((tailBase + newTail, bodies[:bodyIndex] + \
+                                (body[1:] + (newTail,),) + \
+                                bodies[bodyIndex + 1:]))
+      return children
+
+   ## Binary search a sorted layer file for a record
+   # @param layer Open layer file
+   # @param record Packed state to look for
+   def FindRecord(self, layer, record):
+      layer.seek(0, os.SEEK_END)
+      low = 0
+      high = layer.tell() // self.recordSize
+      while low < high:
+         middle = (low + high) // 2
+         layer.seek(middle * self.recordSize)
+         found = layer.read(self.recordSize)
+         if found == record:
+            return True
+         if found < record:
+            low = middle + 1
+         else:
+            high = middle
+      return False
+
+   ## Write records to a file
+   # @param path Path of the file
+   # @param records Iterable of packed states
+   def WriteRecords(self, path, records):
+      outFile = open(path, 'wb')
+      try:
+         block = []
+         for record in records:
+            block.append(record)
+            if len(block) >= ExternalBreadthFirstSearch.READ_RECORDS:
+               outFile.write(''.join(block))
+               block = []
+         outFile.write(''.join(block))
+      finally:
+         outFile.close()
+
+   ## Read the records of a file in order, a block at a time
+   # @param path Path of the file
+   # @param counts (optional) Dictionary whose 'generated' entry is
+   # increased per record read
+   def ReadRecords(self, path, counts=None):
+      recordSize = self.recordSize
+      inFile = open(path, 'rb')
+      try:
+         while True:
+            block = inFile.read(recordSize * \
+                                ExternalBreadthFirstSearch.READ_RECORDS)
+            if not block:
+               break
+            if counts is not None:
+               counts['generated'] += len(block) // recordSize
+            for start in xrange(0, len(block), recordSize):
+               yield block[start:start + recordSize]
+      finally:
+         inFile.close()
+
+   ## Return the path of a layer file
+   # @param depth Depth of the layer
+   def GetLayerPath(self, depth):
+      return os.path.join(self.workDir, 'layer%05d.dat' % depth)
+
+   ## Write the size of a layer to the report, if there is one
+   # @param depth Depth of the layer
+   # @param numStates States new to the layer
+   # @param numGenerated Distinct children per run that made it up
+   def Report(self, depth, numStates, numGenerated):
+      if self.report is None:
+         return
+      self.report.write("Layer " + str(depth) + ": " + str(numStates) \
+                        + " states (" + str(numGenerated) + " generated, " \
+                        + str(self.totalStates) + " in total)\n")
+      self.report.flush()
+
+   ## Summarise the search
+   def __str__(self):
+      return "External search: " + str(self.totalStates) + \
+         " distinct states in " + str(self.numLayers) + " layers"
+
+   ## @var rootState
+   # The initial State, also providing everything the states share
+
+   ## @var scratchDir
+   # Directory the search makes its own directory in, None for the
+   # system's temporary directory
+
+   ## @var workDir
+   # Directory holding the layer and run files while the search runs
+
+   ## @var runRecords
+   # States sorted in memory per run file
+
+   ## @var report
+   # File object layer sizes are written to, None for no report
+
+   ## @var budget
+   # SearchBudget charged for every expansion, None for no limits
+
+   ## @var totalStates
+   # Number of distinct states found so far
+
+   ## @var numLayers
+   # Number of layers holding states found so far, the root's included
+
+   ## @var bodyLengths
+   # Number of cells of each wriggler, in State.bodies order
+
+   ## @var recordFormat
+   # struct.Struct packing the cells of every wriggler
+
+   ## @var recordSize
+   # Bytes per packed state
+
+## Drop repeats from a sorted iterable
+# @param records Sorted iterable
+def UniqueRecords(records):
+   last = None
+   for record in records:
+      if record != last:
+         yield record
+         last = record
+
+## Drop from a sorted iterable the items of another sorted iterable
+# @param records Sorted iterable without repeats
+# @param excluded Sorted iterable of items to drop
+def SubtractRecords(records, excluded):
+   excluded = iter(excluded)
+   current = next(excluded, None)
+   for record in records:
+      while current is not None and current < record:
+         current = next(excluded, None)
+      if current != record:
+         yield record
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import State, MakeInitialState
+   import sys
+
+   if list(SubtractRecords(UniqueRecords('aabdd'), 'bcd')) != ['a']:
+      print "FAILED to merge away duplicates"
+
+   puzz = ReadPuzzle('puzz2.pz')
+   initialState = MakeInitialState(puzz, FindWrigglers(puzz))
+   # tiny runs exercise the merge
+   scratchDir = tempfile.mkdtemp()
+   # a file of the caller's, which the search must leave alone
+   open(os.path.join(scratchDir, 'layer00000.dat'), 'w').close()
+   search = ExternalBreadthFirstSearch(initialState, scratchDir, \
+                                       runRecords=50, report=sys.stdout)
+   codes = search.Solve()
+   if os.listdir(scratchDir) != ['layer00000.dat']:
+      print "FAILED to clean up the scratch directory alone"
+   shutil.rmtree(scratchDir)
+   # puzz2 takes 14 moves
+   if codes is None or len(codes) != 14:
+      print "FAILED to find an optimal solution of puzz2"
+   else:
+      print puzz.GetLayout().moves.FormatAll(codes)
+   print str(search)
+   if search.numLayers != 15:
+      print "FAILED to count the layers of puzz2"
+
+   # the children match the moves State.Actions lists
+   for (code, bodies) in search.GetChildren(initialState.bodies):
+      child = State(puzz, bodies, initialState.tailIds, initialState)
+      if code not in initialState.Actions() or \
+            child.GetStateKey() != bodies:
+         print "FAILED to generate the children of the root"
+   if len(search.GetChildren(initialState.bodies)) != \
+         len(initialState.Actions()):
+      print "FAILED to generate every child of the root"
@@ -0,0 +1,266 @@
+## @file FrontierSearch.py
+# @author Mathew Anderson
+# @brief Best-first search without a closed list (Korf's frontier search).
+# Every move can be undone by moving the other end of the same wriggler
+# back onto the cell it vacated, so the state space is an undirected
+# graph. Each open node remembers which of its moves lead to a neighbour
+# that was already generated (its used-operator bits). Expanding a node
+# skips those moves and marks the move back on every child, so a closed
+# node is never generated again and need not be stored at all.
+#
+# Without parent pointers the path is recovered by divide and conquer:
+# every open node carries a relay, a state roughly half way along its
+# best path. Once the goal is found, the search is repeated from the
+# start to the relay and from the relay to the goal, down to single
+# moves. Those subproblems know their cost, so their relay is exactly
+# the middle layer.
+#
+# Expanding each state once with its optimal cost requires a consistent
+# heuristic, as State's is (one move changes the distance of the blue
+# ends to the corner by at most one) and as GetTargetDistance is.
+
+import heapq
+from Move import Move
+from WrigglerMover import MoveBody
+
+## Return the used-operator bit of moving one end of a wriggler
+# @param bodyIndex Position of the wriggler in State.bodies
+# @param pieceMoved Move.HEAD or Move.TAIL
+# @param fromCell Linear index of the end being moved
+# @param toCell Linear index it moves to
+# @param numCols Width of the puzzle
+def GetOperatorBit(bodyIndex, pieceMoved, fromCell, toCell, numCols):
+   delta = toCell - fromCell
+   if delta == -numCols:
+      direction = 0
+   elif delta == numCols:
+      direction = 1
+   elif delta == -1:
+      direction = 2
+   else:
+      direction = 3
+   return 1 << ((((bodyIndex << 1) | pieceMoved) << 2) | direction)
+
+## Lower bound on the moves from one state to another: each move shifts
+# every cell of one wriggler by one step, so a wriggler needs at least
+# as many moves as its farthest cell is from where it has to be.
+# @param state The state to measure from
+# @param target The state to reach
+def GetTargetDistance(state, target):
+   numCols = state.puzzle.numCols
+   distance = 0
+   for (body, targetBody) in zip(state.bodies, target.bodies):
+      farthest = 0
+      for (cell, targetCell) in zip(body, targetBody):
+         (row, col) = divmod(cell, numCols)
+         (targetRow, targetCol) = divmod(targetCell, numCols)
+         cellDistance = abs(row - targetRow) + abs(col - targetCol)
+         if cellDistance > farthest:
+            farthest = cellDistance
+      distance += farthest
+   return distance
+
+## The FrontierSearch class finds optimal move sequences keeping only
+# the open list in memory.
+class FrontierSearch:
+
+   ## Ctor prepares a search from a state
+   # @param agent Agent used to generate successor states
+   # @param useHeuristic True for A*, False for breadth-first search
+   # @param budget (optional) SearchBudget charged for every expansion
+   def __init__(self, agent, useHeuristic=True, budget=None):
+      self.agent = agent
+      self.useHeuristic = useHeuristic
+      self.budget = budget
+      self.expanded = 0
+      self.peakOpen = 0
+
+   ## Find an optimal sequence of moves from a state to a goal state
+   # (the blue wriggler in the lower right corner)
+   # @param startState The initial State
+   # @return List of packed move codes, None if there is no solution
+   def Solve(self, startState):
+      if self.useHeuristic:
+         heuristic = lambda state: state.GetHeuristicCost()
+      else:
+         heuristic = lambda state: 0
+      found = self.Search(startState, \
+                          lambda state: state.BlueWrigglerInLowerRightCorner(), \
+                          heuristic, None)
+      if found is None:
+         return None
+
+      (goalState, cost, relayState, relayCost) = found
+      return self.FindPath(startState, relayState, relayCost) + \
+         self.FindPath(relayState, goalState, cost - relayCost)
+
+   ## Find the moves between two states a known number of moves apart
+   # @param startState State to start from
+   # @param targetState State to reach
+   # @param cost Number of moves of an optimal path between them
+   # @return List of packed move codes
+   def FindPath(self, startState, targetState, cost):
+      if cost == 0:
+         return []
+
+      targetKey = targetState.GetStateKey()
+      if cost == 1:
+         for (code, child, reverseBit) in self.GenerateChildren(startState, 0):
+            if child.GetStateKey() == targetKey:
+               return [code]
+         raise Exception("Frontier search lost a move of its path!")
+
+      found = self.Search(startState, \
+                          lambda state: state.GetStateKey() == targetKey, \
+                          lambda state: GetTargetDistance(state, targetState), \
+                          cost // 2)
+      (goalState, goalCost, relayState, relayCost) = found
+      return self.FindPath(startState, relayState, relayCost) + \
+         self.FindPath(relayState, targetState, cost - relayCost)
+
+   ## Best-first search keeping only the open list
+   # @param startState State to start from
+   # @param IsGoal Function telling if a State is a goal
+   # @param Heuristic Consistent lower bound on the moves left from a State
+   # @param relayDepth Moves from the start at which relays are recorded,
+   # None to record the last state whose cost so far is at most its
+   # heuristic (about half way when the total is unknown)
+   # @return (goal state, its cost, relay state, its cost), or None
+   def Search(self, startState, IsGoal, Heuristic, relayDepth):
+      # open entries are [cost so far, used-operator bits, state,
+      # relay state, relay cost], by state key
+      openEntries = {}
+      heap = []
+      serial = 0
+
+      startKey = startState.GetStateKey()
+      openEntries[startKey] = [0, 0, startState, startState, 0]
+      heapq.heappush(heap, (Heuristic(startState), 0, serial, startKey))
+
+      while heap:
+         (fCost, negCost, ignored, key) = heapq.heappop(heap)
+         entry = openEntries.get(key)
+         # skip entries expanded already or reached more cheaply since
+         if entry is None or entry[0] != -negCost:
+            continue
+         (cost, usedBits, state, relayState, relayCost) = entry
+         if IsGoal(state):
+            return (state, cost, relayState, relayCost)
+
+         # the state is closed by forgetting it
+         del openEntries[key]
+         self.expanded += 1
+         if self.budget is not None:
+            self.budget.Charge(1)
+
+         childCost = cost + 1
+         for (code, child, reverseBit) in \
+               self.GenerateChildren(state, usedBits):
+            childKey = child.GetStateKey()
+            childEntry = openEntries.get(childKey)
+            if childEntry is not None:
+               # the move back to this state is now used
+               childEntry[1] |= reverseBit
+               if childEntry[0] <= childCost:
+                  continue
+               childEntry[0] = childCost
+               childEntry[2] = child
+            else:
+               childEntry = [childCost, reverseBit, child, None, None]
+               openEntries[childKey] = childEntry
+
+            # the relay is this child or the one on the way to it
+            childHeuristic = Heuristic(child)
+            if (relayDepth is None and childCost <= childHeuristic) or \
+                  childCost == relayDepth:
+               childEntry[3] = child
+               childEntry[4] = childCost
+            else:
+               childEntry[3] = relayState
+               childEntry[4] = relayCost
+
+            serial += 1
+            heapq.heappush(heap, (childCost + childHeuristic, -childCost, \
+                                  serial, childKey))
+
+         if len(openEntries) > self.peakOpen:
+            self.peakOpen = len(openEntries)
+
+      return None
+
+   ## Generate the children of a state not reached by a used operator
+   # @param state The state to expand
+   # @param usedBits Used-operator bits of the state
+   # @return List of (packed move code, child State, used-operator bit
+   # of the move from the child back to state)
+   def GenerateChildren(self, state, usedBits):
+      layout = state.puzzle.GetLayout()
+      moves = layout.moves
+      numCols = layout.numCols
+      children = []
+      for code in state.Actions():
+         bodyIndex = state.GetBodyIndex(moves.GetTailNumber(code))
+         pieceMoved = moves.GetPieceMoved(code)
+         destIndex = moves.GetDestIndex(code)
+         body = state.bodies[bodyIndex]
+         if pieceMoved == Move.HEAD:
+            movedEnd = body[0]
+         else:
+            movedEnd = body[-1]
+         if usedBits & GetOperatorBit(bodyIndex, pieceMoved, movedEnd, \
+                                      destIndex, numCols):
+            continue
+
+         # the other end steps back onto the cell it just vacated
+         if pieceMoved == Move.HEAD:
+            reverseBit = GetOperatorBit(bodyIndex, Move.TAIL, body[-2], \
+                                        body[-1], numCols)
+         else:
+            reverseBit = GetOperatorBit(bodyIndex, Move.HEAD, body[1], \
+                                        body[0], numCols)
+
+         newBody = MoveBody(body, pieceMoved, destIndex, layout)
+         child = self.agent.GenerateState(state, bodyIndex, newBody)
+         children.append((code, child, reverseBit))
+      state.ReleaseOccupancy()
+      return children
+
+   ## Summarise the work done
+   def __str__(self):
+      return "Frontier search: " + str(self.expanded) + " expansions, " \
+         + "peak open list " + str(self.peakOpen) + " states"
+
+   ## @var agent
+   # Agent used to generate successor states
+
+   ## @var useHeuristic
+   # True to order by cost plus heuristic (A*), False by cost alone
+
+   ## @var budget
+   # SearchBudget charged for every expansion, None for no limits
+
+   ## @var expanded
+   # Number of states expanded, over all searches
+
+   ## @var peakOpen
+   # Largest number of states held at once
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from Agent import Agent
+
+   puzz = ReadPuzzle('puzz2.pz')
+   initialState = MakeInitialState(puzz, FindWrigglers(puzz))
+   agent = Agent(SearchNode(initialState, None, None, 0))
+   for useHeuristic in (True, False):
+      search = FrontierSearch(agent, useHeuristic)
+      codes = search.Solve(initialState)
+      # puzz2 takes 14 moves
+      if codes is None or len(codes) != 14:
+         print "FAILED to find an optimal solution of puzz2"
+      else:
+         print puzz.GetLayout().moves.FormatAll(codes)
+      print str(search)
@@ -0,0 +1,98 @@
+## @file HeuristicCache.py
+# @author Mathew Anderson
+# @brief Bounded, least-recently-used cache of heuristic values.
+# Many states share the blue wriggler's position and the tiles the
+# heuristic looks at, so their heuristic only needs computing once.
+
+from collections import OrderedDict
+
+## The HeuristicCache class maps a configuration key to a heuristic value,
+# forgetting the least recently used entries beyond a maximum size.
+class HeuristicCache:
+
+   ## Default number of entries kept
+   DEFAULT_MAX_ENTRIES = 200000
+
+   ## Ctor starts out empty
+   # @param maxEntries Most entries kept, 0 turns caching off
+   def __init__(self, maxEntries=DEFAULT_MAX_ENTRIES):
+      self.maxEntries = maxEntries
+      self.entries = OrderedDict()
+      self.hits = 0
+      self.misses = 0
+      self.evictions = 0
+
+   ## Return the cached value of a key, or None if there is none
+   # @param key Hashable configuration key
+   def Get(self, key):
+      value = self.entries.pop(key, None)
+      if value is None:
+         self.misses += 1
+      else:
+         # re-inserting makes it the most recently used
+         self.entries[key] = value
+         self.hits += 1
+      return value
+
+   ## Store the value of a key, evicting the least recently used entry
+   # if the cache is full
+   # @param key Hashable configuration key
+   # @param value Value to remember, must not be None
+   def Put(self, key, value):
+      if self.maxEntries > 0:
+         self.entries[key] = value
+         if len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+   ## Change the most entries kept, evicting any excess
+   # @param maxEntries Most entries kept, 0 turns caching off
+   def SetMaxEntries(self, maxEntries):
+      self.maxEntries = maxEntries
+      while len(self.entries) > maxEntries:
+         self.entries.popitem(last=False)
+         self.evictions += 1
+
+   ## Return the fraction of lookups that found a value
+   def GetHitRate(self):
+      lookups = self.hits + self.misses
+      if lookups == 0:
+         return 0.0
+      return float(self.hits) / lookups
+
+   ## Summarise the cache statistics
+   def __str__(self):
+      return "Heuristic cache: " + str(self.hits) + " hits, " \
+         + str(self.misses) + " misses (" \
+         + ("%.1f" % (100.0 * self.GetHitRate())) + "% hit rate), " \
+         + str(self.evictions) + " evictions, " \
+         + str(len(self.entries)) + "/" + str(self.maxEntries) + " entries"
+
+   ## @var maxEntries
+   # Most entries kept
+
+   ## @var entries
+   # Cached values, least recently used first
+
+   ## @var hits
+   # Number of lookups that found a value
+
+   ## @var misses
+   # Number of lookups that found nothing
+
+   ## @var evictions
+   # Number of entries dropped to stay within maxEntries
+
+if __name__ == "__main__":
+   cache = HeuristicCache(2)
+   cache.Put('a', 1)
+   cache.Put('b', 2)
+   # touching 'a' leaves 'b' as the least recently used
+   cache.Get('a')
+   cache.Put('c', 3)
+
+   if cache.Get('b') is not None:
+      print "FAILED to evict the least recently used entry"
+   if cache.Get('a') != 1 or cache.Get('c') != 3:
+      print "FAILED to keep the recently used entries"
+   print str(cache)
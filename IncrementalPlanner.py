@@ -0,0 +1,725 @@
+## @file IncrementalPlanner.py
+# @author Mathew Anderson
+# @brief Lifelong Planning A*: re-solving a puzzle after its walls change.
+# Editing a wall or two leaves most of the state space, and most of the
+# distances found by the last search, as they were. LPA* keeps them
+# between solves. Every state has g, its distance from the start as last
+# computed, and rhs, the least g of a neighbour plus one, which is what g
+# should be. States where the two differ are queued on the key
+# (min(g, rhs) + h, min(g, rhs)) and made consistent in key order, as A*
+# would expand them, until the goal is consistent and no queued key is
+# below its own. The first solve does about the work of A*. After an
+# edit only the states next to the changed cells get a new rhs, and only
+# the differences that spread from them are repaired.
+#
+# Moves are undone by moving the other end back, so every move is also a
+# move the other way and the neighbours of a state are both its
+# predecessors and its successors. The goal is a state of its own, after
+# every state with the blue wriggler in the lower right corner, which
+# lead to it at no cost.
+#
+# States are indexed by the body of each wriggler, so an edit only looks
+# through the bodies the wrigglers have been seen in, far fewer than the
+# states, to find those it touches. A new wall removes the states with a
+# body on it; only the neighbours whose rhs came from one of them need a
+# new rhs. A wall taken away gives the states with an end next to it new
+# moves. Rather than generating them all, each such state is queued as
+# (RELAX, state) on its own key, a bound on the keys of the states the
+# new moves reach, and its moves are only followed if that comes up
+# before the goal is settled. Even those entries are put off: the states
+# are kept by their g, and a single (RELAX_ALL, g) entry per distance, on
+# the bound (g, g), queues them when it comes up.
+#
+# An edit changes the heuristic of the states whose blue wriggler looks
+# at an edited tile. Only their heuristics are forgotten, and only their
+# queue entries replaced, on bounds that leave the heuristic out; the
+# rest of the queue keeps its keys. A state's heuristic is worked out
+# when its entry comes to the top.
+#
+# A new wall across the last solution can leave every state below it to
+# repair, twice over, which costs more than searching again. When the
+# states that may need repairing outnumber the expansions of the last
+# solve from scratch, the planner starts afresh instead. Only walls and
+# empty tiles can be edited, and never under the wrigglers of the start.
+
+import heapq
+import time
+
+from Puzzle import Puzzle
+from Move import Move
+from State import State, MakeInitialState
+from SearchNode import SearchNode
+from SearchResult import SearchResult
+from SearchBudget import SearchBudget, SearchStopped
+from Solvability import ProveUnsolvable
+
+## Stands in for an infinite g or rhs
+INFINITY = float('inf')
+
+## The state standing for every goal state
+GOAL = 'goal'
+
+## Tags a queue entry standing for the new moves of a consistent state
+RELAX = 'relax'
+
+## Tags a queue entry standing for the RELAX entries of every state of a
+# distance
+RELAX_ALL = 'relax all'
+
+## The IncrementalPlanner class solves a puzzle, then solves it again
+# after each edit, reusing what it found.
+class IncrementalPlanner:
+
+   ## Ctor prepares the search of a puzzle
+   # @param puzzle The puzzle, with its wrigglers
+   # @param wrigglers The wrigglers found in it
+   def __init__(self, puzzle, wrigglers):
+      rootState = MakeInitialState(puzzle, wrigglers)
+      self.staticPuzzle = rootState.puzzle
+      self.tailIds = rootState.tailIds
+      self.start = rootState.bodies
+      self.budget = None
+      self.expanded = 0
+      self.totalExpanded = 0
+      self.numRestarts = 0
+      self.SetStaticPuzzle(self.staticPuzzle)
+      self.Reset()
+
+   ## Forget every distance, to search from scratch
+   def Reset(self):
+      self.g = {}
+      self.rhs = {self.start: 0}
+      self.gCounts = {}
+      self.heuristics = {}
+      self.statesByBody = [{} for body in self.start]
+      self.goalStates = set()
+      self.queue = []
+      self.queued = {}
+      self.relaxing = {}
+      self.solutionPath = None
+      self.freshExpanded = None
+      self.resetExpanded = self.totalExpanded
+      self.IndexState(self.start)
+      self.Enqueue(self.start)
+
+   ## Switch to a static puzzle
+   # @param staticPuzzle The puzzle without the wrigglers that move
+   def SetStaticPuzzle(self, staticPuzzle):
+      self.staticPuzzle = staticPuzzle
+      self.layout = staticPuzzle.GetLayout()
+      self.rootState = State(staticPuzzle, self.start, self.tailIds)
+      self.staticClasses = self.rootState.staticClasses
+      self.corner = self.layout.numCells - 1
+
+   ## Note a state under the body of each of its wrigglers. A state may
+   # be noted more than once.
+   # @param bodies The bodies of the state
+   def IndexState(self, bodies):
+      for (bodyIndex, body) in enumerate(bodies):
+         self.statesByBody[bodyIndex].setdefault(body, []).append(bodies)
+
+   ## Return the states noted under some bodies of one wriggler
+   # @param bodyIndex Position of the wriggler in the bodies
+   # @param bodyList The bodies of the wriggler
+   # @return Set of the bodies of the states
+   def GetStatesWithBodies(self, bodyIndex, bodyList):
+      statesByBody = self.statesByBody[bodyIndex]
+      states = set()
+      for body in bodyList:
+         states.update(statesByBody.get(body, ()))
+      return states
+
+   ## Return the heuristic of a state
+   # @param bodies The bodies of the state, or GOAL
+   def GetHeuristic(self, bodies):
+      if bodies is GOAL:
+         return 0
+      heuristic = self.heuristics.get(bodies)
+      if heuristic is None:
+         heuristic = State(self.staticPuzzle, bodies, self.tailIds, \
+                           self.rootState).GetHeuristicCost()
+         self.heuristics[bodies] = heuristic
+      return heuristic
+
+   ## Determine if the blue wriggler is in the lower right corner
+   # @param bodies The bodies of the state
+   def IsGoal(self, bodies):
+      blueBody = bodies[self.rootState.indexOfBlue]
+      return blueBody[0] == self.corner or blueBody[-1] == self.corner
+
+   ## Return the states one move away from a state
+   # @param bodies The bodies of the state
+   # @return List of the bodies of each neighbour
+   def GetNeighbours(self, bodies):
+      neighbours = self.layout.neighbours
+      staticClasses = self.staticClasses
+      occupied = set()
+      for body in bodies:
+         occupied.update(body)
+
+      result = []
+      for (bodyIndex, body) in enumerate(bodies):
+         for newHead in neighbours[body[0]]:
+            if staticClasses[newHead] == 'e' and newHead not in occupied:
+               result.append(bodies[:bodyIndex] + \
+                             ((newHead,) + body[:-1],) + bodies[bodyIndex + 1:])
+         for newTail in neighbours[body[-1]]:
+            if staticClasses[newTail] == 'e' and newTail not in occupied:
+               result.append(bodies[:bodyIndex] + \
+                             (body[1:] + (newTail,),) + bodies[bodyIndex + 1:])
+      return result
+
+   ## Return the neighbours of a state that move an end of a wriggler off
+   # some cells, by moving its other end
+   # @param bodies The bodies of the state
+   # @param cells Set of the linear indices of the cells
+   # @return List of the bodies of each such neighbour
+   def GetNeighboursLeaving(self, bodies, cells):
+      neighbours = self.layout.neighbours
+      staticClasses = self.staticClasses
+      result = []
+      for (bodyIndex, body) in enumerate(bodies):
+         if body[-1] in cells:
+            for newHead in neighbours[body[0]]:
+               if staticClasses[newHead] == 'e' and \
+                     not [other for other in bodies if newHead in other]:
+                  result.append(bodies[:bodyIndex] + \
+                                ((newHead,) + body[:-1],) + \
+                                bodies[bodyIndex + 1:])
+         if body[0] in cells:
+            for newTail in neighbours[body[-1]]:
+               if staticClasses[newTail] == 'e' and \
+                     not [other for other in bodies if newTail in other]:
+                  result.append(bodies[:bodyIndex] + \
+                                (body[1:] + (newTail,),) + \
+                                bodies[bodyIndex + 1:])
+      return result
+
+   ## Return the states leading to a state, with the cost of the move
+   # @param bodies The bodies of the state, or GOAL
+   def GetPredecessors(self, bodies):
+      if bodies is GOAL:
+         return [(goalState, 0) for goalState in self.goalStates]
+      return [(neighbour, 1) for neighbour in self.GetNeighbours(bodies)]
+
+   ## Return the states a state leads to, with the cost of the move
+   # @param bodies The bodies of the state, or GOAL
+   def GetSuccessors(self, bodies):
+      if bodies is GOAL:
+         return []
+      successors = [(neighbour, 1) for neighbour in \
+                    self.GetNeighbours(bodies)]
+      if self.IsGoal(bodies):
+         self.goalStates.add(bodies)
+         successors.append((GOAL, 0))
+      return successors
+
+   ## Return the queue key of a state. Until its heuristic is worked out
+   # the heuristic is taken as 0, which gives a key no larger than its own.
+   # @param bodies The bodies of the state, GOAL, or a (RELAX, state) or
+   # (RELAX_ALL, distance) entry
+   def GetKey(self, bodies):
+      if bodies[0] is RELAX_ALL:
+         return (bodies[1], bodies[1])
+      if bodies[0] is RELAX:
+         bodies = bodies[1]
+      distance = min(self.g.get(bodies, INFINITY), \
+                     self.rhs.get(bodies, INFINITY))
+      if bodies is GOAL:
+         return (distance, distance)
+      return (distance + self.heuristics.get(bodies, 0), distance)
+
+   ## Queue a state on its current key, replacing any older entry
+   # @param bodies The bodies of the state, GOAL, or a (RELAX, state) or
+   # (RELAX_ALL, distance) entry
+   def Enqueue(self, bodies):
+      key = self.GetKey(bodies)
+      self.queued[bodies] = key
+      heapq.heappush(self.queue, (key, bodies))
+
+   ## Work out the rhs of a state again from its predecessors
+   # @param bodies The bodies of the state, or GOAL
+   def RecomputeRhs(self, bodies):
+      if bodies == self.start:
+         return
+      best = INFINITY
+      for (predecessor, cost) in self.GetPredecessors(bodies):
+         distance = self.g.get(predecessor, INFINITY) + cost
+         if distance < best:
+            best = distance
+      self.SetRhs(bodies, best)
+
+   ## Set the rhs of a state, queueing it exactly when it is inconsistent
+   # @param bodies The bodies of the state, or GOAL
+   # @param rhs The new rhs
+   def SetRhs(self, bodies, rhs):
+      if rhs == INFINITY:
+         self.rhs.pop(bodies, None)
+      else:
+         if bodies not in self.rhs and bodies not in self.g and \
+               bodies is not GOAL:
+            self.IndexState(bodies)
+         self.rhs[bodies] = rhs
+      self.UpdateQueue(bodies)
+
+   ## Set the g of a state, keeping count of the states at each distance
+   # @param bodies The bodies of the state, or GOAL
+   # @param distance The new g
+   def SetG(self, bodies, distance):
+      oldDistance = self.g.get(bodies, INFINITY)
+      if oldDistance != INFINITY:
+         self.gCounts[oldDistance] -= 1
+      if distance == INFINITY:
+         self.g.pop(bodies, None)
+      else:
+         self.g[bodies] = distance
+         self.gCounts[distance] = self.gCounts.get(distance, 0) + 1
+
+   ## Queue a state if it is inconsistent, drop it from the queue if not.
+   # Entries dropped or replaced stay in the heap and are skipped.
+   # @param bodies The bodies of the state, or GOAL
+   def UpdateQueue(self, bodies):
+      if self.g.get(bodies, INFINITY) != self.rhs.get(bodies, INFINITY):
+         self.Enqueue(bodies)
+      else:
+         self.queued.pop(bodies, None)
+
+   ## Return the smallest live entry of the queue, dropping stale ones.
+   # A state whose key was only a bound is queued again on its real key,
+   # so heuristics are only worked out for the states that come up.
+   # @return (key, bodies), None if the queue is empty
+   def PeekQueue(self):
+      while self.queue:
+         (key, bodies) = self.queue[0]
+         if self.queued.get(bodies) != key:
+            heapq.heappop(self.queue)
+         elif bodies is not GOAL and bodies[0] is not RELAX_ALL and \
+               self.GetQueuedState(bodies) not in self.heuristics:
+            heapq.heappop(self.queue)
+            self.GetHeuristic(self.GetQueuedState(bodies))
+            self.Enqueue(bodies)
+         else:
+            return (key, bodies)
+      return None
+
+   ## Return the state of a queue entry
+   # @param entry The bodies of the state, or a (RELAX, state) entry
+   def GetQueuedState(self, entry):
+      if entry[0] is RELAX:
+         return entry[1]
+      return entry
+
+   ## Make states consistent in key order until the goal's distance is
+   # known
+   def ComputeShortestPath(self):
+      budget = self.budget
+      while True:
+         top = self.PeekQueue()
+         if top is None:
+            break
+         (key, bodies) = top
+         # goal states lead to the goal at no cost, so one tied with it
+         # must still be made consistent first
+         if key > self.GetKey(GOAL) and \
+               self.g.get(GOAL, INFINITY) == self.rhs.get(GOAL, INFINITY):
+            break
+         heapq.heappop(self.queue)
+         del self.queued[bodies]
+         if bodies[0] is RELAX_ALL:
+            for relaxed in self.relaxing.pop(bodies[1]):
+               if relaxed in self.g:
+                  self.Enqueue((RELAX, relaxed))
+            continue
+         self.expanded += 1
+         if budget is not None:
+            budget.Charge(1)
+
+         if bodies[0] is RELAX:
+            # follow the new moves of a state, unless it lost its
+            # distance since, when all its moves are followed once it
+            # gets one again
+            distance = self.g.get(bodies[1])
+            if distance is None:
+               continue
+            for (successor, cost) in self.GetSuccessors(bodies[1]):
+               if distance + cost < self.rhs.get(successor, INFINITY):
+                  self.SetRhs(successor, distance + cost)
+            continue
+
+         oldG = self.g.get(bodies, INFINITY)
+         newG = self.rhs.get(bodies, INFINITY)
+         if oldG > newG:
+            # overconsistent: its distance drops, and so may theirs
+            self.SetG(bodies, newG)
+            for (successor, cost) in self.GetSuccessors(bodies):
+               if newG + cost < self.rhs.get(successor, INFINITY) and \
+                     successor != self.start:
+                  self.SetRhs(successor, newG + cost)
+         else:
+            # underconsistent: its distance is unknown again, and so is
+            # that of the states whose rhs it gave
+            self.SetG(bodies, INFINITY)
+            for (successor, cost) in self.GetSuccessors(bodies):
+               if self.rhs.get(successor, INFINITY) == oldG + cost:
+                  self.RecomputeRhs(successor)
+            self.UpdateQueue(bodies)
+
+   ## Return the moves of a shortest path to the goal
+   # @return List of packed move codes, None if the goal is unreachable
+   def ExtractMoves(self):
+      goalDistance = self.g.get(GOAL, INFINITY)
+      if goalDistance == INFINITY:
+         return None
+      # a goal state as close as the goal, then back along decreasing g
+      bodies = min(self.goalStates, \
+                   key=lambda goalState: self.g.get(goalState, INFINITY))
+      path = [bodies]
+      while bodies != self.start:
+         bodies = min(self.GetNeighbours(bodies), \
+                      key=lambda neighbour: self.g.get(neighbour, INFINITY))
+         path.append(bodies)
+      path.reverse()
+      self.solutionPath = frozenset(path)
+      return [self.GetMoveBetween(path[index], path[index + 1]) \
+              for index in xrange(len(path) - 1)]
+
+   ## Return the packed code of the move from one state to a neighbour
+   # @param before The bodies before the move
+   # @param after The bodies after the move
+   def GetMoveBetween(self, before, after):
+      for bodyIndex in xrange(len(before)):
+         oldBody = before[bodyIndex]
+         newBody = after[bodyIndex]
+         if oldBody != newBody:
+            if newBody[1:] == oldBody[:-1]:
+               return self.layout.moves.Encode(self.tailIds[bodyIndex], \
+                                               Move.HEAD, newBody[0])
+            return self.layout.moves.Encode(self.tailIds[bodyIndex], \
+                                            Move.TAIL, newBody[-1])
+      raise Exception("States are not one move apart!")
+
+   ## Return the root SearchNode of the puzzle as it is now
+   def GetRootNode(self):
+      return SearchNode(self.rootState, None, None, 0)
+
+   ## Find a shortest solution of the puzzle as it is now
+   # @return SearchResult of the search, its node the goal SearchNode
+   # with the path from a fresh root, and its expansions those of this
+   # solve only
+   def Solve(self):
+      budget = self.budget
+      if budget is None:
+         budget = SearchBudget()
+      budget.Start()
+      self.expanded = 0
+      reason = ProveUnsolvable(self.rootState)
+      if reason is not None:
+         return SearchResult(SearchResult.UNSOLVABLE, None, 0, \
+                             budget.GetElapsed(), reason)
+      try:
+         self.ComputeShortestPath()
+         if self.freshExpanded is None:
+            self.freshExpanded = self.totalExpanded + self.expanded - \
+               self.resetExpanded
+      except SearchStopped as stop:
+         # the queue is left as it was, the next solve carries on
+         return SearchResult(stop.status, None, self.expanded, \
+                             budget.GetElapsed())
+      finally:
+         self.totalExpanded += self.expanded
+
+      codes = self.ExtractMoves()
+      if codes is None:
+         return SearchResult(SearchResult.UNSOLVABLE, None, self.expanded, \
+                             budget.GetElapsed())
+      return SearchResult(SearchResult.SOLVED, self.ReplayFromRoot(codes), \
+                          self.expanded, \
+                          budget.GetElapsed())
+
+   ## Build the path of SearchNodes a list of moves makes from the root
+   # @param codes List of packed move codes
+   # @return The last SearchNode
+   def ReplayFromRoot(self, codes):
+      # imported here, Agent imports most of the searches
+      from Agent import Agent
+      agent = Agent(self.GetRootNode())
+      agent.usePartialOrder = False
+      return agent.ReplayMoves(codes)
+
+   ## Change tiles of the puzzle and repair the distances they affect
+   # @param edits Dictionary from linear index to the new tile,
+   # Puzzle.WALL_SQUARE or Puzzle.EMPTY_SQUARE
+   def EditTiles(self, edits):
+      startCells = set()
+      for body in self.start:
+         startCells.update(body)
+      walled = set()
+      opened = set()
+      for (index, tile) in edits.items():
+         if index in startCells:
+            raise Exception("Can not edit a tile under a wriggler!")
+         oldTile = self.staticPuzzle.puzzle[index]
+         if oldTile not in (Puzzle.WALL_SQUARE, Puzzle.EMPTY_SQUARE) or \
+               tile not in (Puzzle.WALL_SQUARE, Puzzle.EMPTY_SQUARE):
+            raise Exception("Only walls and empty tiles can be edited!")
+         if oldTile != tile:
+            if tile == Puzzle.WALL_SQUARE:
+               walled.add(index)
+            else:
+               opened.add(index)
+      if not walled and not opened:
+         return
+
+      # states on a new wall vanish, and their neighbours lose a move.
+      # A state with a body across a wall only neighbours states on the
+      # wall too, so only those with an end on it have neighbours left,
+      # those moving that end off it.
+      removed = set()
+      endRemoved = set()
+      for (bodyIndex, statesByBody) in enumerate(self.statesByBody):
+         walledBodies = [body for body in statesByBody \
+                         if not walled.isdisjoint(body)]
+         removed.update(self.GetStatesWithBodies(bodyIndex, walledBodies))
+         endRemoved.update(self.GetStatesWithBodies(bodyIndex, \
+            [body for body in walledBodies \
+             if body[0] in walled or body[-1] in walled]))
+         for body in walledBodies:
+            del statesByBody[body]
+      affected = set()
+      for bodies in endRemoved:
+         if bodies in self.g:
+            distance = self.g[bodies] + 1
+            for neighbour in self.GetNeighboursLeaving(bodies, walled):
+               if self.rhs.get(neighbour) == distance:
+                  affected.add(neighbour)
+      affected.difference_update(removed)
+      restart = self.IsRepairTooCostly(removed, affected)
+
+      # the scans only depend on the size of the puzzle, and the cache is
+      # keyed on the tiles the heuristic looks at, so both stay right
+      oldLayout = self.layout
+      newPuzzle = Puzzle()
+      newPuzzle.CopyFrom(self.staticPuzzle)
+      newPuzzle.layout = None
+      for (index, tile) in edits.items():
+         newPuzzle.SetIndex(index, tile)
+      newLayout = newPuzzle.GetLayout()
+      newLayout.scannedCells = oldLayout.scannedCells
+      newLayout.inspectedCells = oldLayout.inspectedCells
+      newLayout.heuristicCache = oldLayout.heuristicCache
+      self.SetStaticPuzzle(newPuzzle)
+      if restart:
+         self.numRestarts += 1
+         self.Reset()
+         return
+
+      for bodies in removed:
+         self.SetG(bodies, INFINITY)
+         self.rhs.pop(bodies, None)
+         self.heuristics.pop(bodies, None)
+         self.queued.pop(bodies, None)
+         self.queued.pop((RELAX, bodies), None)
+         self.goalStates.discard(bodies)
+
+      # the heuristic of a state changes if its blue wriggler looks at an
+      # edited tile; its entries go back in the queue on bounds
+      edited = walled | opened
+      layout = self.layout
+      corner = self.staticPuzzle.GetLowerRightCornerPosition()
+      indexOfBlue = self.rootState.indexOfBlue
+      lookingBodies = []
+      for body in self.statesByBody[indexOfBlue]:
+         inspected = self.rootState.GetInspectedCells( \
+            layout.GetPosition(body[0]), layout.GetPosition(body[-1]), corner)
+         if not edited.isdisjoint(inspected):
+            lookingBodies.append(body)
+      for bodies in self.GetStatesWithBodies(indexOfBlue, lookingBodies):
+         if self.heuristics.pop(bodies, None) is not None:
+            for entry in (bodies, (RELAX, bodies)):
+               if entry in self.queued:
+                  self.Enqueue(entry)
+
+      for bodies in affected:
+         self.RecomputeRhs(bodies)
+
+      # states with an end next to a tile no longer a wall gain a move
+      # onto it
+      nextToOpened = set()
+      for index in opened:
+         nextToOpened.update(layout.neighbours[index])
+      relaxed = set()
+      if nextToOpened:
+         for (bodyIndex, statesByBody) in enumerate(self.statesByBody):
+            endBodies = [body for body in statesByBody \
+                         if body[0] in nextToOpened or \
+                         body[-1] in nextToOpened]
+            relaxed.update(self.GetStatesWithBodies(bodyIndex, endBodies))
+      for bodies in relaxed:
+         distance = self.g.get(bodies)
+         if distance is not None:
+            self.relaxing.setdefault(distance, []).append(bodies)
+            if (RELAX_ALL, distance) not in self.queued:
+               self.Enqueue((RELAX_ALL, distance))
+      self.RecomputeRhs(GOAL)
+
+   ## Determine if repairing the distances after a new wall would likely
+   # cost more than searching again. Unless the wall cuts the last
+   # solution, the goal keeps its distance and the repair stays below it.
+   # Otherwise every state at least as far as the nearest one losing its
+   # rhs may need repairing.
+   # @param removed The states on the new walls
+   # @param affected The other states whose rhs came from one of them
+   def IsRepairTooCostly(self, removed, affected):
+      if self.freshExpanded is None or not affected:
+         return False
+      if self.solutionPath is not None and \
+            self.solutionPath.isdisjoint(removed):
+         return False
+      nearest = min([self.rhs[bodies] for bodies in affected])
+      projected = sum([count for (distance, count) \
+                       in self.gCounts.iteritems() if distance >= nearest])
+      return projected > self.freshExpanded
+
+   ## Summarise the work done
+   def __str__(self):
+      return "Incremental planner: " + str(self.expanded) + \
+         " expansions in the last solve, " + str(self.totalExpanded) + \
+         " in all, " + str(len(self.g)) + " states kept, " + \
+         str(self.numRestarts) + " restarts"
+
+   ## @var staticPuzzle
+   # The puzzle as it is now, without the wrigglers that move
+
+   ## @var layout
+   # Static tables of staticPuzzle
+
+   ## @var rootState
+   # The start State in staticPuzzle
+
+   ## @var staticClasses
+   # Tile classes of staticPuzzle, as in State.TILE_CLASSES
+
+   ## @var corner
+   # Linear index of the lower right corner
+
+   ## @var tailIds
+   # Tail numbers of the wrigglers that move
+
+   ## @var start
+   # Bodies of the start state
+
+   ## @var budget
+   # SearchBudget of each solve, None for no limits
+
+   ## @var g
+   # Per state, its distance from the start as last computed, if finite
+
+   ## @var gCounts
+   # Per distance, the number of states with that g
+
+   ## @var rhs
+   # Per state, the least g of a predecessor plus the move, if finite
+
+   ## @var heuristics
+   # Per state, its heuristic in staticPuzzle
+
+   ## @var statesByBody
+   # Per wriggler, a dictionary from each body it has been seen in to
+   # the states noted with it, possibly more than once and including
+   # states since forgotten
+
+   ## @var goalStates
+   # States seen with the blue wriggler in the corner
+
+   ## @var solutionPath
+   # Set of the states of the last solution found, None if there is none
+
+   ## @var queue
+   # Heap of (key, entry), including entries since replaced or dropped
+
+   ## @var queued
+   # Per inconsistent state, and per (RELAX, state) and (RELAX_ALL,
+   # distance) entry, its key in the queue
+
+   ## @var relaxing
+   # Per distance, the states with that g whose new moves a (RELAX_ALL,
+   # distance) entry will queue
+
+   ## @var expanded
+   # Number of states made consistent by the last solve
+
+   ## @var totalExpanded
+   # Number of states made consistent by all solves
+
+   ## @var freshExpanded
+   # Number of states made consistent by the first solve after the last
+   # reset, None until it is done
+
+   ## @var resetExpanded
+   # totalExpanded at the last reset
+
+   ## @var numRestarts
+   # Number of edits after which the planner started afresh
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from Agent import Agent
+
+   ## Return a fresh A* search of a puzzle with one tile changed
+   def SolveFresh(puzz, index, tile):
+      edited = Puzzle()
+      edited.CopyFrom(puzz)
+      edited.layout = None
+      edited.SetIndex(index, tile)
+      rootNode = SearchNode(MakeInitialState(edited, FindWrigglers(edited)), \
+                            None, None, 0)
+      return Agent(rootNode).AStarSearch()
+
+   ## Return the cost of a search's solution, None if it found none
+   def GetCost(result):
+      if result.IsSolved():
+         return result.node.pathCost
+      return None
+
+   ## Edit a tile, solve again and compare with a fresh A* search
+   # @return The tile that was there before
+   def EditAndCompare(planner, puzz, index, tile, label):
+      oldTile = planner.staticPuzzle.puzzle[index]
+      numRestarts = planner.numRestarts
+      startTime = time.time()
+      planner.EditTiles({index: tile})
+      result = planner.Solve()
+      seconds = time.time() - startTime
+      fresh = SolveFresh(puzz, index, tile)
+      if GetCost(result) != GetCost(fresh) or \
+            (result.IsSolved() and not result.node.ContainsGoalState()):
+         print "FAILED, " + str(GetCost(result)) + " moves instead of " + \
+            str(GetCost(fresh))
+      print "   " + label + ": " + str(GetCost(result)) + " moves, " + \
+         str(result.expanded) + " expansions in " + ('%.3f' % seconds) + \
+         " s" + (numRestarts != planner.numRestarts and " restarted" or "") + \
+         ", afresh " + str(fresh.expanded) + " in " + \
+         ('%.3f' % fresh.seconds) + " s (" + \
+         ('%.1f' % (fresh.seconds / max(seconds, 1e-6))) + "x)"
+      return oldTile
+
+   # each edit is made, solved again and compared with solving afresh,
+   # then undone and compared again
+   edits = {'puzz.pz': [((1, 0), 'x'), ((1, 3), 'x'), ((0, 0), 'e')], \
+            'puzz2.pz': [((0, 0), 'e'), ((1, 4), 'e'), ((2, 2), 'x')], \
+            'puzz4.pz': [((5, 0), 'e'), ((0, 0), 'e'), ((3, 2), 'e')]}
+   for puzzleFile in ('puzz.pz', 'puzz2.pz', 'puzz4.pz'):
+      puzz = ReadPuzzle(puzzleFile)
+      planner = IncrementalPlanner(puzz, FindWrigglers(puzz))
+      result = planner.Solve()
+      print puzzleFile + ": " + str(GetCost(result)) + " moves, " + \
+         str(result.expanded) + " expansions in " + \
+         ('%.3f' % result.seconds) + " s"
+
+      for (position, tile) in edits[puzzleFile]:
+         index = planner.layout.GetIndex(position)
+         oldTile = EditAndCompare(planner, puzz, index, tile, \
+                                  str(position) + " -> " + tile)
+         EditAndCompare(planner, puzz, index, oldTile, "undone")
+      print "   " + str(planner)
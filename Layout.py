@@ -0,0 +1,132 @@
+## @file Layout.py
+# @author Mathew Anderson
+# @brief Static, per-puzzle precomputation shared by every world state.
+# Walls never move, so anything derived from them alone is computed once
+# here and shared by reference between all copies of a Puzzle.
+
+from Move import MoveTable
+from HeuristicCache import HeuristicCache
+
+## The Layout class stores tables derived from the static walls of a puzzle.
+# All cells are referred to by their linear index (row * numCols + col).
+class Layout:
+
+   ## Ctor builds every table from the walls of a puzzle
+   # @param puzzle The puzzle whose walls define the layout
+   def __init__(self, puzzle):
+      self.numCols = puzzle.numCols
+      self.numRows = puzzle.numRows
+      self.numCells = self.numCols * self.numRows
+      self.walls = [tile == puzzle.WALL_SQUARE for tile in puzzle.puzzle]
+      self.neighbours = self.BuildNeighbourTable()
+      self.components = self.BuildComponents()
+      self.moves = MoveTable(self.numCols, self.numCells)
+      self.scannedCells = {}
+      self.inspectedCells = {}
+      self.cornerLines = {}
+      self.heuristicCache = HeuristicCache()
+
+   ## For each cell, compute the in-bounds, non-wall cells one step away.
+   # Neighbours are listed in the order up, down, left, right.
+   def BuildNeighbourTable(self):
+      numCols = self.numCols
+      numCells = self.numCells
+      walls = self.walls
+      neighbours = []
+      for index in xrange(numCells):
+         col = index % numCols
+         candidates = []
+         if index >= numCols:
+            candidates.append(index - numCols)
+         if index + numCols < numCells:
+            candidates.append(index + numCols)
+         if col > 0:
+            candidates.append(index - 1)
+         if col < numCols - 1:
+            candidates.append(index + 1)
+         neighbours.append(tuple([cell for cell in candidates \
+                                    if not walls[cell]]))
+      return neighbours
+
+   ## Label every non-wall cell with the connected region of non-wall
+   # cells it belongs to. Nothing ever crosses from one region to another.
+   # @return Per cell, a region number (None for walls)
+   def BuildComponents(self):
+      components = [None] * self.numCells
+      neighbours = self.neighbours
+      nextComponent = 0
+      for start in xrange(self.numCells):
+         if self.walls[start] or components[start] is not None:
+            continue
+         components[start] = nextComponent
+         toVisit = [start]
+         while toVisit:
+            cell = toVisit.pop()
+            for neighbour in neighbours[cell]:
+               if components[neighbour] is None:
+                  components[neighbour] = nextComponent
+                  toVisit.append(neighbour)
+         nextComponent += 1
+      return components
+
+   ## Convert a (col, row) position into a linear index
+   # @param position (col, row) to convert
+   def GetIndex(self, position):
+      return position[1] * self.numCols + position[0]
+
+   ## Convert a linear index into a (col, row) position
+   # @param index Linear index to convert
+   def GetPosition(self, index):
+      return (index % self.numCols, index // self.numCols)
+
+   ## @var numCols
+   # Total number of columns (width) of the puzzle
+
+   ## @var numRows
+   # Total number of rows (height) of the puzzle
+
+   ## @var numCells
+   # Total number of tiles in the puzzle
+
+   ## @var walls
+   # Per cell, True if the tile is a wall
+
+   ## @var neighbours
+   # Per cell, a tuple of the linear indices of the in-bounds,
+   # non-wall tiles one step away
+
+   ## @var components
+   # Per cell, the number of the walled-off region it lies in
+
+   ## @var moves
+   # MoveTable packing and interning the moves of this puzzle
+
+   ## @var scannedCells
+   # Cache of the tiles each heuristic scan looks at, keyed by
+   # (scan kind, start position, end position)
+
+   ## @var inspectedCells
+   # Cache of all tiles the heuristic looks at, keyed by the
+   # (head position, tail position) of the blue wriggler
+
+   ## @var cornerLines
+   # CornerLineTable of the lines from the tiles to the lower right
+   # corner, keyed by the tile classes of the static puzzle
+
+   ## @var heuristicCache
+   # HeuristicCache of heuristic values, keyed by the blue wriggler's
+   # ends and the classes of the tiles the heuristic looks at
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   layout = Layout(ReadPuzzle('puzz1.pz'))
+
+   # (0, 0) is a wall, (1, 1) has all four neighbours
+   if layout.neighbours[1] != (5, 2):
+      print "FAILED neighbours of (1, 0): " + str(layout.neighbours[1])
+   if layout.neighbours[5] != (1, 9, 4, 6):
+      print "FAILED neighbours of (1, 1): " + str(layout.neighbours[5])
+   # (3, 2) is bounded by the wall at (3, 1) and the right edge
+   if layout.neighbours[11] != (15, 10):
+      print "FAILED neighbours of (3, 2): " + str(layout.neighbours[11])
+   print "Neighbour table has " + str(len(layout.neighbours)) + " cells"
@@ -41,12 +41,8 @@ class Move:
 
    ## Same as PrintMove but works with str operator
    def __str__(self):
-      outputString = str(self.tailNumber) + ' ' \
-                     + str(self.pieceMoved) + ' ' \
-                     + str(self.destColumn) + ' ' \
-                     + str(self.destRow) + '\n'
-
-      return outputString
+      return '%d %d %d %d\n' % \
+         (self.tailNumber, self.pieceMoved, self.destColumn, self.destRow)
 
 
    ## @var tailNumber
@@ -62,6 +58,78 @@ class Move:
    ## @var destRow
    # indicates the destination row of the piece being moved`
 
+## The MoveTable class packs moves into plain integers for one puzzle.
+# A move code is ((tailNumber * 2) + pieceMoved) * numCells + destination,
+# where the destination is the linear index of the tile moved to.
+# Codes are cheap to create, compare and store; Move objects and output
+# strings are only built (once) for the codes that need them.
+class MoveTable:
+
+   ## Ctor sets up empty intern tables for a puzzle of a given size
+   # @param numCols Total number of columns of the puzzle
+   # @param numCells Total number of tiles of the puzzle
+   def __init__(self, numCols, numCells):
+      self.numCols = numCols
+      self.numCells = numCells
+      self.moves = {}
+      self.lines = {}
+
+   ## Pack a move into an integer code
+   # @param tailNumber Uniquely identifies wriggler being moved
+   # @param pieceMoved Either Move.HEAD or Move.TAIL
+   # @param destIndex Linear index of the destination tile
+   def Encode(self, tailNumber, pieceMoved, destIndex):
+      return ((tailNumber << 1) | pieceMoved) * self.numCells + destIndex
+
+   ## Return the tail number of the wriggler moved by a code
+   def GetTailNumber(self, code):
+      return (code // self.numCells) >> 1
+
+   ## Return Move.HEAD or Move.TAIL for a code
+   def GetPieceMoved(self, code):
+      return (code // self.numCells) & 1
+
+   ## Return the linear index of the destination tile of a code
+   def GetDestIndex(self, code):
+      return code % self.numCells
+
+   ## Return the one Move instance representing a code
+   # @param code Packed move
+   def GetMove(self, code):
+      move = self.moves.get(code)
+      if move is None:
+         destIndex = code % self.numCells
+         move = Move(self.GetTailNumber(code), self.GetPieceMoved(code), \
+                     destIndex % self.numCols, destIndex // self.numCols)
+         self.moves[code] = move
+      return move
+
+   ## Return the solution file line for a code, as str(Move) would
+   # @param code Packed move
+   def Format(self, code):
+      line = self.lines.get(code)
+      if line is None:
+         line = str(self.GetMove(code))
+         self.lines[code] = line
+      return line
+
+   ## Return the solution file lines for a sequence of codes
+   # @param codes Iterable of packed moves
+   def FormatAll(self, codes):
+      return ''.join([self.Format(code) for code in codes])
+
+   ## @var numCols
+   # Total number of columns of the puzzle
+
+   ## @var numCells
+   # Total number of tiles of the puzzle, the radix of the destination
+
+   ## @var moves
+   # Interned Move instances, by code
+
+   ## @var lines
+   # Interned output lines, by code
+
 # Informal unit testing harness
 if __name__ == "__main__":
    # first try writing a None move to stdout
@@ -76,3 +144,12 @@ if __name__ == "__main__":
    outFile = open('movetest.out', 'w')
    m.printMove(outFile)
    outFile.close()
+
+   # Packed codes round trip through a 4x4 puzzle's table
+   table = MoveTable(4, 16)
+   code = table.Encode(3, Move.TAIL, 9)
+   if table.GetMove(code) is not table.GetMove(code):
+      print "FAILED to intern move"
+   if table.Format(code) != '3 1 1 2\n':
+      print "FAILED to format " + str(code) + ": " + table.Format(code)
+   print table.FormatAll([code, table.Encode(0, Move.HEAD, 15)])
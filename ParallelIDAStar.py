@@ -0,0 +1,363 @@
+## @file ParallelIDAStar.py
+# @author Mathew Anderson
+# @brief Iterative-deepening A* spread over a pool of processes.
+# Each iteration is a depth-first search of every path whose cost plus
+# heuristic stays within a bound; the next bound is the least value
+# that exceeded it. The subtrees of an iteration are independent, so
+# they are searched by several worker processes at once.
+#
+# The root is expanded a few moves deep and every path found becomes a
+# work item, the moves leading to it. Workers take items from a shared
+# queue. A worker seeing another one idle while the queue is empty
+# donates the untried moves of the shallowest node on its own stack as
+# new items, so the work keeps being spread when the subtrees turn out
+# lopsided. Each worker lowers a shared minimum of the values that
+# exceeded the bound, which becomes the bound of the next iteration.
+#
+# No solution costs less than the bound of the iteration that finds one,
+# since the iteration before searched every cheaper path, and none
+# costs more since all of them are cut off at the bound. So the first
+# solution any worker finds is optimal and all workers stop on it.
+
+import multiprocessing
+import Queue
+
+## Stands in for an unbounded next bound
+NO_BOUND = (1 << 31) - 1
+
+## The ParallelIDAStar class runs IDA* with a pool of worker processes
+class ParallelIDAStar:
+
+   ## Expansions between looks at the stop flag and idle workers
+   POLL_EXPANSIONS = 256
+
+   ## Ctor prepares a search from a root node
+   # @param agent Agent used to generate successor nodes
+   # @param rootNode The root SearchNode
+   # @param numWorkers (optional) Number of worker processes, one per
+   # processor by default
+   # @param splitDepth Moves from the root at which work items start
+   # @param budget (optional) SearchBudget charged for the expansions of
+   # every worker, and checked while waiting for them
+   def __init__(self, agent, rootNode, numWorkers=None, splitDepth=3, \
+                budget=None):
+      if numWorkers is None:
+         numWorkers = multiprocessing.cpu_count()
+      self.rootNode = rootNode
+      self.agent = agent
+      self.numWorkers = numWorkers
+      self.splitDepth = splitDepth
+      self.budget = budget
+      self.iterations = 0
+      self.numItems = 0
+      self.donations = multiprocessing.Value('i', 0)
+      self.expanded = multiprocessing.Value('l', 0)
+
+      self.workQueue = multiprocessing.Queue()
+      self.results = multiprocessing.Queue()
+      self.stopEvent = multiprocessing.Event()
+      # items queued or being searched in this iteration
+      self.outstanding = multiprocessing.Value('i', 0)
+      self.idleWorkers = multiprocessing.Value('i', 0)
+      self.nextBound = multiprocessing.Value('i', NO_BOUND)
+
+   ## Return the heuristic of a node
+   # @param searchNode The node to estimate
+   def GetHeuristic(self, searchNode):
+      return searchNode.state.GetHeuristicCost()
+
+   ## Return the nodes to expand from a node, leaving out moves that
+   # only undo the move that produced it
+   # @param searchNode The node being expanded
+   def GetChildren(self, searchNode):
+      children = []
+      grandparentKey = None
+      if searchNode.parent is not None:
+         grandparentKey = searchNode.parent.state.GetStateKey()
+      for code in self.agent.GetSearchableMoves(searchNode):
+         child = self.agent.GenerateSearchNodeFromMove(searchNode, code)
+         if child.state.GetStateKey() != grandparentKey:
+            children.append(child)
+      return children
+
+   ## Find an optimal path to a goal
+   # @return The goal SearchNode, None if there is none
+   def Solve(self):
+      if self.rootNode.ContainsGoalState():
+         return self.rootNode
+
+      # the split is searched breadth first, so a goal in it is optimal
+      items = [self.rootNode]
+      for depth in xrange(self.splitDepth):
+         nextItems = []
+         for node in items:
+            for child in self.GetChildren(node):
+               if child.ContainsGoalState():
+                  return child
+               nextItems.append(child)
+         items = nextItems
+      itemActions = [self.GetActions(node) for node in items]
+      self.numItems = len(itemActions)
+      if not itemActions:
+         return None
+
+      workers = [multiprocessing.Process(target=self.Work) \
+                 for index in xrange(self.numWorkers)]
+      for worker in workers:
+         worker.daemon = True
+         worker.start()
+
+      try:
+         bound = self.GetHeuristic(self.rootNode)
+         actions = None
+         while actions is None and bound != NO_BOUND:
+            self.iterations += 1
+            self.nextBound.value = NO_BOUND
+            self.outstanding.value = len(itemActions)
+            for item in itemActions:
+               self.workQueue.put((bound, item))
+            actions = self.WaitForIteration()
+            bound = self.nextBound.value
+      finally:
+         self.Stop(workers)
+
+      if actions is None:
+         return None
+      goalNode = self.rootNode
+      for action in actions:
+         goalNode = self.agent.GenerateSearchNodeFromMove(goalNode, action)
+      return goalNode
+
+   ## Wait until every item of an iteration is searched or a worker finds
+   # a solution
+   # @return The actions of the solution, None if the iteration has none
+   def WaitForIteration(self):
+      while self.outstanding.value > 0 and not self.stopEvent.is_set():
+         self.stopEvent.wait(0.01)
+         if self.budget is not None:
+            self.budget.Charge(self.expanded.value - self.budget.expanded)
+            self.budget.Check()
+      if self.stopEvent.is_set():
+         # the worker queues its solution before setting the flag
+         return self.results.get()
+      return None
+
+   ## Tell every worker to stop and wait for them
+   # @param workers The worker processes
+   def Stop(self, workers):
+      self.stopEvent.set()
+      # items nobody will take must not hold up this process at exit
+      self.workQueue.cancel_join_thread()
+      for worker in workers:
+         self.workQueue.put(None)
+      for worker in workers:
+         worker.join(1.0)
+         if worker.is_alive():
+            worker.terminate()
+            worker.join()
+
+   ## Return the actions leading from the root to a node
+   # @param searchNode The node to reach
+   def GetActions(self, searchNode):
+      return [node.action for node in searchNode.BackTrack()[1:]]
+
+   ## Body of a worker process: search items until told to stop
+   def Work(self):
+      self.workQueue.cancel_join_thread()
+      idle = False
+      while not self.stopEvent.is_set():
+         try:
+            item = self.workQueue.get(True, 0.01)
+         except Queue.Empty:
+            if not idle:
+               idle = True
+               self.AddToValue(self.idleWorkers, 1)
+            continue
+         if idle:
+            idle = False
+            self.AddToValue(self.idleWorkers, -1)
+         if item is None:
+            break
+
+         (bound, actions) = item
+         node = self.rootNode
+         for action in actions:
+            node = self.agent.GenerateSearchNodeFromMove(node, action)
+         goalNode = self.SearchItem(node, bound)
+         if goalNode is not None:
+            self.results.put(self.GetActions(goalNode))
+            self.stopEvent.set()
+         self.AddToValue(self.outstanding, -1)
+
+   ## Depth-first search below a node within a bound
+   # @param itemNode The node the work item starts at
+   # @param bound Largest cost plus heuristic searched
+   # @return The goal SearchNode, None if there is none within the bound
+   def SearchItem(self, itemNode, bound):
+      nextBound = NO_BOUND
+      expanded = 0
+      goalNode = None
+
+      itemCost = itemNode.pathCost + self.GetHeuristic(itemNode)
+      if itemCost > bound:
+         nextBound = itemCost
+         stack = []
+      elif itemNode.ContainsGoalState():
+         # donated children reach here untested
+         goalNode = itemNode
+         stack = []
+      else:
+         # each frame is a node and its children still to search
+         stack = [(itemNode, self.GetChildren(itemNode))]
+
+      while stack and goalNode is None:
+         children = stack[-1][1]
+         if not children:
+            stack.pop()
+            continue
+         child = children.pop()
+         childCost = child.pathCost + self.GetHeuristic(child)
+         if childCost > bound:
+            if childCost < nextBound:
+               nextBound = childCost
+            continue
+         if child.ContainsGoalState():
+            goalNode = child
+            break
+
+         stack.append((child, self.GetChildren(child)))
+         expanded += 1
+         if expanded % self.POLL_EXPANSIONS == 0:
+            # counted as it goes, for the budget
+            self.AddToValue(self.expanded, self.POLL_EXPANSIONS)
+            if self.stopEvent.is_set():
+               break
+            if self.idleWorkers.value > 0 and self.workQueue.empty():
+               self.Donate(stack, bound)
+
+      self.AddToValue(self.expanded, expanded % self.POLL_EXPANSIONS)
+      with self.nextBound.get_lock():
+         if nextBound < self.nextBound.value:
+            self.nextBound.value = nextBound
+      return goalNode
+
+   ## Give the untried children of the shallowest node with more than one
+   # of them to the other workers
+   # @param stack Frames of the depth-first search, root first
+   # @param bound Bound of the iteration
+   def Donate(self, stack, bound):
+      for (node, children) in stack:
+         if len(children) > 1:
+            # keep one to carry on with, counted before anyone can
+            # finish them
+            given = children[1:]
+            del children[1:]
+            self.AddToValue(self.outstanding, len(given))
+            self.AddToValue(self.donations, len(given))
+            for child in given:
+               self.workQueue.put((bound, self.GetActions(child)))
+            return
+
+   ## Add to a shared counter
+   # @param value The multiprocessing.Value
+   # @param amount Amount to add
+   def AddToValue(self, value, amount):
+      with value.get_lock():
+         value.value += amount
+
+   ## Summarise the work done
+   def __str__(self):
+      return "Parallel IDA*: " + str(self.numWorkers) + " workers, " + \
+         str(self.iterations) + " iterations, " + str(self.numItems) + \
+         " work items, " + str(self.donations.value) + " donated, " + \
+         str(self.expanded.value) + " expansions"
+
+   ## @var rootNode
+   # The root SearchNode
+
+   ## @var agent
+   # Agent used to generate successor nodes
+
+   ## @var numWorkers
+   # Number of worker processes
+
+   ## @var splitDepth
+   # Moves from the root at which work items start
+
+   ## @var budget
+   # SearchBudget charged for the workers' expansions, None for no limits
+
+   ## @var iterations
+   # Number of iterations run
+
+   ## @var numItems
+   # Number of work items each iteration starts with
+
+   ## @var donations
+   # Shared count of the work items donated by busy workers
+
+   ## @var expanded
+   # Shared count of the nodes expanded, over all iterations
+
+   ## @var workQueue
+   # Queue of (bound, actions from the root) work items, None to stop
+
+   ## @var results
+   # Queue of the actions of solutions found
+
+   ## @var stopEvent
+   # Set once a solution is found or the search ends
+
+   ## @var outstanding
+   # Shared count of the items queued or being searched this iteration
+
+   ## @var idleWorkers
+   # Shared count of the workers waiting for an item
+
+   ## @var nextBound
+   # Shared least cost plus heuristic that exceeded the bound
+
+if __name__ == "__main__":
+   from Puzzle import Puzzle
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from Agent import Agent
+
+   for (puzzleFile, optimalCost) in (('puzz1.pz', 11), ('puzz2.pz', 14)):
+      puzz = ReadPuzzle(puzzleFile)
+      rootNode = SearchNode(MakeInitialState(puzz, FindWrigglers(puzz)), \
+                            None, None, 0)
+      search = ParallelIDAStar(Agent(rootNode), rootNode, 3, 2)
+      goalNode = search.Solve()
+      if goalNode is None or goalNode.pathCost != optimalCost or \
+            not goalNode.ContainsGoalState():
+         print "FAILED to find an optimal solution of " + puzzleFile
+      print str(search)
+
+   # a donated child that is a goal is found by the worker searching it:
+   # the tail of the blue wriggler is a move from the corner, and the
+   # root's children, that goal among them, are given away
+   puzz = Puzzle()
+   puzz.numCols = 3
+   puzz.numRows = 3
+   puzz.puzzle = 'e e e e R 0 e e e'.split()
+   wrigglers = FindWrigglers(puzz)
+   puzz.numWrigglers = len(wrigglers)
+   rootNode = SearchNode(MakeInitialState(puzz, wrigglers), None, None, 0)
+   agent = Agent(rootNode)
+   search = ParallelIDAStar(agent, rootNode, 1, 1)
+   children = search.GetChildren(rootNode)
+   children.sort(key=lambda child: child.ContainsGoalState())
+   search.Donate([(rootNode, children)], 1)
+   found = []
+   for count in xrange(search.donations.value):
+      (bound, actions) = search.workQueue.get()
+      node = rootNode
+      for action in actions:
+         node = agent.GenerateSearchNodeFromMove(node, action)
+      found.append(search.SearchItem(node, bound))
+   if [node for node in found \
+       if node is not None and node.pathCost == 1] == []:
+      print "FAILED to find the goal among the donated children"
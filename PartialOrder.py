@@ -0,0 +1,65 @@
+## @file PartialOrder.py
+# @author Mathew Anderson
+# @brief Commutativity pruning of independent wriggler moves.
+# Moving wriggler A and then wriggler B reaches the same state as moving
+# B and then A whenever the two moves are independent. Only one of the two
+# orders needs to be searched; the canonical one moves the lower tail
+# number first.
+#
+# A move puts one end of a wriggler on its destination and frees the cell
+# of its other end. Two moves a then b of different wrigglers are
+# independent unless b steps onto the cell a freed: b could not have been
+# made before a, every other overlap is impossible because the cells
+# involved are occupied. So b is pruned after a when
+#    tail(b) < tail(a) and dest(b) != vacated(a)
+# Every sequence of moves can be reordered into one without such adjacent
+# pairs (the lexicographically least ordering of its independent moves),
+# which reaches the same state with the same number of moves, so pruning
+# keeps every search complete and optimal.
+
+from Move import Move
+
+## Return the footprint a move leaves for pruning the moves after it
+# @param body Cells of the moved wriggler before the move, head first
+# @param move The Move being applied to it
+# @return (tail number, linear index of the cell the move vacates)
+def GetMoveFootprint(body, move):
+   if move.pieceMoved == Move.HEAD:
+      vacated = body[-1]
+   else:
+      vacated = body[0]
+   return (move.tailNumber, vacated)
+
+## Drop the moves that commute with the move that produced a node and
+# belong before it in canonical order.
+# @param footprint Footprint of the move that produced the node,
+# None when nothing may be pruned (the root, or merged duplicates)
+# @param codes Packed move codes available at the node
+# @param moves MoveTable of the puzzle
+# @return The codes that remain to be searched
+def PruneCommutedMoves(footprint, codes, moves):
+   if footprint is None:
+      return codes
+
+   (lastTail, lastVacated) = footprint
+   keptCodes = []
+   for code in codes:
+      # later wrigglers, the same wriggler and moves into the vacated
+      # cell can not be reordered in front of the last move
+      if moves.GetTailNumber(code) >= lastTail or \
+            moves.GetDestIndex(code) == lastVacated:
+         keptCodes.append(code)
+   return keptCodes
+
+if __name__ == "__main__":
+   from Move import MoveTable
+   table = MoveTable(4, 16)
+
+   # wriggler 2 just vacated cell 5
+   codes = [table.Encode(1, Move.HEAD, 5), table.Encode(1, Move.TAIL, 9), \
+            table.Encode(2, Move.TAIL, 5), table.Encode(3, Move.HEAD, 0)]
+   kept = PruneCommutedMoves((2, 5), codes, table)
+
+   if kept != [codes[0], codes[2], codes[3]]:
+      print "FAILED to prune the independent move of wriggler 1"
+   print table.FormatAll(kept)
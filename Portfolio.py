@@ -0,0 +1,366 @@
+## @file Portfolio.py
+# @author Mathew Anderson
+# @brief Races several search strategies on the same puzzle.
+# Which search is fastest varies a lot from puzzle to puzzle. A portfolio
+# runs each configured strategy in its own process and takes the first
+# solution whose strategy guarantees the required optimality; the other
+# processes are then stopped. Every race is appended to a history file,
+# so the strategies that never win can be dropped from the portfolio.
+#
+# The optimality a strategy guarantees is the bound on its solution cost
+# relative to the optimal one: 1 for A* with the consistent heuristic of
+# State (or none), the frontier search and ID-DFTS, w for A* with the
+# heuristic weighted by w > 1, and none at all for greedy best-first.
+
+import multiprocessing
+import os
+import Queue
+import sys
+import time
+
+from Agent import Agent
+
+## The Strategy class describes one search of a portfolio
+class Strategy:
+
+   ## Searches a strategy may use
+   ALGORITHMS = ('A*', 'frontier', 'GBFS', 'ID-DFTS')
+
+   ## Heuristics a strategy may use: the one of State, or none at all
+   HEURISTICS = ('blue', 'none')
+
+   ## Ctor checks the configuration of a strategy
+   # @param algorithm One of ALGORITHMS
+   # @param heuristic One of HEURISTICS
+   # @param weight Weight of the heuristic, A* only
+   def __init__(self, algorithm, heuristic='blue', weight=1.0):
+      if algorithm not in self.ALGORITHMS:
+         raise Exception("Unknown search algorithm " + algorithm)
+      if heuristic not in self.HEURISTICS:
+         raise Exception("Unknown heuristic " + heuristic)
+      if algorithm == 'GBFS' and heuristic == 'none':
+         raise Exception("Greedy best-first search needs a heuristic")
+      if algorithm != 'A*' and weight != 1.0:
+         raise Exception("Only A* can weigh its heuristic")
+      self.algorithm = algorithm
+      self.heuristic = heuristic
+      self.weight = weight
+
+   ## Return the name the strategy is known by in the history
+   def GetName(self):
+      name = self.algorithm + ':' + self.heuristic
+      if self.weight != 1.0:
+         name += ':' + ('%g' % self.weight)
+      return name
+
+   ## Return how many times the optimal cost a solution may cost at most
+   def GetSuboptimalityBound(self):
+      if self.algorithm == 'GBFS':
+         return float('inf')
+      if self.algorithm == 'A*' and self.heuristic == 'blue':
+         return max(1.0, self.weight)
+      return 1.0
+
+   ## Run the strategy's search
+   # @param rootNode The root SearchNode
+   # @return SearchResult of the search
+   def Search(self, rootNode):
+      agent = Agent(rootNode)
+      if self.algorithm == 'A*':
+         if self.heuristic == 'none':
+            agent.heuristicWeight = 0
+         else:
+            agent.heuristicWeight = self.weight
+         return agent.AStarSearch()
+      if self.algorithm == 'frontier':
+         return agent.FrontierSearchSolve(self.heuristic == 'blue')
+      if self.algorithm == 'GBFS':
+         return agent.GreedyBestFirstGraphSearch()
+      return agent.IterativeDepthDTFS_Solve()
+
+   ## @var algorithm
+   # Name of the search, one of ALGORITHMS
+
+   ## @var heuristic
+   # Name of the heuristic, one of HEURISTICS
+
+   ## @var weight
+   # Weight of the heuristic in the A* order
+
+## Parse a list of strategies
+# @param text Comma separated algorithm[:heuristic[:weight]] entries,
+# e.g. "A*:blue,A*:blue:2,GBFS"
+# @return List of Strategy
+def ParseStrategies(text):
+   strategies = []
+   for entry in text.split(','):
+      fields = entry.strip().split(':')
+      if len(fields) > 2:
+         fields[2] = float(fields[2])
+      strategies.append(Strategy(*fields))
+   return strategies
+
+## The portfolio tried when none is configured
+DEFAULT_STRATEGIES = 'A*:blue,A*:blue:2,frontier:blue,GBFS:blue,ID-DFTS:none'
+
+## Search with one strategy and report the outcome. Runs in a process of
+# its own, which the portfolio may stop at any time.
+# @param strategy The Strategy to run
+# @param index Position of the strategy in the portfolio
+# @param rootNode The root SearchNode
+# @param results Queue taking (index, actions or None, seconds)
+def RunStrategy(strategy, index, rootNode, results):
+   # several searches print progress, which would only interleave
+   sys.stdout = open(os.devnull, 'w')
+   startTime = time.time()
+   goalNode = strategy.Search(rootNode).GetGoalNode()
+   actions = None
+   if goalNode is not None:
+      actions = [node.action for node in goalNode.BackTrack()[1:]]
+   results.put((index, actions, time.time() - startTime))
+
+## The Portfolio class races strategies in separate processes
+class Portfolio:
+
+   ## Seconds between two looks at the processes while waiting for a
+   # result
+   POLL_SECONDS = 0.1
+
+   ## Ctor configures the race
+   # @param strategies List of Strategy to race
+   # @param requiredBound Largest suboptimality bound accepted, 1.0 to
+   # accept optimal solutions only
+   # @param historyPath (optional) File each race is appended to
+   # @param timeLimit (optional) Seconds after which every strategy is
+   # stopped
+   def __init__(self, strategies, requiredBound=1.0, historyPath=None, \
+                timeLimit=None):
+      self.strategies = strategies
+      self.requiredBound = requiredBound
+      self.historyPath = historyPath
+      self.timeLimit = timeLimit
+      self.winner = None
+      self.outcomes = []
+      self.died = set()
+
+   ## Race the strategies from a root node. If none meeting the required
+   # bound succeeds, the cheapest solution of the others is taken instead.
+   # @param rootNode The root SearchNode
+   # @param puzzleName Name of the puzzle, for the history
+   # @return The goal SearchNode, None if no strategy found one
+   def Solve(self, rootNode, puzzleName):
+      results = multiprocessing.Queue()
+      processes = []
+      for (index, strategy) in enumerate(self.strategies):
+         process = multiprocessing.Process(target=RunStrategy, \
+                                           args=(strategy, index, \
+                                                 rootNode, results))
+         process.daemon = True
+         processes.append(process)
+      # None while running, else (actions or None, seconds)
+      self.outcomes = [None] * len(self.strategies)
+      self.died = set()
+      self.winner = None
+      fallback = None
+
+      startTime = time.time()
+      try:
+         for process in processes:
+            process.start()
+         running = len(processes)
+         while running > 0 and self.winner is None:
+            timeout = self.POLL_SECONDS
+            if self.timeLimit is not None:
+               remaining = self.timeLimit - (time.time() - startTime)
+               if remaining <= 0:
+                  break
+               timeout = min(timeout, remaining)
+            try:
+               (index, actions, seconds) = results.get(True, timeout)
+            except Queue.Empty:
+               # a process that died never posts its result
+               running -= self.CollectDead(processes, startTime)
+               continue
+            running -= 1
+            self.outcomes[index] = (actions, seconds)
+            if actions is None:
+               continue
+            if self.strategies[index].GetSuboptimalityBound() <= \
+                  self.requiredBound:
+               self.winner = index
+            elif fallback is None or \
+                  len(actions) < len(self.outcomes[fallback][0]):
+               fallback = index
+      finally:
+         self.Cancel(processes)
+
+      if self.winner is None:
+         self.winner = fallback
+      if self.historyPath is not None:
+         self.RecordHistory(puzzleName, time.time() - startTime)
+      if self.winner is None:
+         return None
+
+      # replay the winning moves in this process
+      agent = Agent(rootNode)
+      goalNode = rootNode
+      for action in self.outcomes[self.winner][0]:
+         goalNode = agent.GenerateSearchNodeFromMove(goalNode, action)
+      return goalNode
+
+   ## Count the strategies whose process ended without a result as
+   # failed. A process posts its result last and then exits normally,
+   # so one that exited normally still has its result on the way.
+   # @param processes The processes of the race
+   # @param startTime Wall clock time the race started
+   # @return Number of strategies newly counted as failed
+   def CollectDead(self, processes, startTime):
+      numDead = 0
+      for (index, process) in enumerate(processes):
+         if self.outcomes[index] is None and not process.is_alive() and \
+               process.exitcode not in (None, 0):
+            self.outcomes[index] = (None, time.time() - startTime)
+            self.died.add(index)
+            numDead += 1
+      return numDead
+
+   ## Stop every process still searching and wait for them all
+   # @param processes The processes of the race
+   def Cancel(self, processes):
+      for process in processes:
+         if process.is_alive():
+            process.terminate()
+      for process in processes:
+         if process.pid is not None:
+            process.join()
+
+   ## Return how a strategy's race ended, as written to the history
+   # @param index Position of the strategy
+   def DescribeOutcome(self, index):
+      outcome = self.outcomes[index]
+      if outcome is None:
+         return 'cancelled'
+      (actions, seconds) = outcome
+      if index in self.died:
+         return 'died@' + ('%.3f' % seconds)
+      if actions is None:
+         return 'failed@' + ('%.3f' % seconds)
+      return str(len(actions)) + '@' + ('%.3f' % seconds)
+
+   ## Append one line describing the race to the history file: time,
+   # puzzle, required bound, winner, its cost and seconds, then the
+   # outcome of every strategy, all tab separated
+   # @param puzzleName Name of the puzzle
+   # @param seconds Wall clock time of the race
+   def RecordHistory(self, puzzleName, seconds):
+      if self.winner is None:
+         winnerName = 'none'
+         cost = '-'
+      else:
+         winnerName = self.strategies[self.winner].GetName()
+         cost = str(len(self.outcomes[self.winner][0]))
+      fields = [time.strftime('%Y-%m-%d %H:%M:%S'), puzzleName, \
+                '%g' % self.requiredBound, winnerName, cost, \
+                '%.3f' % seconds]
+      for (index, strategy) in enumerate(self.strategies):
+         fields.append(strategy.GetName() + '=' + self.DescribeOutcome(index))
+      historyFile = open(self.historyPath, 'a')
+      historyFile.write('\t'.join(fields) + '\n')
+      historyFile.close()
+
+   ## Summarise the last race
+   def __str__(self):
+      strRep = ''
+      for (index, strategy) in enumerate(self.strategies):
+         strRep += strategy.GetName() + ': ' + self.DescribeOutcome(index)
+         if index == self.winner:
+            strRep += ' (winner)'
+         strRep += '\n'
+      return strRep.rstrip('\n')
+
+   ## @var strategies
+   # List of the Strategy raced
+
+   ## @var requiredBound
+   # Largest suboptimality bound of a strategy whose solution is taken
+   # as soon as it arrives
+
+   ## @var historyPath
+   # File each race is appended to, None for no history
+
+   ## @var timeLimit
+   # Seconds after which every strategy is stopped, None for no limit
+
+   ## @var winner
+   # Position of the strategy whose solution was taken, None if none
+
+   ## @var outcomes
+   # Per strategy, None if it was stopped, else (list of its actions,
+   # None if it found no solution, and its seconds of search)
+
+   ## @var died
+   # Positions of the strategies whose process ended without a result
+
+## Count the races each strategy won in a history file
+# @param historyPath The history file
+# @return Text listing, per winning strategy, its wins and the mean
+# seconds of those races, most wins first
+def SummariseHistory(historyPath):
+   wins = {}
+   if os.path.exists(historyPath):
+      for line in open(historyPath):
+         fields = line.rstrip('\n').split('\t')
+         if len(fields) < 6:
+            continue
+         (count, seconds) = wins.get(fields[3], (0, 0.0))
+         wins[fields[3]] = (count + 1, seconds + float(fields[5]))
+
+   ranking = sorted(wins.items(), key=lambda item: -item[1][0])
+   lines = []
+   for (name, (count, seconds)) in ranking:
+      lines.append(name + ': ' + str(count) + ' wins, ' + \
+                   ('%.3f' % (seconds / count)) + ' s on average')
+   return '\n'.join(lines)
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+
+   puzz = ReadPuzzle('puzz2.pz')
+   rootNode = SearchNode(MakeInitialState(puzz, FindWrigglers(puzz)), \
+                         None, None, 0)
+   historyPath = 'puzz2.pz.history'
+
+   # only the optimal strategies may win
+   portfolio = Portfolio(ParseStrategies('GBFS:blue,A*:blue:3,A*:blue'), \
+                         1.0, historyPath)
+   goalNode = portfolio.Solve(rootNode, 'puzz2.pz')
+   if goalNode is None or goalNode.pathCost != 14 or portfolio.winner != 2:
+      print "FAILED to take the optimal solution of puzz2"
+   print str(portfolio)
+
+   # anything goes, the cheapest arriving first wins
+   portfolio = Portfolio(ParseStrategies('GBFS:blue'), float('inf'), \
+                         historyPath)
+   goalNode = portfolio.Solve(rootNode, 'puzz2.pz')
+   if goalNode is None or not goalNode.ContainsGoalState():
+      print "FAILED to take the greedy solution of puzz2"
+   print str(portfolio)
+
+   ## Stands in for a strategy whose process is killed
+   class DyingStrategy(Strategy):
+      def Search(self, rootNode):
+         os._exit(1)
+
+   # with no time limit, a race whose processes all die still ends
+   portfolio = Portfolio([DyingStrategy('A*'), DyingStrategy('GBFS')], \
+                         float('inf'), historyPath)
+   goalNode = portfolio.Solve(rootNode, 'puzz2.pz')
+   if goalNode is not None or portfolio.died != set([0, 1]):
+      print "FAILED to end a race whose strategies all died"
+   print str(portfolio)
+
+   print SummariseHistory(historyPath)
+   os.remove(historyPath)
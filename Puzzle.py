@@ -2,19 +2,26 @@
 # @author Mathew Anderson
 # @brief Store a "puzzle" according to the project specifications
 # Note that this class will also emit the current state of the puzzle.
-# There is no difference between a Puzzle and a world state, and therefore
-# a Puzzle may be queried for information concerning movement.
+# A search keeps a single Puzzle with the tiles that never move; each
+# State only records where its wrigglers are (see State.MakeInitialState).
 
 ## The puzzle class allows queries at a given (col, row),
 # is aware of how many wrigglers are on the board, and can
 # be considered the world state.
 # NOTE: All col, row references are ZERO based
+import sys
+from Layout import Layout
+from TileGrid import TileGrid
+
 class Puzzle:
 
    ## Symbolic constant representing an empty square
    EMPTY_SQUARE = 'e'
    ## Symbolic constant for wall square
    WALL_SQUARE = 'x'
+   ## Puzzles with fewer tiles are copied outright, which is
+   # quicker than sharing a TileGrid at that size
+   SHARED_GRID_MIN_TILES = 400
 
    ## Ctor initializes all member vars to 0/empty
    def __init__(self):
@@ -22,6 +29,7 @@ class Puzzle:
       self.numRows = 0
       self.numWrigglers = 0
       self.puzzle = []
+      self.layout = None
 
    ## Clone an instance of a puzzle
    # @param other The source of the clone
@@ -29,7 +37,34 @@ class Puzzle:
       self.numCols = other.numCols
       self.numRows = other.numRows
       self.numWrigglers = other.numWrigglers
-      self.puzzle = list(other.puzzle)
+      # on large puzzles tiles are shared copy-on-write, so only
+      # the rows this copy changes are ever duplicated
+      if len(other.puzzle) >= Puzzle.SHARED_GRID_MIN_TILES:
+         self.puzzle = other.GetTileGrid().Copy()
+      else:
+         self.puzzle = list(other.puzzle)
+      # walls never move, so the static tables are shared
+      self.layout = other.layout
+
+   ## Return the tiles as a TileGrid, converting the flat list
+   # the puzzle was read into if need be.
+   def GetTileGrid(self):
+      if not isinstance(self.puzzle, TileGrid):
+         self.puzzle = TileGrid(self.puzzle, self.numCols)
+      return self.puzzle
+
+   ## Return all tiles joined into one string, one character per tile
+   def GetPuzzleString(self):
+      if isinstance(self.puzzle, TileGrid):
+         return self.puzzle.Join()
+      return ''.join(self.puzzle)
+
+   ## Return the static tables of this puzzle, building them
+   # the first time they are needed.
+   def GetLayout(self):
+      if self.layout is None:
+         self.layout = Layout(self)
+      return self.layout
 
    ## Add a line to the puzzle
    def AddLine(self, tiles):
@@ -75,6 +110,17 @@ class Puzzle:
       for segment in wriggler.segments:
          self.ClearTile(segment.pos[0], segment.pos[1])
 
+   ## Given the linear index of a tile, set it to the EMPTY_SQUARE char
+   # @param index Linear index of the tile to clear
+   def ClearIndex(self, index):
+      self.puzzle[index] = Puzzle.EMPTY_SQUARE
+
+   ## Given the linear index of a tile and a char, update the puzzle
+   # @param index Linear index of the tile to set
+   # @param char Desired character to set
+   def SetIndex(self, index, char):
+      self.puzzle[index] = str(char)
+
    ## Given a col, row, set a tile to the EMPTY_SQUARE char
    # @param col The column of the tile to clear
    # @param row The row of the tile to clear
@@ -121,6 +167,11 @@ class Puzzle:
       openTile = self.puzzle[linearIndex] == Puzzle.EMPTY_SQUARE
       return openTile
 
+   ## Given the linear index of a tile return if it is "open"
+   # @param index Linear index of the tile to check
+   def IsOpenIndex(self, index):
+      return self.puzzle[index] == Puzzle.EMPTY_SQUARE
+
    ## Determine if a position is within the bounds of the puzzle
    # @param col The desired column
    # @param row The desired row
@@ -143,32 +194,37 @@ class Puzzle:
    def GetLowerRightCornerPosition(self):
       return (self.numCols - 1, self.numRows - 1)
 
+   ## Return the tiles of one row
+   # @param row The desired row
+   def GetRow(self, row):
+      rowStart = row * self.numCols
+      return self.puzzle[rowStart:rowStart + self.numCols]
+
+   ## Write the current world state consistent with the project
+   # specifications to a file object, one row at a time: tiles are
+   # separated by spaces, rows by newlines, and the last tile is
+   # followed by a space.
+   # @param outFile File-like object to write to
+   def WritePuzzle(self, outFile):
+      if len(self.puzzle) == 0:
+         return
+      lastRow = self.numRows - 1
+      for row in xrange(lastRow):
+         outFile.write(' '.join(self.GetRow(row)) + '\n')
+      outFile.write(' '.join(self.GetRow(lastRow)) + ' ')
+
    ## Print the current world state consistent with
    # the project specifications.
    def PrintPuzzle(self):
-      tileIndex = 1
-      stringRep = ''
-      for tile in self.puzzle:
-         stringRep += tile
-         if tileIndex % self.numCols == 0 and tileIndex != len(self.puzzle):
-            stringRep += '\n'
-         else:
-            stringRep +=  ' '
-         tileIndex += 1
-      print stringRep
+      self.WritePuzzle(sys.stdout)
+      print ""
 
    ## Same as PrintPuzzle but works with operator str
    def __str__(self):
-      tileIndex = 1
-      stringRep = ''
-      for tile in self.puzzle:
-         stringRep += tile
-         if tileIndex % self.numCols == 0 and tileIndex != len(self.puzzle):
-            stringRep += '\n'
-         else:
-            stringRep +=  ' '
-         tileIndex += 1
-      return stringRep
+      if len(self.puzzle) == 0:
+         return ''
+      rows = [' '.join(self.GetRow(row)) for row in xrange(self.numRows)]
+      return '\n'.join(rows) + ' '
 
    ## @var numCols
    # Total number of columns (width) of the puzzle
@@ -180,7 +236,11 @@ class Puzzle:
    # Total number of wrigglers in the puzzle
 
    ## @var puzzle
-   # Linear representation of the puzzle
+   # Linear representation of the puzzle, a list of tiles or,
+   # for large puzzles that have been copied, a TileGrid
+
+   ## @var layout
+   # Static tables derived from the walls, shared between copies
 
    ## @var hashValue
    # A sha-1 hash used to identify this puzzle.
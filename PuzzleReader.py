@@ -16,10 +16,19 @@ from Puzzle import Puzzle
 # <0, num rows - 1> <1, num rows-11> ... <num cols -1, num rows -1>
 def ReadPuzzle(filename):
    puzFile = open(filename, 'r')
+   initialPuzzle = ParsePuzzle(puzFile, filename)
+   puzFile.close()
+   return initialPuzzle
 
+## Given the lines of a puzzle in the format ReadPuzzle reads, generate a
+# Puzzle class and return it or, upon error return None
+# @param lines Iterable of the lines of the puzzle, such as an open file
+# @param filename Name of the puzzle, for error messages
+def ParsePuzzle(lines, filename='puzzle'):
+   lines = iter(lines)
    initialPuzzle = None
    # Read the header line
-   headerLine = puzFile.readline()
+   headerLine = next(lines, '')
 
    # try to split the header line and assure three tokens
    headerTokens = headerLine.split()
@@ -43,10 +52,14 @@ def ReadPuzzle(filename):
          print "Confirm formatting."
          return None
 
+   if initialPuzzle is None:
+      print "FAILED to parse the header of puzzle " + filename
+      return None
+
    # Now that we have the number of rows, we can start reading
    # in puzzle lines
    currPuzzleLine = 1
-   for nextLine in puzFile:
+   for nextLine in lines:
       if currPuzzleLine <= initialPuzzle.numRows:
          # split the line into tile tokens
          tiles = nextLine.split()
@@ -0,0 +1,74 @@
+## @file Relevance.py
+# @author Mathew Anderson
+# @brief Pre-search analysis of which wrigglers can matter.
+# Walls never move, so a wriggler walled into a different region than
+# the blue wriggler can never occupy, free or block a cell the blue
+# wriggler (or its way to the lower right corner) could use. Moving it
+# only multiplies the branching factor.
+
+from State import MakeInitialState
+
+## Split the wrigglers of a puzzle into those that can influence the
+# blue wriggler and those that can not.
+# @param puzzle The initial puzzle
+# @param wrigglers All wrigglers found in the puzzle
+# @return (relevant wrigglers, frozen wrigglers)
+def SplitIrrelevantWrigglers(puzzle, wrigglers):
+   layout = puzzle.GetLayout()
+   components = layout.components
+
+   blueComponent = None
+   for wriggler in wrigglers:
+      if wriggler.GetTailNumber() == 0:
+         blueComponent = components[layout.GetIndex(wriggler.head.pos)]
+
+   relevant = []
+   frozen = []
+   for wriggler in wrigglers:
+      # a wriggler's segments are connected, so its head tells its region
+      wrigglerComponent = components[layout.GetIndex(wriggler.head.pos)]
+      if blueComponent is None or wrigglerComponent == blueComponent:
+         relevant.append(wriggler)
+      else:
+         frozen.append(wriggler)
+
+   return (relevant, frozen)
+
+## Remove the wrigglers that can never influence the blue wriggler
+# from move generation. Left out of the initial state, they become part
+# of the static tiles, so they are still drawn in the solution.
+# @param puzzle The initial puzzle
+# @param wrigglers All wrigglers found in the puzzle
+# @return (wrigglers to search with, report string)
+def FreezeIrrelevantWrigglers(puzzle, wrigglers):
+   (relevant, frozen) = SplitIrrelevantWrigglers(puzzle, wrigglers)
+
+   # branching factor of the initial state, before and after
+   allMoves = len(MakeInitialState(puzzle, wrigglers).Actions())
+   relevantMoves = allMoves
+   if len(frozen) > 0:
+      relevantMoves = len(MakeInitialState(puzzle, relevant).Actions())
+
+   report = "Froze " + str(len(frozen)) + " of " + str(len(wrigglers)) \
+      + " wrigglers, initial branching factor " + str(allMoves) \
+      + " -> " + str(relevantMoves)
+   return (relevant, report)
+
+if __name__ == "__main__":
+   from Puzzle import Puzzle
+   from WrigglerReader import FindWrigglers
+
+   # wriggler 1 is walled off on the right
+   puzz = Puzzle()
+   puzz.numCols = 5
+   puzz.numRows = 3
+   puzz.numWrigglers = 2
+   puzz.puzzle = ['R', '0', 'e', 'x', 'e', \
+                  'e', 'e', 'e', 'x', 'D', \
+                  'e', 'e', 'e', 'x', '1']
+   wrigglers = FindWrigglers(puzz)
+
+   (relevant, report) = FreezeIrrelevantWrigglers(puzz, wrigglers)
+   print report
+   if [wrig.GetTailNumber() for wrig in relevant] != [0]:
+      print "FAILED to freeze wriggler 1"
@@ -0,0 +1,222 @@
+## @file SamplingProfiler.py
+# @author Mathew Anderson
+# @brief Statistical profiling of a search as it runs.
+# cProfile times every call and makes a search about three times slower.
+# A sampling profiler instead has a profiling timer interrupt the search
+# every so often and records the Python stack it was in, which costs
+# next to nothing between samples. The stacks are written in the folded
+# format flame graph tools read ("frame;frame;frame count" per line),
+# and the share of samples spent in the hot parts of a search is
+# summarised:
+#    - actions: State.Actions and the moves it lists
+#    - moves: WrigglerMover.MoveBody, moving a wriggler's body
+#    - heuristic: State.CalculateHeuristic
+#    - hashing: state keys and the explored and frontier dictionaries
+#    - queue: heap pushes and pops, and the node comparisons they make
+# Python only handles a signal between two bytecodes, so time spent in
+# a C function, heapq.heappush or a dictionary lookup, is sampled on the
+# line that called it. Those lines get a [hashing] or [queue] frame of
+# their own. Only the process that started the profiler is sampled.
+
+import linecache
+import os
+import signal
+
+## Categories of the summary, each with the (file, function) pairs
+# whose samples it counts
+CATEGORIES = [('actions', [('State.py', 'Actions'), \
+                           ('State.py', 'WrigglerActions'), \
+                           ('State.py', 'MacroActions'), \
+                           ('PartialOrder.py', 'PruneCommutedMoves')]), \
+              ('moves', [('WrigglerMover.py', 'MoveBody'), \
+                         ('WrigglerMover.py', 'MoveBodySteps'), \
+                         ('WrigglerMover.py', 'GetChangedCells')]), \
+              ('heuristic', [('State.py', 'CalculateHeuristic')]), \
+              ('hashing', [('State.py', 'GetStateKey'), \
+                           ('SearchNode.py', 'GetNodeHash'), \
+                           ('SearchNode.py', '__eq__')]), \
+              ('queue', [('SearchNode.py', '__lt__'), \
+                         ('SearchNode.py', '__le__')])]
+
+## Words on a line of a search loop that make a sample of it a queue
+# operation or a hashing one
+LINE_CATEGORIES = [('queue', ('heapq.', 'heappush', 'heappop')), \
+                   ('hashing', ('has_key', 'explored[', 'Dict[', \
+                                'explored.get', 'Dict.get'))]
+
+## The SamplingProfiler class samples the Python stack on a profiling
+# timer
+class SamplingProfiler:
+
+   ## Default seconds of processor time between two samples
+   DEFAULT_INTERVAL = 0.001
+
+   ## Ctor
+   # @param interval Seconds of processor time between two samples
+   def __init__(self, interval=DEFAULT_INTERVAL):
+      if not hasattr(signal, 'setitimer'):
+         raise Exception("Sampling needs signal.setitimer, " + \
+                         "which this platform does not have!")
+      self.interval = interval
+      self.stacks = {}
+      self.numSamples = 0
+      self.previousHandler = None
+
+   ## Start sampling. Must be called from the main thread.
+   def Start(self):
+      self.previousHandler = signal.signal(signal.SIGPROF, self.Sample)
+      signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+   ## Stop sampling; the samples so far are kept
+   def Stop(self):
+      signal.setitimer(signal.ITIMER_PROF, 0, 0)
+      signal.signal(signal.SIGPROF, self.previousHandler or signal.SIG_DFL)
+      self.previousHandler = None
+
+   ## Record the stack the timer interrupted
+   # @param signalNumber SIGPROF
+   # @param frame The frame that was running
+   def Sample(self, signalNumber, frame):
+      leafLine = frame.f_lineno
+      codes = []
+      while frame is not None:
+         codes.append(frame.f_code)
+         frame = frame.f_back
+      key = (tuple(codes), leafLine)
+      self.stacks[key] = self.stacks.get(key, 0) + 1
+      self.numSamples += 1
+
+   ## Return the frames of a sampled stack, outermost first
+   # @param codes Code objects of the stack, innermost first
+   # @param leafLine Line running in the innermost frame
+   # @return List of "file:function" names, with a last [category]
+   # frame if the innermost line is a queue or hashing operation
+   def GetFrames(self, codes, leafLine):
+      frames = [os.path.basename(code.co_filename) + ':' + code.co_name \
+                for code in reversed(codes)]
+      lineCategory = self.GetLineCategory(codes[0], leafLine)
+      if lineCategory is not None:
+         frames.append('[' + lineCategory + ']')
+      return frames
+
+   ## Return the category of the C work done on a line, if any
+   # @param code Code object running the line
+   # @param lineNumber Number of the line
+   def GetLineCategory(self, code, lineNumber):
+      line = linecache.getline(code.co_filename, lineNumber)
+      for (category, words) in LINE_CATEGORIES:
+         for word in words:
+            if word in line:
+               return category
+      return None
+
+   ## Return the category a sampled stack counts for, None if it is in
+   # none. The innermost frame in a category decides.
+   # @param codes Code objects of the stack, innermost first
+   # @param leafLine Line running in the innermost frame
+   def GetCategory(self, codes, leafLine):
+      lineCategory = self.GetLineCategory(codes[0], leafLine)
+      if lineCategory is not None:
+         return lineCategory
+      for code in codes:
+         frame = (os.path.basename(code.co_filename), code.co_name)
+         for (category, frames) in CATEGORIES:
+            if frame in frames:
+               return category
+      return None
+
+   ## Return the number of samples of each category
+   # @return Dictionary from category to samples, 'other' included
+   def GetSummary(self):
+      summary = dict([(category, 0) for (category, frames) in CATEGORIES])
+      summary['other'] = 0
+      for ((codes, leafLine), count) in self.stacks.iteritems():
+         category = self.GetCategory(codes, leafLine) or 'other'
+         summary[category] += count
+      return summary
+
+   ## Write the samples in folded format, one stack per line
+   # @param fileName Name of the file to write
+   def WriteFolded(self, fileName):
+      folded = {}
+      for ((codes, leafLine), count) in self.stacks.iteritems():
+         stack = ';'.join(self.GetFrames(codes, leafLine))
+         folded[stack] = folded.get(stack, 0) + count
+      outFile = open(fileName, 'w')
+      for stack in sorted(folded):
+         outFile.write(stack + ' ' + str(folded[stack]) + '\n')
+      outFile.close()
+
+   ## Summarise the samples
+   def __str__(self):
+      strRep = "Profile: " + str(self.numSamples) + " samples every " + \
+         ('%.1f' % (self.interval * 1000)) + " ms"
+      if self.numSamples > 0:
+         summary = self.GetSummary()
+         categories = [category for (category, frames) in CATEGORIES]
+         strRep += ": " + ', '.join([category + ' ' + \
+            ('%.1f' % (100.0 * summary[category] / self.numSamples)) + '%' \
+            for category in categories + ['other']])
+      return strRep
+
+   ## @var interval
+   # Seconds of processor time between two samples
+
+   ## @var stacks
+   # Number of samples per (code objects of the stack, innermost first,
+   # line running in the innermost frame)
+
+   ## @var numSamples
+   # Number of samples taken
+
+   ## @var previousHandler
+   # SIGPROF handler to restore when sampling stops
+
+## Build the profiler asked for on the command line
+# @param arguments Command line arguments; --profile and
+# --profile=MILLISECONDS are looked at
+# @return The SamplingProfiler, None if profiling is not asked for
+def ParseProfileArguments(arguments):
+   for argument in arguments:
+      if argument == '--profile':
+         return SamplingProfiler()
+      elif argument.startswith('--profile='):
+         return SamplingProfiler(float(argument[len('--profile='):]) / 1000)
+   return None
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from Agent import Agent
+   import time
+   import tempfile
+
+   puzz = ReadPuzzle('puzz2.pz')
+   seconds = {}
+   for profiler in (None, SamplingProfiler()):
+      startTime = time.time()
+      for count in xrange(20):
+         agent = Agent(SearchNode(MakeInitialState(puzz, \
+                                                   FindWrigglers(puzz)), \
+                                  None, None, 0))
+         agent.profiler = profiler
+         result = agent.AStarSearch()
+      seconds[profiler is None] = time.time() - startTime
+   print str(profiler)
+   print "20 solves: " + ('%.3f' % seconds[True]) + " s unprofiled, " + \
+      ('%.3f' % seconds[False]) + " s profiled"
+   if signal.getsignal(signal.SIGPROF) not in (None, signal.SIG_DFL):
+      print "FAILED to restore the SIGPROF handler"
+
+   (handle, fileName) = tempfile.mkstemp(suffix='.folded')
+   os.close(handle)
+   profiler.WriteFolded(fileName)
+   lines = open(fileName).read().splitlines()
+   os.remove(fileName)
+   if sum([int(line.rsplit(' ', 1)[1]) for line in lines]) != \
+         profiler.numSamples:
+      print "FAILED to write every sample"
+   print str(len(lines)) + " folded stacks, the hottest: " + \
+      max(lines, key=lambda line: int(line.rsplit(' ', 1)[1]))
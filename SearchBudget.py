@@ -0,0 +1,195 @@
+## @file SearchBudget.py
+# @author Mathew Anderson
+# @brief Limits on how long a search may run.
+# A search charges its budget for every node it expands. Every so many
+# expansions the budget looks at the clock and the cancellation token,
+# and raises SearchStopped once either says to stop, or as soon as the
+# node limit is reached. The exception unwinds the search, however deep
+# its recursion, back to Agent.RunSearch, which turns it into a
+# SearchResult. Meanwhile the budget remembers the expanded node that
+# came closest to the goal.
+
+import time
+
+from SearchResult import SearchResult
+
+## Raised by a SearchBudget to stop a search
+class SearchStopped(Exception):
+
+   ## Ctor records why the search stops
+   # @param status SearchResult.OUT_OF_BUDGET or SearchResult.CANCELLED
+   def __init__(self, status):
+      Exception.__init__(self, status)
+      self.status = status
+
+   ## @var status
+   # Why the search stopped
+
+## The CancelToken class lets another part of the program, such as a
+# signal handler or another thread, ask a search to stop
+class CancelToken:
+
+   ## Ctor starts uncancelled
+   def __init__(self):
+      self.cancelled = False
+
+   ## Ask every search holding this token to stop
+   def Cancel(self):
+      self.cancelled = True
+
+   ## @var cancelled
+   # True once Cancel was called
+
+## The SearchBudget class counts the work of a search against its limits
+class SearchBudget:
+
+   ## Default expansions between looks at the clock and the token
+   CHECK_INTERVAL = 256
+
+   ## Ctor sets the limits, all optional
+   # @param timeLimit Seconds of wall clock time the search may take
+   # @param nodeLimit Number of nodes the search may expand
+   # @param cancelToken CancelToken that stops the search when cancelled
+   # @param checkInterval Expansions between looks at the clock and token
+   def __init__(self, timeLimit=None, nodeLimit=None, cancelToken=None, \
+                checkInterval=CHECK_INTERVAL):
+      self.timeLimit = timeLimit
+      self.nodeLimit = nodeLimit
+      self.cancelToken = cancelToken
+      self.checkInterval = checkInterval
+      self.Start()
+
+   ## Start counting afresh, from now
+   def Start(self):
+      self.startTime = time.time()
+      self.deadline = None
+      if self.timeLimit is not None:
+         self.deadline = self.startTime + self.timeLimit
+      self.expanded = 0
+      self.bestNode = None
+      self.bestHeuristic = None
+      self.untilCheck = self.GetCheckDistance()
+
+   ## Return the number of expansions until the next check, never past
+   # the node limit
+   def GetCheckDistance(self):
+      if self.nodeLimit is None:
+         return self.checkInterval
+      return max(1, min(self.checkInterval, self.nodeLimit - self.expanded))
+
+   ## Charge the budget for an expanded node, remembering it if it is the
+   # closest to the goal so far
+   # @param node The SearchNode expanded
+   def Expanded(self, node):
+      heuristic = node.state.GetHeuristicCost()
+      if self.bestNode is None or heuristic < self.bestHeuristic or \
+            (heuristic == self.bestHeuristic and \
+             node.pathCost < self.bestNode.pathCost):
+         self.bestNode = node
+         self.bestHeuristic = heuristic
+      self.Charge(1)
+
+   ## Charge the budget for expansions of no particular node
+   # @param count Number of expansions
+   def Charge(self, count):
+      self.expanded += count
+      self.untilCheck -= count
+      if self.untilCheck <= 0:
+         self.Check()
+         self.untilCheck = self.GetCheckDistance()
+
+   ## Raise SearchStopped if the search must stop now
+   def Check(self):
+      if self.cancelToken is not None and self.cancelToken.cancelled:
+         raise SearchStopped(SearchResult.CANCELLED)
+      if self.nodeLimit is not None and self.expanded >= self.nodeLimit:
+         raise SearchStopped(SearchResult.OUT_OF_BUDGET)
+      if self.deadline is not None and time.time() >= self.deadline:
+         raise SearchStopped(SearchResult.OUT_OF_BUDGET)
+
+   ## Return the seconds since the search started
+   def GetElapsed(self):
+      return time.time() - self.startTime
+
+   ## @var timeLimit
+   # Seconds the search may take, None for no limit
+
+   ## @var nodeLimit
+   # Nodes the search may expand, None for no limit
+
+   ## @var cancelToken
+   # CancelToken stopping the search, None if it can not be cancelled
+
+   ## @var checkInterval
+   # Expansions between looks at the clock and token
+
+   ## @var startTime
+   # Wall clock time the search started
+
+   ## @var deadline
+   # Wall clock time the search must stop by, None for no deadline
+
+   ## @var expanded
+   # Number of nodes expanded so far
+
+   ## @var bestNode
+   # Expanded SearchNode with the least heuristic, the cheaper one of
+   # equals, None if no node was charged through Expanded
+
+   ## @var bestHeuristic
+   # Heuristic of bestNode
+
+   ## @var untilCheck
+   # Expansions left until the next check
+
+## Build the budget asked for on the command line
+# @param arguments Command line arguments; --time-limit=SECONDS and
+# --node-limit=NODES are looked at
+# @return The SearchBudget, None if neither limit is given
+def ParseBudgetArguments(arguments):
+   timeLimit = None
+   nodeLimit = None
+   for argument in arguments:
+      if argument.startswith('--time-limit='):
+         timeLimit = float(argument[len('--time-limit='):])
+      elif argument.startswith('--node-limit='):
+         nodeLimit = int(argument[len('--node-limit='):])
+   if timeLimit is None and nodeLimit is None:
+      return None
+   return SearchBudget(timeLimit, nodeLimit)
+
+if __name__ == "__main__":
+   ## Stands in for a State with a fixed heuristic
+   class FlatState:
+      def __init__(self, heuristic):
+         self.heuristic = heuristic
+      def GetHeuristicCost(self):
+         return self.heuristic
+
+   ## Stands in for a SearchNode
+   class FlatNode:
+      def __init__(self, heuristic, pathCost):
+         self.state = FlatState(heuristic)
+         self.pathCost = pathCost
+
+   budget = SearchBudget(nodeLimit=1000)
+   try:
+      for count in xrange(2000):
+         budget.Expanded(FlatNode(abs(500 - count), count))
+      print "FAILED to stop at the node limit"
+   except SearchStopped as stop:
+      if stop.status != SearchResult.OUT_OF_BUDGET or budget.expanded != 1000:
+         print "FAILED stopping after " + str(budget.expanded) + " nodes"
+   if budget.bestNode.pathCost != 500:
+      print "FAILED to keep the node closest to the goal"
+
+   token = CancelToken()
+   budget = SearchBudget(cancelToken=token, checkInterval=10)
+   token.Cancel()
+   try:
+      budget.Charge(9)
+      budget.Charge(1)
+      print "FAILED to notice the cancellation"
+   except SearchStopped as stop:
+      print "Stopped after " + str(budget.expanded) + " nodes: " + \
+         stop.status
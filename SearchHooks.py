@@ -0,0 +1,72 @@
+## @file SearchHooks.py
+# @author Mathew Anderson
+# @brief Events of a search, for whoever wants to follow it.
+# The A*, greedy, ID-DFTS and BFTS searches of an Agent tell its hooks
+# object of every node they generate, every duplicate they find, every
+# node they expand and the goal. Hooks left at None cost the search one
+# test per event; a subclass overrides only the events it cares about.
+
+## The SearchHooks class is told of the events of a search and ignores
+# them all
+class SearchHooks:
+
+   ## A node was generated
+   # @param node The new SearchNode
+   # @param parent The SearchNode it was generated from
+   def OnGenerate(self, node, parent):
+      pass
+
+   ## A node was generated whose state was already in the frontier or
+   # explored set. Graph searches only.
+   # @param node The new SearchNode
+   # @param seenNode The SearchNode already holding the state
+   def OnDuplicate(self, node, seenNode):
+      pass
+
+   ## A node was expanded, all its children have been generated
+   # @param node The SearchNode expanded
+   # @param frontier The open list after the expansion
+   def OnExpand(self, node, frontier):
+      pass
+
+   ## A goal was found; told once per search, after it is over
+   # @param node The goal SearchNode
+   def OnGoal(self, node):
+      pass
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from Agent import Agent
+   import time
+
+   ## Counts every event
+   class CountingHooks(SearchHooks):
+      def __init__(self):
+         self.counts = {'generate': 0, 'duplicate': 0, 'expand': 0, \
+                        'goal': 0}
+      def OnGenerate(self, node, parent):
+         self.counts['generate'] += 1
+      def OnDuplicate(self, node, seenNode):
+         self.counts['duplicate'] += 1
+      def OnExpand(self, node, frontier):
+         self.counts['expand'] += 1
+      def OnGoal(self, node):
+         self.counts['goal'] += 1
+
+   puzz = ReadPuzzle('puzz2.pz')
+   for hooks in (None, SearchHooks(), CountingHooks()):
+      agent = Agent(SearchNode(MakeInitialState(puzz, FindWrigglers(puzz)), \
+                               None, None, 0))
+      agent.hooks = hooks
+      startTime = time.time()
+      result = agent.AStarSearch()
+      print hooks.__class__.__name__ + ': ' + str(result) + ', ' + \
+         ('%.3f' % (time.time() - startTime)) + ' s'
+      if isinstance(hooks, CountingHooks):
+         print '   ' + str(hooks.counts)
+         if hooks.counts['expand'] != result.expanded or \
+               hooks.counts['goal'] != 1:
+            print "FAILED to count the events"
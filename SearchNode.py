@@ -9,7 +9,12 @@ from State import State
 # and all other variables that are useful to an agent.
 # This comes from p 78 of the aformentioned book
 # modified to suit this programming project
-class SearchNode:
+class SearchNode(object):
+
+   ## A search holds a great many nodes, fixed attributes spare
+   # each of them a dictionary
+   __slots__ = ('state', 'parent', 'action', 'pathCost', \
+                'useHeuristicAndPathCost', 'totalCost', 'footprint', 'serial')
 
    ## Ctor sets up instance vars
    # @param state Initial state of the world
@@ -23,6 +28,8 @@ class SearchNode:
       self.pathCost = pathCost
       self.useHeuristicAndPathCost = False
       self.totalCost = self.GetHeuristicAndPathCost()
+      self.footprint = None
+      self.serial = None
 
    ## Return the cost of the state heuristic plus the path cost required
    # to get to this node
@@ -36,17 +43,40 @@ class SearchNode:
    ## Starting from this SearchNode, construct a path
    # from the root node to this one.
    def BackTrack(self):
-      path = [self]
-      if self.parent is not None:
-         parentList = self.parent.BackTrack()
-         parentList.extend(path)
-         path = parentList
+      path = []
+      node = self
+      while node is not None:
+         path.append(node)
+         node = node.parent
+      path.reverse()
 
       return path
 
+   ## Visit the nodes from the root down to this one, in order, without
+   # building the path. The parent pointers are reversed to walk down
+   # and put back as the walk goes on, or when it is abandoned, so only
+   # constant extra memory is used.
+   def WalkFromRoot(self):
+      # reverse the chain, each parent then points to its child
+      previous = None
+      node = self
+      while node is not None:
+         (node.parent, previous, node) = (previous, node, node.parent)
+
+      # previous is the root, walk down restoring the parents
+      node = previous
+      previous = None
+      try:
+         while node is not None:
+            (node.parent, previous, node) = (previous, node, node.parent)
+            yield previous
+      finally:
+         while node is not None:
+            (node.parent, previous, node) = (previous, node, node.parent)
+
    ## Return a hash representation of this SearchNode
    def GetNodeHash(self):
-      return self.state.GetPuzzleHash()
+      return self.state.GetStateKey()
 
    ## For the puzzle project, a SearchNode contains a goal state if
    # the blue wriggler's head or tail is in the lower right hand corner.
@@ -57,7 +87,11 @@ class SearchNode:
    def __str__(self):
       strRep = ''
       if self.action is not None:
-         strRep += str(self.action) + "\n"
+         moves = self.state.puzzle.GetLayout().moves
+         if isinstance(self.action, tuple):
+            strRep += moves.FormatAll(self.action) + "\n"
+         else:
+            strRep += moves.Format(self.action) + "\n"
       if self.state.puzzle is not None:
          strRep += str(self.state) + "\n"
       strRep += str(self.pathCost)
@@ -79,7 +113,7 @@ class SearchNode:
       return lessThan
 
    def __eq__(self, other):
-      return self.state.GetDirectPuzzleString() == other.state.GetDirectPuzzleString()
+      return self.state.GetStateKey() == other.state.GetStateKey()
 
    ## @var state
    # The world state (puzzle) represented by this search node
@@ -88,7 +122,8 @@ class SearchNode:
    # The parent search node of this search node (None at root)
 
    ## @var action
-   # The action (Move) that got us to this state from the parent
+   # The packed move code that got us to this state from the parent,
+   # or a tuple of codes for a corridor macro
 
    ## @var pathCost
    # The cost of getting from the root to this node
@@ -97,12 +132,24 @@ class SearchNode:
    # Set during A* search, uses both heuristic cost and
    # path cost of this node when ordering nodes
 
+   ## @var footprint
+   # (tail number, vacated cell) of the action, used to prune
+   # reorderings of independent moves. None if nothing may be pruned.
+
+   ## @var serial
+   # Number of the node in a SearchCheckpoint, None if not recorded
+
 if __name__ == "__main__":
+   ## Stands in for a State with no heuristic
+   class FlatState:
+      def GetHeuristicCost(self):
+         return 0
+
    # Test backtracking
-   root = SearchNode(None, None, "Root", 0)
+   root = SearchNode(FlatState(), None, "Root", 0)
    last = root
    for x in xrange(1,10):
-      next = SearchNode(None, last, "Level : " + str(x), last.pathCost + 1)
+      next = SearchNode(FlatState(), last, "Level : " + str(x), last.pathCost + 1)
       last = next
 
    path = last.BackTrack()
@@ -110,3 +157,21 @@ if __name__ == "__main__":
    for node in path:
       print node.action + " total cost: " + str(node.pathCost)
 
+   # far deeper than the recursion limit
+   for x in xrange(10, 5000):
+      last = SearchNode(FlatState(), last, "Level : " + str(x), x)
+   path = last.BackTrack()
+   if len(path) != 5000 or path[0] is not root:
+      print "FAILED to backtrack a long path"
+
+   # an abandoned walk leaves every parent as it was
+   for node in last.WalkFromRoot():
+      if node.pathCost == 2500:
+         break
+   if last.BackTrack() != path:
+      print "FAILED to restore the parents after walking"
+   walked = [node for node in last.WalkFromRoot()]
+   if walked != path or last.BackTrack() != path:
+      print "FAILED to walk from the root"
+   print "Walked " + str(len(walked)) + " nodes"
+
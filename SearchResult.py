@@ -0,0 +1,71 @@
+## @file SearchResult.py
+# @author Mathew Anderson
+# @brief Outcome of a search, whether or not it found a goal.
+
+## The SearchResult class tells how a search ended, the node it ended
+# with and the work it took
+class SearchResult:
+
+   ## A goal was found
+   SOLVED = 'solved'
+
+   ## The whole search space was searched without finding a goal
+   UNSOLVABLE = 'unsolvable'
+
+   ## The time or node limit of the search's budget was reached
+   OUT_OF_BUDGET = 'budget exhausted'
+
+   ## The search's cancellation token was cancelled
+   CANCELLED = 'cancelled'
+
+   ## Ctor records the outcome
+   # @param status One of SOLVED, UNSOLVABLE, OUT_OF_BUDGET, CANCELLED
+   # @param node The goal SearchNode if solved, else the expanded node
+   # closest to the goal, if the search kept track of one
+   # @param expanded Number of nodes expanded
+   # @param seconds Wall clock time of the search
+   # @param reason (optional) Why the search ended without searching,
+   # e.g. the proof that the puzzle is unsolvable
+   def __init__(self, status, node, expanded, seconds, reason=None):
+      self.status = status
+      self.node = node
+      self.expanded = expanded
+      self.seconds = seconds
+      self.reason = reason
+
+   ## Determine if the search found a goal
+   def IsSolved(self):
+      return self.status == self.SOLVED
+
+   ## Return the goal SearchNode, None if the search found none
+   def GetGoalNode(self):
+      if self.IsSolved():
+         return self.node
+      return None
+
+   ## Summarise the outcome
+   def __str__(self):
+      strRep = "Search " + self.status + " after " + str(self.expanded) + \
+         " expansions in " + ('%.3f' % self.seconds) + " seconds"
+      if self.node is not None and not self.IsSolved():
+         strRep += ", closest node " + str(self.node.pathCost) + \
+            " moves deep with heuristic " + \
+            str(self.node.state.GetHeuristicCost())
+      if self.reason is not None:
+         strRep += ": " + self.reason
+      return strRep
+
+   ## @var status
+   # How the search ended
+
+   ## @var node
+   # Goal SearchNode, or the best node found so far, or None
+
+   ## @var expanded
+   # Number of nodes expanded
+
+   ## @var seconds
+   # Wall clock time of the search
+
+   ## @var reason
+   # Why the search ended without searching, None if it searched
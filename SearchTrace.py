@@ -0,0 +1,201 @@
+## @file SearchTrace.py
+# @author Mathew Anderson
+# @brief Compact binary trace of a graph search, for analysis afterwards
+# (see TraceReport).
+# A trace file starts with a tag and is followed by fixed size records:
+#    - one per expansion: the state, its parent, g, h, the move that
+#      reached it, the size of the open list after it and the number of
+#      children it generated
+#    - one per duplicate generated, in the same layout, with no open list
+#      size or children
+#    - one per node of the solution path, from the root, once the goal is
+#      found
+# States are given by the hash of their key, which is plenty to tell the
+# states of one search apart. Records are packed into a buffer and
+# written in blocks, so tracing costs little more than packing them.
+
+import struct
+
+from SearchHooks import SearchHooks
+
+## Kinds of record
+EXPAND = 0
+DUPLICATE = 1
+PATH = 2
+
+## Move code of the root, which no move reached
+NO_MOVE = -1
+## Move code of a node reached by a corridor macro
+MACRO_MOVE = -2
+## Key of the parent of the root
+NO_PARENT = 0
+
+## The SearchTrace class writes the events of a search to a trace file
+# as the search goes (see Agent.hooks)
+class SearchTrace(SearchHooks):
+
+   ## Tag at the start of every trace file
+   MAGIC = 'WRIGTRACE1\n'
+
+   ## Kind, key, parent key, g, h, move code, open list size, children
+   RECORD = struct.Struct('>Bqqiiiii')
+
+   ## Records held before they are written
+   BUFFER_RECORDS = 4096
+
+   ## Ctor opens the trace file
+   # @param path Name of the trace file
+   def __init__(self, path):
+      self.path = path
+      self.outFile = open(path, 'wb')
+      self.outFile.write(SearchTrace.MAGIC)
+      self.buffer = []
+      self.numRecords = 0
+      self.numGenerated = 0
+
+   ## Count a child of the node being expanded
+   # @param node The new SearchNode
+   # @param parent The SearchNode it was generated from
+   def OnGenerate(self, node, parent):
+      self.numGenerated += 1
+
+   ## Record a duplicate
+   # @param node The new SearchNode
+   # @param seenNode The SearchNode already holding the state
+   def OnDuplicate(self, node, seenNode):
+      self.Record(DUPLICATE, node, 0, 0)
+
+   ## Record an expansion
+   # @param node The SearchNode expanded
+   # @param frontier The open list after the expansion
+   def OnExpand(self, node, frontier):
+      self.Record(EXPAND, node, len(frontier), self.numGenerated)
+      self.numGenerated = 0
+
+   ## Record the solution path
+   # @param node The goal SearchNode
+   def OnGoal(self, node):
+      for pathNode in node.WalkFromRoot():
+         self.Record(PATH, pathNode, 0, 0)
+
+   ## Pack a record into the buffer, writing the buffer once it is full
+   # @param kind EXPAND, DUPLICATE or PATH
+   # @param node The SearchNode recorded
+   # @param frontierSize Size of the open list
+   # @param numChildren Number of children generated
+   def Record(self, kind, node, frontierSize, numChildren):
+      if node.parent is None:
+         parentKey = NO_PARENT
+      else:
+         parentKey = hash(node.parent.state.GetStateKey())
+      if node.action is None:
+         moveCode = NO_MOVE
+      elif isinstance(node.action, tuple):
+         moveCode = MACRO_MOVE
+      else:
+         moveCode = node.action
+      self.buffer.append(SearchTrace.RECORD.pack(kind, \
+         hash(node.state.GetStateKey()), parentKey, node.pathCost, \
+         node.state.GetHeuristicCost(), moveCode, frontierSize, numChildren))
+      if len(self.buffer) >= SearchTrace.BUFFER_RECORDS:
+         self.Flush()
+
+   ## Write the buffered records
+   def Flush(self):
+      self.outFile.write(''.join(self.buffer))
+      self.numRecords += len(self.buffer)
+      self.buffer = []
+
+   ## Write what is left and close the file
+   def Close(self):
+      self.Flush()
+      self.outFile.close()
+
+   ## Summarise the trace
+   def __str__(self):
+      return "Search trace: " + str(self.numRecords + len(self.buffer)) + \
+         " records to " + self.path
+
+   ## @var path
+   # Name of the trace file
+
+   ## @var outFile
+   # The open trace file
+
+   ## @var buffer
+   # Packed records not yet written
+
+   ## @var numRecords
+   # Number of records written
+
+   ## @var numGenerated
+   # Children generated since the last expansion
+
+## Read the records of a trace file
+# @param path Name of the trace file
+# @return Generator of (kind, key, parent key, g, h, move code, open list
+# size, children) tuples, in the order they were recorded
+def ReadTrace(path):
+   inFile = open(path, 'rb')
+   if inFile.read(len(SearchTrace.MAGIC)) != SearchTrace.MAGIC:
+      inFile.close()
+      raise Exception(path + " is not a search trace!")
+   recordSize = SearchTrace.RECORD.size
+   try:
+      block = inFile.read(recordSize * SearchTrace.BUFFER_RECORDS)
+      while block:
+         # a trace cut short ends in part of a record, which is dropped
+         for start in xrange(0, len(block) - recordSize + 1, recordSize):
+            yield SearchTrace.RECORD.unpack_from(block, start)
+         block = inFile.read(recordSize * SearchTrace.BUFFER_RECORDS)
+   finally:
+      inFile.close()
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from Agent import Agent
+   import os
+   import tempfile
+   import time
+
+   (handle, fileName) = tempfile.mkstemp(suffix='.trace')
+   os.close(handle)
+   puzz = ReadPuzzle('puzz.pz')
+   seconds = {}
+   for traced in (False, True):
+      startTime = time.time()
+      for count in xrange(20):
+         agent = Agent(SearchNode(MakeInitialState(puzz, \
+                                                   FindWrigglers(puzz)), \
+                                  None, None, 0))
+         if traced:
+            agent.hooks = SearchTrace(fileName)
+         result = agent.AStarSearch()
+         if traced:
+            agent.hooks.Close()
+      seconds[traced] = time.time() - startTime
+   print str(agent.hooks) + ', ' + \
+      str(os.path.getsize(fileName)) + ' bytes'
+   print "20 solves: " + ('%.3f' % seconds[False]) + " s untraced, " + \
+      ('%.3f' % seconds[True]) + " s traced"
+
+   records = list(ReadTrace(fileName))
+   kinds = [record[0] for record in records]
+   if kinds.count(EXPAND) != result.expanded:
+      print "FAILED to record every expansion"
+   if kinds.count(PATH) != result.node.pathCost + 1:
+      print "FAILED to record the solution path"
+   if records[kinds.index(PATH)][2] != NO_PARENT or \
+         records[kinds.index(PATH)][5] != NO_MOVE:
+      print "FAILED to record the root"
+
+   # a trace cut short drops its last, partial record
+   traceFile = open(fileName, 'r+b')
+   traceFile.truncate(os.path.getsize(fileName) - 5)
+   traceFile.close()
+   if len(list(ReadTrace(fileName))) != len(records) - 1:
+      print "FAILED to read a trace cut short"
+   os.remove(fileName)
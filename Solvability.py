@@ -0,0 +1,192 @@
+## @file Solvability.py
+# @author Mathew Anderson
+# @brief Pre-search proofs that a puzzle has no solution.
+# An unsolvable puzzle makes every search run until it has enumerated
+# the whole state space, which for the tree searches never happens. A
+# few relaxations of the puzzle are cheap to search and can only make it
+# easier, so when the blue wriggler can not reach the lower right corner
+# in one of them, it can not in the puzzle either:
+#    - the corner is a wall
+#    - some wrigglers can never move: every free cell next to their ends
+#      is held by one of them. They are walls for good.
+#    - the corner is not connected to the blue wriggler by cells that are
+#      neither walls nor held by such wrigglers
+#    - the blue wriggler, alone in the puzzle apart from the walls and
+#      the wrigglers that never move, can not get an end into the corner.
+#      Other wrigglers only take cells away from it, so every move it
+#      makes in the puzzle it could make alone. This catches corridors
+#      too narrow for it to turn in.
+# The last relaxation is searched only up to a number of states, past
+# which nothing is proven.
+
+from collections import deque
+
+## Blue wriggler positions searched at most by the last relaxation
+STATE_LIMIT = 20000
+
+## Find the wrigglers that can never move. Starting from all of them,
+# a wriggler is dropped once an end has a neighbour that is free or held
+# by a wriggler already dropped, until none is left to drop. A wriggler
+# kept has every neighbour of its ends held by a kept wriggler, so none
+# of them can make the first move.
+# @param state The initial State
+# @return Set of the positions in bodies of the wrigglers that never move
+def FindImmobileWrigglers(state):
+   layout = state.puzzle.GetLayout()
+   owners = {}
+   for (bodyIndex, body) in enumerate(state.bodies):
+      for cell in body:
+         owners[cell] = bodyIndex
+
+   immobile = set(xrange(len(state.bodies)))
+   changed = True
+   while changed:
+      changed = False
+      for bodyIndex in list(immobile):
+         body = state.bodies[bodyIndex]
+         for end in (body[0], body[-1]):
+            for neighbour in layout.neighbours[end]:
+               if state.staticClasses[neighbour] == 'e' and \
+                     owners.get(neighbour) not in immobile:
+                  immobile.discard(bodyIndex)
+                  changed = True
+                  break
+            if bodyIndex not in immobile:
+               break
+   return immobile
+
+## Return the cells the blue wriggler can never enter: walls, frozen
+# wrigglers and the wrigglers that never move
+# @param state The initial State
+# @param immobile Positions in bodies of the wrigglers that never move
+# @return List of bool per linear index
+def GetBlockedCells(state, immobile):
+   blocked = [tileClass != 'e' for tileClass in state.staticClasses]
+   for bodyIndex in immobile:
+      for cell in state.bodies[bodyIndex]:
+         blocked[cell] = True
+   return blocked
+
+## Determine if the corner is connected to an end of the blue wriggler.
+# Its own cells are free to it, once the rest of it has moved on.
+# @param state The initial State
+# @param blocked Cells the blue wriggler can never enter
+# @param corner Linear index of the lower right corner
+def CornerConnected(state, blocked, corner):
+   layout = state.puzzle.GetLayout()
+   blueBody = state.bodies[state.indexOfBlue]
+   reached = set([blueBody[0], blueBody[-1]])
+   toVisit = list(reached)
+   while toVisit:
+      cell = toVisit.pop()
+      if cell == corner:
+         return True
+      for neighbour in layout.neighbours[cell]:
+         if not blocked[neighbour] and neighbour not in reached:
+            reached.add(neighbour)
+            toVisit.append(neighbour)
+   return False
+
+## Search the positions of the blue wriggler alone in the puzzle
+# @param state The initial State
+# @param blocked Cells the blue wriggler can never enter
+# @param corner Linear index of the lower right corner
+# @param stateLimit Positions searched at most
+# @return True if an end reaches the corner, False if none can, None if
+# the search stopped at the limit
+def BlueReachesCorner(state, blocked, corner, stateLimit):
+   neighbours = state.puzzle.GetLayout().neighbours
+   start = state.bodies[state.indexOfBlue]
+   seen = set([start])
+   toVisit = deque([start])
+   while toVisit:
+      body = toVisit.popleft()
+      if body[0] == corner or body[-1] == corner:
+         return True
+      # its own cells are taken too, the one its other end leaves included
+      successors = [(newHead,) + body[:-1] for newHead in neighbours[body[0]] \
+                    if not blocked[newHead] and newHead not in body]
+      successors.extend([body[1:] + (newTail,) \
+                         for newTail in neighbours[body[-1]] \
+                         if not blocked[newTail] and newTail not in body])
+      for successor in successors:
+         if successor not in seen:
+            if len(seen) >= stateLimit:
+               return None
+            seen.add(successor)
+            toVisit.append(successor)
+   return False
+
+## Try to prove that no sequence of moves brings the blue wriggler's head
+# or tail to the lower right corner
+# @param state The initial State
+# @param stateLimit Blue wriggler positions searched at most
+# @return Text saying why the puzzle has no solution, None if it could
+# not be proven
+def ProveUnsolvable(state, stateLimit=STATE_LIMIT):
+   layout = state.puzzle.GetLayout()
+   corner = layout.numCells - 1
+   if layout.walls[corner]:
+      return "the lower right corner is a wall"
+   if state.BlueWrigglerInLowerRightCorner():
+      return None
+
+   immobile = FindImmobileWrigglers(state)
+   if state.indexOfBlue in immobile:
+      return "the blue wriggler can never move"
+   blocked = GetBlockedCells(state, immobile)
+   if blocked[corner]:
+      return "the lower right corner is held by a wriggler that can never move"
+   if not CornerConnected(state, blocked, corner):
+      return "the lower right corner is sealed off from the blue wriggler"
+   if BlueReachesCorner(state, blocked, corner, stateLimit) is False:
+      return "the blue wriggler can not turn its way to the lower right corner"
+   return None
+
+if __name__ == "__main__":
+   from Puzzle import Puzzle
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   import time
+
+   ## Build the initial state of a puzzle given row by row
+   def MakeState(rows):
+      puzz = Puzzle()
+      puzz.numRows = len(rows)
+      puzz.numCols = len(rows[0].split())
+      puzz.puzzle = ' '.join(rows).split()
+      wrigglers = FindWrigglers(puzz)
+      puzz.numWrigglers = len(wrigglers)
+      return MakeInitialState(puzz, wrigglers)
+
+   cases = [
+      # the corner is a wall
+      (['R 0 x', 'e x e', 'e e x'], "wall"),
+      # a wall line cuts the corner off
+      (['R 0 e', 'x x x', 'e e e'], "sealed"),
+      # wriggler 1 is walled in across the only way to the corner
+      (['e x D x e', 'R 0 v e e', 'x x 1 x e'], "sealed"),
+      # wriggler 1 is walled in on the corner
+      (['R 0 x', 'e x D', 'e x 1'], "held"),
+      # the head can not get to the turn down to the corner, the tail has
+      # too little room to pull it there
+      (['R > > 0 e', 'x x e x x', 'x x e e e'], "turn"),
+      # solvable, by moving wriggler 1 out of the way first
+      (['R 0 e', 'e e D', 'e e 1'], None)]
+   for (rows, expected) in cases:
+      reason = ProveUnsolvable(MakeState(rows))
+      if (reason is None) != (expected is None) or \
+            (expected is not None and expected not in reason):
+         print "FAILED on " + ' / '.join(rows) + ": " + str(reason)
+      print ' / '.join(rows) + ': ' + str(reason)
+
+   # none of the puzzles shipped has a proof, and finding that out is fast
+   for puzzleFile in ('puzz0.pz', 'puzz1.pz', 'puzz2.pz', 'puzz.pz', \
+                      'puzz4.pz'):
+      puzz = ReadPuzzle(puzzleFile)
+      startTime = time.time()
+      reason = ProveUnsolvable(MakeInitialState(puzz, FindWrigglers(puzz)))
+      if reason is not None:
+         print "FAILED, " + puzzleFile + " is solvable: " + reason
+      print puzzleFile + ': ' + ('%.3f' % (time.time() - startTime)) + ' s'
@@ -0,0 +1,651 @@
+## @file SolverService.py
+# @author Mathew Anderson
+# @brief Local puzzle solving service with a pool of warm solvers.
+# Starting Python and importing the solver for every puzzle costs more
+# than solving most puzzles. The service is started once, forks a pool
+# of solver processes with every module already imported, and takes
+# puzzles over a localhost TCP or Unix socket. It is single threaded,
+# driven by asyncore.
+#
+# Clients send lines of text. Every reply line names the job it is about.
+#    SOLVE [deadline=SECONDS] [mode=astar|frontier|gbfs]
+#       followed by the puzzle in .pz format (header line, then one line
+#       per row); replies QUEUED <job> <jobs waiting>
+#    CANCEL <job>
+#    STATS
+# A job then reports, as it goes,
+#    STARTED <job>
+#    PROGRESS <job> expanded=<nodes> open=<nodes> depth=<moves>
+#    MOVE <job> <tail> <end> <col> <row>      one per move of the solution
+#    DONE <job> cost=<moves> seconds=<search time>
+# or it ends with FAILED <job> <reason>, CANCELLED <job> or EXPIRED <job>
+# once its deadline passed. A running job is cancelled by killing its
+# solver, which is replaced by a fresh one.
+#
+# Solvers talk to the service over a socket pair in frames: a 4-byte
+# big-endian length and a pickled tuple.
+
+import asynchat
+import asyncore
+import collections
+import cPickle
+import multiprocessing
+import os
+import socket
+import struct
+import sys
+import time
+
+from PuzzleReader import ParsePuzzle
+from WrigglerReader import FindWrigglers
+from Relevance import FreezeIrrelevantWrigglers
+from State import MakeInitialState
+from SearchNode import SearchNode
+from Agent import Agent
+from SearchHooks import SearchHooks
+
+## Length prefix of a frame between the service and a solver
+FRAME_HEADER = struct.Struct('>I')
+
+## Send a frame over a blocking socket
+# @param sock The socket
+# @param message Tuple to send
+def SendFrame(sock, message):
+   payload = cPickle.dumps(message, 2)
+   sock.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+## Receive a frame from a blocking socket
+# @param sock The socket
+# @return The tuple sent, None once the other end closed
+def ReceiveFrame(sock):
+   header = ReceiveExactly(sock, FRAME_HEADER.size)
+   if header is None:
+      return None
+   payload = ReceiveExactly(sock, FRAME_HEADER.unpack(header)[0])
+   if payload is None:
+      return None
+   return cPickle.loads(payload)
+
+## Receive a number of bytes from a blocking socket
+# @param sock The socket
+# @param size Number of bytes
+# @return The bytes, None if the other end closed first
+def ReceiveExactly(sock, size):
+   chunks = []
+   while size > 0:
+      chunk = sock.recv(size)
+      if not chunk:
+         return None
+      chunks.append(chunk)
+      size -= len(chunk)
+   return ''.join(chunks)
+
+## The ProgressReporter class sends a solver's progress to the service
+# from inside the search (see Agent.hooks)
+class ProgressReporter(SearchHooks):
+
+   ## Least seconds between two reports
+   INTERVAL = 0.5
+
+   ## Ctor prepares reports about a job
+   # @param sock Socket to the service
+   # @param jobId The job being solved
+   def __init__(self, sock, jobId):
+      self.sock = sock
+      self.jobId = jobId
+      self.expanded = 0
+      self.lastReportTime = time.time()
+
+   ## Count an expansion and report if it is time to
+   # @param node The SearchNode just expanded
+   # @param heap The open list
+   def OnExpand(self, node, heap):
+      self.expanded += 1
+      if self.expanded & 0xff == 0 and \
+            time.time() - self.lastReportTime >= self.INTERVAL:
+         SendFrame(self.sock, ('progress', self.jobId, self.expanded, \
+                               len(heap), node.pathCost))
+         self.lastReportTime = time.time()
+
+   ## @var sock
+   # Socket to the service
+
+   ## @var jobId
+   # The job being solved
+
+   ## @var expanded
+   # Number of expansions so far
+
+   ## @var lastReportTime
+   # Wall clock time of the last report
+
+## Solve one puzzle
+# @param lines Lines of the puzzle in .pz format
+# @param mode 'astar', 'frontier' or 'gbfs'
+# @param progress (optional) SearchHooks following the search
+# @return (list of move lines, None if there is no solution, or the
+# reason it failed)
+def SolvePuzzle(lines, mode, progress=None):
+   puzzle = ParsePuzzle(lines)
+   if puzzle is None:
+      return (None, 'unreadable puzzle')
+   wrigglers = FindWrigglers(puzzle)
+   if len(wrigglers) == 0:
+      return (None, 'no wrigglers')
+   (wrigglers, relevanceReport) = FreezeIrrelevantWrigglers(puzzle, \
+                                                            wrigglers)
+
+   agent = Agent(SearchNode(MakeInitialState(puzzle, wrigglers), \
+                            None, None, 0))
+   agent.hooks = progress
+   if mode == 'frontier':
+      result = agent.FrontierSearchSolve(True)
+   elif mode == 'gbfs':
+      result = agent.GreedyBestFirstGraphSearch()
+   else:
+      result = agent.AStarSearch()
+   goalNode = result.GetGoalNode()
+   if goalNode is None:
+      return (None, result.status)
+
+   moves = puzzle.GetLayout().moves
+   moveLines = []
+   for node in goalNode.WalkFromRoot():
+      if isinstance(node.action, tuple):
+         moveLines.extend([moves.Format(code) for code in node.action])
+      elif node.action is not None:
+         moveLines.append(moves.Format(node.action))
+   return (moveLines, None)
+
+## Body of a solver process: solve jobs from the service until it goes
+# @param sock This solver's end of its socket pair
+# @param serviceEnd The service's end of the pair
+def RunSolver(sock, serviceEnd):
+   # the service's sockets were inherited, only this one is needed, and
+   # the service going away must close it
+   serviceEnd.close()
+   for channel in asyncore.socket_map.values():
+      channel.socket.close()
+   # searches may print progress of their own
+   sys.stdout = open(os.devnull, 'w')
+
+   while True:
+      message = ReceiveFrame(sock)
+      if message is None:
+         break
+      (jobId, lines, mode) = message
+      startTime = time.time()
+      try:
+         (moveLines, reason) = SolvePuzzle(lines, mode, \
+                                           ProgressReporter(sock, jobId))
+      except Exception as e:
+         (moveLines, reason) = (None, 'solver error: ' + str(e))
+      SendFrame(sock, ('done', jobId, moveLines, reason, \
+                       time.time() - startTime))
+
+## The SolverJob class is one puzzle submitted to the service
+class SolverJob:
+
+   ## Ctor records a submitted puzzle
+   # @param jobId Number of the job
+   # @param client ClientChannel the puzzle came from
+   # @param lines Lines of the puzzle
+   # @param mode Search to solve it with
+   # @param deadline (optional) Wall clock time by which it must be done
+   def __init__(self, jobId, client, lines, mode, deadline):
+      self.jobId = jobId
+      self.client = client
+      self.lines = lines
+      self.mode = mode
+      self.deadline = deadline
+      self.submitTime = time.time()
+      self.solver = None
+
+   ## @var jobId
+   # Number of the job
+
+   ## @var client
+   # ClientChannel the puzzle came from
+
+   ## @var lines
+   # Lines of the puzzle in .pz format
+
+   ## @var mode
+   # Search to solve it with
+
+   ## @var deadline
+   # Wall clock time by which it must be done, None for no deadline
+
+   ## @var submitTime
+   # Wall clock time it was submitted
+
+   ## @var solver
+   # SolverChannel of the solver working on it, None while queued
+
+## The SolverChannel class is the service's end of one solver process
+class SolverChannel(asynchat.async_chat):
+
+   ## Ctor starts a solver process
+   # @param service The SolverService
+   def __init__(self, service):
+      (serviceEnd, solverEnd) = socket.socketpair()
+      self.process = multiprocessing.Process(target=RunSolver, \
+                                             args=(solverEnd, serviceEnd))
+      self.process.daemon = True
+      self.process.start()
+      solverEnd.close()
+
+      asynchat.async_chat.__init__(self, serviceEnd)
+      self.service = service
+      self.job = None
+      self.incoming = []
+      self.frameLength = None
+      self.set_terminator(FRAME_HEADER.size)
+
+   ## Send a job to the solver
+   # @param job The SolverJob
+   def Start(self, job):
+      self.job = job
+      job.solver = self
+      payload = cPickle.dumps((job.jobId, job.lines, job.mode), 2)
+      self.push(FRAME_HEADER.pack(len(payload)) + payload)
+
+   ## Kill the solver process
+   def Kill(self):
+      self.close()
+      if self.process.is_alive():
+         self.process.terminate()
+      self.process.join()
+
+   ## Collect part of a frame
+   # @param data Bytes received
+   def collect_incoming_data(self, data):
+      self.incoming.append(data)
+
+   ## Handle a frame's length or payload once it is complete
+   def found_terminator(self):
+      data = ''.join(self.incoming)
+      self.incoming = []
+      if self.frameLength is None:
+         self.frameLength = FRAME_HEADER.unpack(data)[0]
+         self.set_terminator(self.frameLength)
+      else:
+         self.frameLength = None
+         self.set_terminator(FRAME_HEADER.size)
+         self.service.HandleSolverMessage(self, cPickle.loads(data))
+
+   ## A solver that goes away is replaced
+   def handle_close(self):
+      self.close()
+      self.service.HandleSolverLost(self)
+
+   ## @var process
+   # The solver process
+
+   ## @var service
+   # The SolverService
+
+   ## @var job
+   # SolverJob being solved, None while idle
+
+   ## @var incoming
+   # Parts of the frame received so far
+
+   ## @var frameLength
+   # Length of the payload being received, None while receiving a length
+
+## The ClientChannel class is one connection from a client
+class ClientChannel(asynchat.async_chat):
+
+   ## Ctor starts reading commands from a client
+   # @param sock The connected socket
+   # @param service The SolverService
+   def __init__(self, sock, service):
+      asynchat.async_chat.__init__(self, sock)
+      self.service = service
+      self.incoming = []
+      # while a puzzle is being received, (its lines so far, options)
+      self.puzzle = None
+      self.set_terminator('\n')
+
+   ## Collect part of a line
+   # @param data Bytes received
+   def collect_incoming_data(self, data):
+      self.incoming.append(data)
+
+   ## Handle a complete line
+   def found_terminator(self):
+      line = ''.join(self.incoming).rstrip('\r')
+      self.incoming = []
+      if self.puzzle is not None:
+         self.AddPuzzleLine(line)
+         return
+
+      words = line.split()
+      if not words:
+         return
+      command = words[0].upper()
+      if command == 'SOLVE':
+         self.puzzle = ([], words[1:])
+      elif command == 'CANCEL' and len(words) == 2 and words[1].isdigit():
+         self.service.Cancel(int(words[1]), self)
+      elif command == 'STATS':
+         self.Send('STATS ' + self.service.GetStats())
+      else:
+         self.Send('ERROR unknown command ' + line)
+
+   ## Add a line to the puzzle being received, submitting it once the
+   # header's number of rows has arrived
+   # @param line The line
+   def AddPuzzleLine(self, line):
+      (lines, options) = self.puzzle
+      lines.append(line + '\n')
+      header = lines[0].split()
+      if len(header) != 3 or not header[1].isdigit():
+         self.puzzle = None
+         self.Send('ERROR bad puzzle header ' + line)
+      elif len(lines) == int(header[1]) + 1:
+         self.puzzle = None
+         self.service.Submit(self, lines, options)
+
+   ## Send a line to the client
+   # @param line The line, without its end of line
+   def Send(self, line):
+      self.push(line + '\n')
+
+   ## A client that goes away gives up its jobs
+   def handle_close(self):
+      self.close()
+      self.service.HandleClientLost(self)
+
+   ## @var service
+   # The SolverService
+
+   ## @var incoming
+   # Parts of the line received so far
+
+   ## @var puzzle
+   # (lines received, SOLVE options) while a puzzle is being received,
+   # None otherwise
+
+## The SolverListener class accepts client connections
+class SolverListener(asyncore.dispatcher):
+
+   ## Ctor listens on an address
+   # @param address (host, port) for TCP, or the path of a Unix socket
+   # @param service The SolverService
+   def __init__(self, address, service):
+      asyncore.dispatcher.__init__(self)
+      self.service = service
+      if isinstance(address, tuple):
+         self.create_socket(socket.AF_INET, socket.SOCK_STREAM)
+         self.set_reuse_addr()
+      else:
+         if os.path.exists(address):
+            os.remove(address)
+         self.create_socket(socket.AF_UNIX, socket.SOCK_STREAM)
+      self.bind(address)
+      self.listen(16)
+
+   ## Accept a client
+   def handle_accept(self):
+      connection = self.accept()
+      if connection is not None:
+         ClientChannel(connection[0], self.service)
+
+   ## @var service
+   # The SolverService
+
+## The SolverService class queues jobs to its solvers
+class SolverService:
+
+   ## Number of recent jobs latency percentiles are taken over
+   LATENCY_WINDOW = 1000
+
+   ## Ctor starts the solver processes
+   # @param numSolvers Number of solver processes
+   def __init__(self, numSolvers):
+      self.solvers = [SolverChannel(self) for index in xrange(numSolvers)]
+      self.pending = collections.deque()
+      self.jobs = {}
+      self.nextJobId = 1
+      self.latencies = collections.deque(maxlen=self.LATENCY_WINDOW)
+      self.counts = {'solved': 0, 'failed': 0, 'cancelled': 0, \
+                     'expired': 0}
+
+   ## Serve clients until interrupted
+   # @param address (host, port) for TCP, or the path of a Unix socket
+   def Serve(self, address):
+      SolverListener(address, self)
+      while True:
+         asyncore.loop(timeout=0.1, count=1)
+         self.ExpireJobs()
+
+   ## Queue a puzzle
+   # @param client ClientChannel it came from
+   # @param lines Lines of the puzzle
+   # @param options Words after SOLVE
+   def Submit(self, client, lines, options):
+      deadline = None
+      mode = 'astar'
+      for option in options:
+         (name, ignored, value) = option.partition('=')
+         try:
+            if name == 'deadline':
+               deadline = time.time() + float(value)
+            elif name == 'mode' and value in ('astar', 'frontier', 'gbfs'):
+               mode = value
+            else:
+               raise ValueError(option)
+         except ValueError:
+            client.Send('ERROR bad option ' + option)
+            return
+
+      job = SolverJob(self.nextJobId, client, lines, mode, deadline)
+      self.nextJobId += 1
+      self.jobs[job.jobId] = job
+      self.pending.append(job)
+      client.Send('QUEUED ' + str(job.jobId) + ' ' + str(len(self.pending)))
+      self.Dispatch()
+
+   ## Start queued jobs on idle solvers
+   def Dispatch(self):
+      for solver in self.solvers:
+         if not self.pending:
+            return
+         if solver.job is None:
+            job = self.pending.popleft()
+            solver.Start(job)
+            job.client.Send('STARTED ' + str(job.jobId))
+
+   ## Handle a frame from a solver
+   # @param solver The SolverChannel
+   # @param message The tuple it sent
+   def HandleSolverMessage(self, solver, message):
+      job = solver.job
+      if job is None or message[1] != job.jobId:
+         return
+      if message[0] == 'progress':
+         (kind, jobId, expanded, openNodes, depth) = message
+         job.client.Send('PROGRESS %d expanded=%d open=%d depth=%d' % \
+                         (jobId, expanded, openNodes, depth))
+         return
+
+      (kind, jobId, moveLines, reason, seconds) = message
+      if moveLines is None:
+         job.client.Send('FAILED %d %s' % (jobId, reason))
+         self.counts['failed'] += 1
+      else:
+         for moveLine in moveLines:
+            job.client.Send('MOVE %d %s' % (jobId, moveLine.strip()))
+         job.client.Send('DONE %d cost=%d seconds=%.3f' % \
+                         (jobId, len(moveLines), seconds))
+         self.counts['solved'] += 1
+      self.latencies.append(time.time() - job.submitTime)
+      self.FinishJob(job)
+      self.Dispatch()
+
+   ## Forget a job, and free its solver
+   # @param job The SolverJob
+   def FinishJob(self, job):
+      del self.jobs[job.jobId]
+      if job.solver is not None:
+         job.solver.job = None
+         job.solver = None
+
+   ## Stop a job, queued or running, and tell its client why
+   # @param job The SolverJob
+   # @param outcome 'cancelled' or 'expired'
+   def StopJob(self, job, outcome):
+      if job.solver is None:
+         self.pending.remove(job)
+      else:
+         # a solver can not be interrupted, so it is replaced
+         solver = job.solver
+         self.solvers.remove(solver)
+         solver.Kill()
+         self.solvers.append(SolverChannel(self))
+      self.FinishJob(job)
+      self.counts[outcome] += 1
+      if job.client.connected:
+         job.client.Send(outcome.upper() + ' ' + str(job.jobId))
+      self.Dispatch()
+
+   ## Cancel a job at a client's request
+   # @param jobId Number of the job
+   # @param client ClientChannel asking
+   def Cancel(self, jobId, client):
+      job = self.jobs.get(jobId)
+      if job is None or job.client is not client:
+         client.Send('ERROR unknown job ' + str(jobId))
+      else:
+         self.StopJob(job, 'cancelled')
+
+   ## Stop the jobs whose deadline passed
+   def ExpireJobs(self):
+      now = time.time()
+      for job in self.jobs.values():
+         if job.deadline is not None and job.deadline <= now:
+            self.StopJob(job, 'expired')
+
+   ## Cancel the jobs of a client that went away
+   # @param client The ClientChannel
+   def HandleClientLost(self, client):
+      for job in self.jobs.values():
+         if job.client is client:
+            self.StopJob(job, 'cancelled')
+
+   ## Replace a solver that went away, failing its job
+   # @param solver The SolverChannel
+   def HandleSolverLost(self, solver):
+      if solver not in self.solvers:
+         return
+      self.solvers.remove(solver)
+      solver.process.join()
+      job = solver.job
+      if job is not None:
+         job.client.Send('FAILED %d solver died' % job.jobId)
+         self.counts['failed'] += 1
+         self.FinishJob(job)
+      self.solvers.append(SolverChannel(self))
+      self.Dispatch()
+
+   ## Return a latency percentile of the recent jobs, in milliseconds
+   # @param percent The percentile
+   def GetLatencyPercentile(self, percent):
+      if not self.latencies:
+         return 0.0
+      latencies = sorted(self.latencies)
+      # nearest rank
+      rank = max(0, int(-(-percent * len(latencies) // 100)) - 1)
+      return latencies[rank] * 1000.0
+
+   ## Return the state of the service as name=value words
+   def GetStats(self):
+      running = len([solver for solver in self.solvers \
+                     if solver.job is not None])
+      words = ['queued=%d' % len(self.pending), 'running=%d' % running, \
+               'solvers=%d' % len(self.solvers)]
+      for outcome in ('solved', 'failed', 'cancelled', 'expired'):
+         words.append('%s=%d' % (outcome, self.counts[outcome]))
+      for percent in (50, 90, 99):
+         words.append('p%d=%.1fms' % \
+                      (percent, self.GetLatencyPercentile(percent)))
+      return ' '.join(words)
+
+   ## @var solvers
+   # SolverChannel of every solver process
+
+   ## @var pending
+   # SolverJobs waiting for a solver, oldest first
+
+   ## @var jobs
+   # Every queued or running SolverJob, by number
+
+   ## @var nextJobId
+   # Number of the next job submitted
+
+   ## @var latencies
+   # Seconds from submission to the end of the recent finished jobs
+
+   ## @var counts
+   # Number of jobs that ended each way
+
+## Start a service and serve clients until interrupted
+# @param address (host, port) for TCP, or the path of a Unix socket
+# @param numSolvers Number of solver processes
+def Serve(address, numSolvers):
+   SolverService(numSolvers).Serve(address)
+
+if __name__ == "__main__":
+   address = ('127.0.0.1', 34701)
+   server = multiprocessing.Process(target=Serve, args=(address, 2))
+   server.start()
+
+   client = None
+   for attempt in xrange(50):
+      try:
+         client = socket.create_connection(address)
+         break
+      except socket.error:
+         time.sleep(0.1)
+   replies = client.makefile('r')
+
+   ## Submit a puzzle and return its job number
+   def Submit(options, puzzleFile):
+      client.sendall('SOLVE' + options + '\n' + open(puzzleFile).read())
+      while True:
+         words = replies.readline().split()
+         if words[0] == 'QUEUED':
+            return words[1]
+
+   ## Return the reply lines up to the one ending a job
+   def ReadJob(jobId):
+      lines = []
+      while True:
+         line = replies.readline().strip()
+         lines.append(line)
+         words = line.split()
+         if words[0] in ('DONE', 'FAILED', 'CANCELLED', 'EXPIRED') and \
+               words[1] == str(jobId):
+            return lines
+
+   queued = [Submit('', 'puzz2.pz'), Submit(' deadline=0.5', 'puzz4.pz')]
+   solved = ReadJob(queued[0])
+   moveLines = [line for line in solved if line.startswith('MOVE')]
+   if len(moveLines) != 14 or not solved[-1].startswith('DONE'):
+      print "FAILED to solve puzz2 through the service"
+   expired = ReadJob(queued[1])
+   if not expired[-1].startswith('EXPIRED'):
+      print "FAILED to expire puzz4: " + expired[-1]
+
+   jobId = Submit(' mode=frontier', 'puzz4.pz')
+   client.sendall('CANCEL ' + jobId + '\n')
+   if not ReadJob(jobId)[-1].startswith('CANCELLED'):
+      print "FAILED to cancel puzz4"
+
+   client.sendall('STATS\n')
+   print replies.readline().strip()
+   client.close()
+   server.terminate()
+   server.join()
@@ -0,0 +1,212 @@
+## @file SolverSession.py
+# @author Mathew Anderson
+# @brief Many searches from different starts on the same walls.
+# Everything derived from the walls alone, the Layout with its neighbour
+# table, regions and move table, the tiles every heuristic scan looks at,
+# the lines to the corner and the heuristic cache, does not depend on
+# where the wrigglers start.
+# A session builds the layout once from the walls and shares it with
+# every search it runs, so a solve only places the wrigglers and
+# searches. The scans, lines and heuristic values are filled in lazily,
+# by the first solve that needs them, and kept for the later ones. The
+# heuristic cache is keyed on the tiles the heuristic looks at, so the
+# values one solve computes are right for the next.
+
+import time
+
+from Puzzle import Puzzle
+from State import State
+from SearchNode import SearchNode
+from Agent import Agent
+from WrigglerMover import PlaceBody
+from WrigglerReader import ExtractWrigglers
+
+## The SolverSession class solves wriggler placements on fixed walls
+class SolverSession:
+
+   ## Ctor builds the layout of the walls: its neighbour table, regions
+   # and move table
+   # @param puzzle A puzzle with the walls; any wrigglers in it are
+   # ignored
+   def __init__(self, puzzle):
+      startTime = time.time()
+      self.puzzle = Puzzle()
+      self.puzzle.numCols = puzzle.numCols
+      self.puzzle.numRows = puzzle.numRows
+      self.puzzle.puzzle = [Puzzle.WALL_SQUARE \
+                            if tile == Puzzle.WALL_SQUARE \
+                            else Puzzle.EMPTY_SQUARE \
+                            for tile in puzzle.puzzle]
+      self.layout = self.puzzle.GetLayout()
+      self.budget = None
+      self.numSolves = 0
+      self.solveSeconds = 0.0
+      self.searchSeconds = 0.0
+      self.setupSeconds = time.time() - startTime
+
+   ## Return the placements of the wrigglers of a puzzle on the same walls
+   # @param puzzle The puzzle
+   # @return List of (tail number, linear indices from head to tail)
+   def GetPlacements(self, puzzle):
+      if puzzle.numCols != self.puzzle.numCols or \
+            puzzle.numRows != self.puzzle.numRows or \
+            [tile == Puzzle.WALL_SQUARE for tile in puzzle.puzzle] != \
+            self.layout.walls:
+         raise Exception("Puzzle does not have the walls of the session!")
+      return ExtractWrigglers(puzzle)
+
+   ## Build the root SearchNode of a placement. Wrigglers walled off from
+   # the blue wriggler are left in the static tiles, as Relevance does.
+   # @param placements List of (tail number, linear indices of the cells
+   # from head to tail), one per wriggler
+   def MakeRootNode(self, placements):
+      layout = self.layout
+      components = layout.components
+      occupied = set()
+      blueComponent = None
+      for (tailNumber, cells) in placements:
+         for (position, cell) in enumerate(cells):
+            if cell < 0 or cell >= layout.numCells or layout.walls[cell] or \
+                  cell in occupied:
+               raise Exception("Wriggler " + str(tailNumber) + \
+                               " is on a wall or another wriggler!")
+            if position > 0 and cell not in layout.neighbours[cells[position - 1]]:
+               raise Exception("Wriggler " + str(tailNumber) + \
+                               " is not connected!")
+            occupied.add(cell)
+         if tailNumber == 0:
+            blueComponent = components[cells[0]]
+      if blueComponent is None:
+         raise Exception("There is no blue wriggler!")
+
+      # in the order a puzzle file gives them, head by head down the
+      # columns, so a search expands states as it would from the file
+      numCols = self.puzzle.numCols
+      placements = sorted(placements, key=lambda (tailNumber, cells): \
+                          (cells[0] % numCols, cells[0] // numCols))
+      staticPuzzle = Puzzle()
+      staticPuzzle.CopyFrom(self.puzzle)
+      bodies = []
+      tailIds = []
+      for (tailNumber, cells) in placements:
+         if components[cells[0]] == blueComponent:
+            bodies.append(tuple(cells))
+            tailIds.append(tailNumber)
+         else:
+            PlaceBody(staticPuzzle, layout, cells, tailNumber)
+      staticPuzzle.numWrigglers = len(placements)
+      return SearchNode(State(staticPuzzle, tuple(bodies), tuple(tailIds)), \
+                        None, None, 0)
+
+   ## Find an optimal solution from a placement of the wrigglers with A*
+   # @param placements List of (tail number, linear indices of the cells
+   # from head to tail), one per wriggler
+   # @return (root SearchNode, SearchResult of the search)
+   def Solve(self, placements):
+      startTime = time.time()
+      rootNode = self.MakeRootNode(placements)
+      agent = Agent(rootNode)
+      agent.budget = self.budget
+      result = agent.AStarSearch()
+      self.numSolves += 1
+      self.solveSeconds += time.time() - startTime
+      self.searchSeconds += result.seconds
+      return (rootNode, result)
+
+   ## Summarise the setup and the solves so far
+   def __str__(self):
+      strRep = "Solver session: setup " + ('%.3f' % self.setupSeconds) + \
+         " s, " + str(self.numSolves) + " solves"
+      if self.numSolves > 0:
+         strRep += ", " + ('%.4f' % (self.solveSeconds / self.numSolves)) + \
+            " s per solve of which " + \
+            ('%.4f' % (self.searchSeconds / self.numSolves)) + " s search"
+      return strRep
+
+   ## @var puzzle
+   # Puzzle holding only the walls and empty tiles
+
+   ## @var layout
+   # Static tables of the walls, shared by every solve
+
+   ## @var budget
+   # SearchBudget of each solve, None for no limits
+
+   ## @var setupSeconds
+   # Wall clock time of building the layout
+
+   ## @var numSolves
+   # Number of solves run
+
+   ## @var solveSeconds
+   # Wall clock time of all solves, placing the wrigglers included
+
+   ## @var searchSeconds
+   # Wall clock time of the searches of all solves
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle, ParsePuzzle
+   from WrigglerReader import FindWrigglers
+   from Relevance import FreezeIrrelevantWrigglers
+   from State import MakeInitialState
+   from WrigglerMover import MoveBody
+   from Move import Move
+   import random
+   from cStringIO import StringIO
+
+   ## Return the placements a few random moves away from others
+   def Shuffle(layout, placements, numMoves):
+      bodies = [list(cells) for (tailNumber, cells) in placements]
+      for count in xrange(numMoves):
+         occupied = set()
+         for body in bodies:
+            occupied.update(body)
+         moves = []
+         for (bodyIndex, body) in enumerate(bodies):
+            for (piece, end) in ((Move.HEAD, body[0]), (Move.TAIL, body[-1])):
+               for dest in layout.neighbours[end]:
+                  if dest not in occupied:
+                     moves.append((bodyIndex, piece, dest))
+         if moves:
+            (bodyIndex, piece, dest) = random.choice(moves)
+            bodies[bodyIndex] = list(MoveBody(tuple(bodies[bodyIndex]), \
+                                              piece, dest, layout))
+      return [(tailNumber, tuple(body)) for ((tailNumber, cells), body) \
+              in zip(placements, bodies)]
+
+   ## Solve a placement the way the entry points do: from the text of
+   # a puzzle file, with tables built afresh
+   def SolveCold(session, placements):
+      puzz = Puzzle()
+      puzz.CopyFrom(session.puzzle)
+      puzz.layout = None
+      puzz.numWrigglers = len(placements)
+      for (tailNumber, cells) in placements:
+         PlaceBody(puzz, session.layout, cells, tailNumber)
+      text = str(puzz.numCols) + ' ' + str(puzz.numRows) + ' ' + \
+         str(puzz.numWrigglers) + '\n' + str(puzz)
+      startTime = time.time()
+      puzz = ParsePuzzle(StringIO(text))
+      (wrigglers, report) = FreezeIrrelevantWrigglers(puzz, \
+                                                      FindWrigglers(puzz))
+      rootNode = SearchNode(MakeInitialState(puzz, wrigglers), None, None, 0)
+      result = Agent(rootNode).AStarSearch()
+      return (result, time.time() - startTime)
+
+   random.seed(347)
+   for puzzleFile in ('puzz2.pz', 'puzz.pz'):
+      puzz = ReadPuzzle(puzzleFile)
+      session = SolverSession(puzz)
+      placements = session.GetPlacements(puzz)
+      coldSeconds = 0.0
+      starts = [Shuffle(session.layout, placements, 20) for count in xrange(50)]
+      for start in starts:
+         (rootNode, result) = session.Solve(start)
+         (coldResult, seconds) = SolveCold(session, start)
+         coldSeconds += seconds
+         if result.status != coldResult.status or (result.IsSolved() and \
+               result.node.pathCost != coldResult.node.pathCost):
+            print "FAILED to solve " + str(start) + " as a cold start does"
+      print puzzleFile + ": " + str(session)
+      print "   cold starts: " + ('%.4f' % (coldSeconds / len(starts))) + \
+         " s per solve"
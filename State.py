@@ -4,101 +4,278 @@
 
 from Move import Move
 from Bres import BresLine
+from CornerLines import CornerLineTable
 
 from Puzzle import Puzzle
+from WrigglerMover import GetBody, PlaceBody
 
-## The state class tracks the world state (puzzle)
-# and the list of wrigglers.
-class State:
+## The state class tracks the world state: the cells of every wriggler
+# that may move. Everything else (walls, empty tiles and frozen
+# wrigglers) never changes and is shared by all states of a search.
+class State(object):
+
+   ## A search holds a great many states, fixed attributes spare
+   # each of them a dictionary
+   __slots__ = ('puzzle', 'bodies', 'tailIds', 'indexOfBlue', \
+                'staticClasses', 'occupancy', 'heuristic', 'scanCosts')
 
    ## Constant array of possible moves.
    # Anytime the ACTIONS are determined, both the head
    # and the tail might be able to move Up, Down, Left, or Right
    POSSIBLE_MOVES = [(0, -1), (0, 1), (-1, 0), (1, 0)]
 
+   ## Symbolic constants naming the heuristic parts that scan tiles
+   MOVEMENT_SCAN = 0
+   BRES_SCAN = 1
+
+   ## Classes of tiles the heuristic scans tell apart: open, body
+   # segment and anything else ('o', for walls, heads and tails)
+   TILE_CLASSES = {Puzzle.EMPTY_SQUARE: 'e', \
+                   '^': 's', 'v': 's', '<': 's', '>': 's'}
+
    ## Ctor stores initial conditions
-   def __init__(self, puzzle, wrigglers):
+   # @param puzzle The static puzzle: walls, empty tiles and frozen
+   # wrigglers, without the wrigglers that may move
+   # @param bodies Tuple holding, per wriggler that may move, the tuple
+   # of linear indices of its cells from head to tail
+   # @param tailIds Tuple of the tail numbers of those wrigglers
+   # @param parent (optional) State this one was generated from
+   # @param changedCells (optional) Set of linear indices of the tiles
+   # that differ from parent. Heuristic parts whose scans miss all of
+   # them are taken from parent instead of being recomputed.
+   def __init__(self, puzzle, bodies, tailIds, parent=None, \
+                changedCells=None):
       self.puzzle = puzzle
-      self.wrigglers = wrigglers
-
-      # determine, for the sake of convience, the index
-      # of the blue wriggler.
-      for index, wriggler in list(enumerate(self.wrigglers)):
-         if wriggler.tail.idNumber == 0:
-            self.indexOfBlue = index
+      self.bodies = bodies
+      self.tailIds = tailIds
+      self.occupancy = None
+
+      # the static tiles and the index of the blue wriggler
+      # are the same for every state of a search
+      if parent is not None:
+         self.staticClasses = parent.staticClasses
+         self.indexOfBlue = parent.indexOfBlue
+      else:
+         self.staticClasses = ''.join([State.TILE_CLASSES.get(tile, 'o') \
+                                       for tile in puzzle.puzzle])
+         self.indexOfBlue = tailIds.index(0)
 
       # Calculate the heuristic cost in play
-      self.CalculateHeuristic()
-      # store off a string representation for hash purposes
-      self.puzzStr = ''.join(self.puzzle.puzzle)
-
-
-   def GetDirectPuzzleString(self):
-      return self.puzzStr
+      self.CalculateHeuristic(parent, changedCells)
+      # states waiting in a frontier keep only their bodies,
+      # the occupancy is built again if the state is expanded
+      self.occupancy = None
+
+   ## Return a hashable key identifying this state
+   def GetStateKey(self):
+      return self.bodies
+
+   ## Return the position of a wriggler in bodies and tailIds
+   # @param tailNumber Tail number of the wriggler
+   def GetBodyIndex(self, tailNumber):
+      return self.tailIds.index(tailNumber)
+
+   ## Return the tile classes of the occupied cells, built the first time
+   # it is needed: 'o' for the head and tail of a wriggler and 's' for
+   # the segments in between, as in TILE_CLASSES
+   # @return Dictionary from linear index to tile class
+   def GetOccupancy(self):
+      if self.occupancy is None:
+         occupancy = {}
+         for body in self.bodies:
+            for cell in body:
+               occupancy[cell] = 's'
+            occupancy[body[0]] = 'o'
+            occupancy[body[-1]] = 'o'
+         self.occupancy = occupancy
+      return self.occupancy
+
+   ## Forget the occupancy once a state has been expanded, states kept
+   # in an explored set only need their bodies
+   def ReleaseOccupancy(self):
+      self.occupancy = None
+
+   ## Given the linear index of a tile return if it is "open"
+   # @param index Linear index of the tile to check
+   def IsOpenIndex(self, index):
+      return self.staticClasses[index] == 'e' and \
+         index not in self.GetOccupancy()
+
+   ## Return the class (see TILE_CLASSES) of the tile at a linear index
+   # @param index Linear index of the tile
+   def GetTileClass(self, index):
+      return self.GetOccupancy().get(index) or self.staticClasses[index]
 
    ## Determine if the head or tail of the blue wriggler
    # is located in the lower right corner of the puzzle.
    # This constitutes a check for goal state.
    def BlueWrigglerInLowerRightCorner(self):
-      lowerRightCorner = self.puzzle.GetLowerRightCornerPosition()
-      return self.wrigglers[self.indexOfBlue].HeadOrTailAtPos(lowerRightCorner)
+      corner = self.puzzle.GetLayout().numCells - 1
+      blueBody = self.bodies[self.indexOfBlue]
+      return blueBody[0] == corner or blueBody[-1] == corner
 
    ## Generate all legal moves from all wrigglers in the state
+   # @return A list of packed move codes (see Move.MoveTable)
    def Actions(self):
       legalMoves = []
 
       # foreach wriggler, generate all Moves
       # and extend the legalMoves list
-      for wriggler in self.wrigglers:
-         wrigglerMoves = self.WrigglerActions(wriggler)
+      for bodyIndex in xrange(len(self.bodies)):
+         wrigglerMoves = self.WrigglerActions(bodyIndex)
          legalMoves.extend(wrigglerMoves)
 
       return legalMoves
 
    ## Generate all legal moves from a given wriggler
-   # @param wriggler The wriggler which is being considered for moving
-   def WrigglerActions(self, wriggler):
+   # @param bodyIndex Position of the wriggler in bodies
+   # @return A list of packed move codes
+   def WrigglerActions(self, bodyIndex):
       # initialize the output
       wrigglerActions = []
-      # get the head & tail pos of wriggler
-      headPos = wriggler.GetHeadPosition()
-      tailPos = wriggler.GetTailPosition()
-      tailNum = wriggler.GetTailNumber() # tail number is part of the Move
-      # for each possible move
-      for pMove in State.POSSIBLE_MOVES:
-         # generate a new position for both head and tail
-         newHead = (headPos[0] + pMove[0], headPos[1] + pMove[1])
-         # for both head and tail pos
-         # and if it is within the boundaries of the puzzle
-         # and it's open
-         if self.puzzle.PositionInBounds(newHead) and self.puzzle.IsOpen(newHead):
-            # add it to our list of wriggler actions possible
-            headMove = Move(tailNum, Move.HEAD, newHead[0], newHead[1])
-            wrigglerActions.append(headMove)
-
-         newTail = (tailPos[0] + pMove[0], tailPos[1] + pMove[1])
-
-         if self.puzzle.PositionInBounds(newTail) and self.puzzle.IsOpen(newTail):
-            tailMove = Move(tailNum, Move.TAIL, newTail[0], newTail[1])
-            wrigglerActions.append(tailMove)
+      layout = self.puzzle.GetLayout()
+      staticClasses = self.staticClasses
+      occupancy = self.GetOccupancy()
+      body = self.bodies[bodyIndex]
+      # codes are ((tail number * 2) + piece) * cells + destination
+      tailNum = self.tailIds[bodyIndex] # tail number is part of the Move
+      headBase = layout.moves.Encode(tailNum, Move.HEAD, 0)
+      tailBase = layout.moves.Encode(tailNum, Move.TAIL, 0)
+
+      # the neighbour table only holds in-bounds, non-wall tiles,
+      # so all that remains is checking they are not occupied
+      for newHead in layout.neighbours[body[0]]:
+         if staticClasses[newHead] == 'e' and newHead not in occupancy:
+            wrigglerActions.append(headBase + newHead)
+
+      for newTail in layout.neighbours[body[-1]]:
+         if staticClasses[newTail] == 'e' and newTail not in occupancy:
+            wrigglerActions.append(tailBase + newTail)
 
       # return the list of legal actions
       return wrigglerActions
 
+   ## Generate the corridor macro moves of all wrigglers in the state.
+   # A macro slides one end of a wriggler through a corridor (cells
+   # with exactly two non-wall neighbours) until it reaches a decision
+   # point, a blocked cell or the goal. Macros are offered alongside the
+   # single steps, which stay available, so no solution is lost.
+   # @return A list of macros, each a tuple of packed move codes
+   def MacroActions(self):
+      macros = []
+      for bodyIndex in xrange(len(self.bodies)):
+         for pieceMoved in (Move.HEAD, Move.TAIL):
+            macros.extend(self.WrigglerMacroActions(bodyIndex, pieceMoved))
+      return macros
+
+   ## Generate the corridor macros for one end of a wriggler
+   # @param bodyIndex Position of the wriggler in bodies
+   # @param pieceMoved Move.HEAD or Move.TAIL
+   # @return A list of macros, each a tuple of packed move codes
+   def WrigglerMacroActions(self, bodyIndex, pieceMoved):
+      layout = self.puzzle.GetLayout()
+      neighbours = layout.neighbours
+      tailNumber = self.tailIds[bodyIndex]
+      codeBase = layout.moves.Encode(tailNumber, pieceMoved, 0)
+      # goal cell, only of interest while sliding the blue wriggler
+      goal = -1
+      if tailNumber == 0:
+         goal = layout.numCells - 1
+
+      # cells of the wriggler with the moving end first
+      body = list(self.bodies[bodyIndex])
+      if pieceMoved == Move.TAIL:
+         body.reverse()
+
+      macros = []
+      for firstStep in neighbours[body[0]]:
+         if not self.IsOpenIndex(firstStep):
+            continue
+         steps = []
+         previous = body[0]
+         current = firstStep
+         movedBody = list(body)
+         while True:
+            steps.append(codeBase + current)
+            movedBody.insert(0, current)
+            movedBody.pop()
+            # stop at decision points and on reaching the goal
+            if len(neighbours[current]) != 2 or \
+                  movedBody[0] == goal or movedBody[-1] == goal:
+               break
+            onward = neighbours[current][0]
+            if onward == previous:
+               onward = neighbours[current][1]
+            # stop when the corridor ahead is occupied, by this wriggler
+            # where it is now or by anything that was not this wriggler
+            if onward in movedBody or (onward not in body and \
+                  not self.IsOpenIndex(onward)):
+               break
+            previous = current
+            current = onward
+
+         # a single step is already one of the regular actions
+         if len(steps) > 1:
+            macros.append(tuple(steps))
+
+      return macros
+
    ## Return the stored heuristic cost of this state.
    def GetHeuristicCost(self):
       return self.heuristic
 
    ## Calculate the heuristic cost for this State.
-   # @param which Variable for expansion later
-   #    will ultimately allow heuristic selection
-   def CalculateHeuristic(self):
+   # @param parent (optional) State this one was generated from
+   # @param changedCells (optional) Linear indices of the tiles that
+   # differ from parent
+   def CalculateHeuristic(self, parent=None, changedCells=None):
       # Get goal position
       lowerRightCorner = self.puzzle.GetLowerRightCornerPosition()
+      layout = self.puzzle.GetLayout()
+      blueBody = self.bodies[self.indexOfBlue]
       # get head position of blue wriggler
-      headPos = self.wrigglers[self.indexOfBlue].GetHeadPosition()
+      headPos = layout.GetPosition(blueBody[0])
       # get tail position of blue wriggler
-      tailPos = self.wrigglers[self.indexOfBlue].GetTailPosition()
+      tailPos = layout.GetPosition(blueBody[-1])
+
+      # The tile scans only need redoing if the blue wriggler moved
+      # or one of the tiles they look at changed
+      parentScans = None
+      if parent is not None and changedCells is not None:
+         parentBlue = parent.bodies[parent.indexOfBlue]
+         if parentBlue[0] == blueBody[0] and parentBlue[-1] == blueBody[-1]:
+            parentScans = parent.scanCosts
+
+      inspectedCells = self.GetInspectedCells(headPos, tailPos, \
+                                              lowerRightCorner)
+      if parentScans is not None and changedCells.isdisjoint(inspectedCells):
+         # nothing the heuristic looks at changed
+         self.scanCosts = parentScans
+         self.heuristic = parent.heuristic
+         return
+
+      # otherwise the same ends over the same tiles may have been seen
+      cache = layout.heuristicCache
+      cacheKey = (headPos, tailPos, self.GetTileClasses(inspectedCells))
+      cached = cache.Get(cacheKey)
+      if cached is not None:
+         (self.heuristic, self.scanCosts) = cached
+         return
+
+      scans = []
+      for (scanKind, pos) in [(State.MOVEMENT_SCAN, headPos), \
+                              (State.MOVEMENT_SCAN, tailPos), \
+                              (State.BRES_SCAN, headPos), \
+                              (State.BRES_SCAN, tailPos)]:
+         if parentScans is not None and changedCells.isdisjoint( \
+               self.GetScannedCells(scanKind, pos, lowerRightCorner)):
+            scans.append(parentScans[len(scans)])
+         elif scanKind == State.MOVEMENT_SCAN:
+            scans.append(self.GetCostOfMovement(pos, lowerRightCorner))
+         else:
+            scans.append(self.GetCornerLines().GetLineCost( \
+               layout.GetIndex(pos), self.GetOccupancy()))
+      self.scanCosts = tuple(scans)
 
 
       ## Manhattan distance is almost never used in the max
@@ -107,23 +284,19 @@ class State:
          self.GetTotalSquaresBetween(tailPos, lowerRightCorner))       
 
       ## Can't really tell if this is dominant
-      costOfMove = min( \
-         self.GetCostOfMovement(headPos, lowerRightCorner), \
-         self.GetCostOfMovement(tailPos, lowerRightCorner))
+      costOfMove = min(scans[0], scans[1])
 
       ## Almost never correct
-      bresLine = min( \
-         len(BresLine(headPos, lowerRightCorner)) - 1, \
-         len(BresLine(tailPos, lowerRightCorner)) - 1)
+      cornerLines = self.GetCornerLines()
+      bresLine = min(cornerLines.GetLength(blueBody[0]), \
+                     cornerLines.GetLength(blueBody[-1]))
 
       ## This will return a non-unique max
       #simpleDigestBresLine = min( \
          #self.SimpleDigestBresLines(headPos, lowerRightCorner),
          #self.SimpleDigestBresLines(tailPos, lowerRightCorner))
 
-      totCostBresLine = min (\
-         self.DigestBresLines(headPos, lowerRightCorner),
-         self.DigestBresLines(tailPos, lowerRightCorner))
+      totCostBresLine = min(scans[2], scans[3])
 
       # Euclidean distance is dominated by bres line
       #euclidDistance = min (\
@@ -134,6 +307,7 @@ class State:
          #str([totSq, costOfMove, bresLine, simpleDigestBresLine, totCostBresLine])
       #self.heuristic = max(totSq, costOfMove, bresLine, simpleDigestBresLine, totCostBresLine)
       self.heuristic = max(totSq, costOfMove, bresLine, totCostBresLine)
+      cache.Put(cacheKey, (self.heuristic, self.scanCosts))
 
    def EuclideanDistance(self, start, end):
       dx = end[1] - start[1]
@@ -141,6 +315,68 @@ class State:
 
       return (dx ** 2 + dy ** 2) ** 0.5
 
+   ## Return the set of tiles a heuristic scan from a position looks at.
+   # The sets only depend on the position, so they are kept with the
+   # puzzle's layout and shared by every state of the search.
+   # @param scanKind State.MOVEMENT_SCAN or State.BRES_SCAN
+   # @param start (col, row) where the scan starts
+   # @param end (col, row) where the scan ends
+   def GetScannedCells(self, scanKind, start, end):
+      scannedCells = self.puzzle.GetLayout().scannedCells
+      key = (scanKind, start, end)
+      cells = scannedCells.get(key)
+      if cells is None:
+         if scanKind == State.MOVEMENT_SCAN:
+            cells = frozenset(self.GetMovementIndices(start, end))
+         else:
+            line = BresLine(start, end)
+            indices = []
+            for index in range(0, len(line) - 1):
+               indices.extend(self.GetMovementIndices(line[index], \
+                                                      line[index+1]))
+            cells = frozenset(indices)
+         scannedCells[key] = cells
+      return cells
+
+   ## Return the Bresenham lines from the tiles to the lower right
+   # corner, priced over the static tiles of this puzzle. They are kept
+   # with the layout, one table per set of static tiles.
+   def GetCornerLines(self):
+      layout = self.puzzle.GetLayout()
+      cornerLines = layout.cornerLines.get(self.staticClasses)
+      if cornerLines is None:
+         cornerLines = CornerLineTable(layout, self.staticClasses, \
+                                       State.GetRelaxedCostOfClass)
+         layout.cornerLines[self.staticClasses] = cornerLines
+      return cornerLines
+
+   ## Return every tile the heuristic scans look at for a given
+   # position of the blue wriggler, in a fixed order.
+   # @param headPos (col, row) of the blue head
+   # @param tailPos (col, row) of the blue tail
+   # @param end (col, row) of the goal
+   def GetInspectedCells(self, headPos, tailPos, end):
+      inspectedCells = self.puzzle.GetLayout().inspectedCells
+      key = (headPos, tailPos)
+      cells = inspectedCells.get(key)
+      if cells is None:
+         allCells = set()
+         for scanKind in (State.MOVEMENT_SCAN, State.BRES_SCAN):
+            allCells.update(self.GetScannedCells(scanKind, headPos, end))
+            allCells.update(self.GetScannedCells(scanKind, tailPos, end))
+         cells = tuple(sorted(allCells))
+         inspectedCells[key] = cells
+      return cells
+
+   ## Summarise the tiles at a list of cells by the classes
+   # GetRelaxedCostOfIndex tells apart, one character per cell.
+   # @param cells Linear indices of the tiles
+   def GetTileClasses(self, cells):
+      occupancy = self.GetOccupancy()
+      staticClasses = self.staticClasses
+      return ''.join([occupancy.get(index) or staticClasses[index] \
+                      for index in cells])
+
    def DigestBresLines(self, start, end):
       # Get a line from start to end
       line = BresLine(start, end)
@@ -161,13 +397,28 @@ class State:
    def GetRelaxedCostOfNode(self, pos):
       tileHCost = 0
       if self.puzzle.PositionInBounds(pos):
-         if self.puzzle.IsOpen(pos):
-            lnCost = 1
-         elif self.puzzle.GetTile(pos[0], pos[1]) in ['^', 'v', '<', '>']:
-            lnCost = 3
-         else:
-            lnCost = 2
-         
+         tileHCost = self.GetRelaxedCostOfIndex( \
+            self.puzzle.GetLinearIndex(pos[0], pos[1]))
+
+      return tileHCost
+
+   ## Same as GetRelaxedCostOfNode for a tile known to be in bounds
+   # @param index Linear index of the tile to consider
+   def GetRelaxedCostOfIndex(self, index):
+      return State.GetRelaxedCostOfClass(self.GetTileClass(index))
+
+   ## Same as GetRelaxedCostOfNode for a tile of a known class
+   # @param tileClass Class of the tile (see TILE_CLASSES)
+   @staticmethod
+   def GetRelaxedCostOfClass(tileClass):
+      tileHCost = 0
+      if tileClass == 'e':
+         lnCost = 1
+      elif tileClass == 's':
+         lnCost = 3
+      else:
+         lnCost = 2
+
       return tileHCost
 
    ## Move through a line, but take into account puzzle tile
@@ -207,6 +458,17 @@ class State:
       rowCostOfMovement += self.ScanCol((end[0], start[1]), end[1])
       return min(colCostOfMovement, rowCostOfMovement)
 
+   ## Return the linear indices of all tiles GetCostOfMovement looks at
+   # @param start (col, row) current position of wriggler
+   # @param end (col, row) goal tile
+   def GetMovementIndices(self, start, end):
+      indices = []
+      indices.extend(self.ColIndices(start, end[1]))
+      indices.extend(self.RowIndices((start[0], end[1]), end[0]))
+      indices.extend(self.RowIndices(start, end[0]))
+      indices.extend(self.ColIndices((end[0], start[1]), end[1]))
+      return indices
+
    ## Scan a row for heuristic movement costs. Empty sqauare = 1
    # blocked counts for more (blocked == not empty).
    # @param startPos The (col, row) position from which the scan
@@ -215,13 +477,20 @@ class State:
    # @return The total cost of moving along this row
    def ScanRow(self, startPos, colCount):
       rowCost = 0
-      (currCol, row) = startPos
-      currCol += 1
-      while currCol <= colCount:
-         rowCost += self.GetRelaxedCostOfNode((currCol, row))
-         currCol += 1
+      for index in self.RowIndices(startPos, colCount):
+         rowCost += self.GetRelaxedCostOfIndex(index)
       return rowCost
 
+   ## Return the linear indices of the tiles ScanRow looks at
+   # @param startPos The (col, row) position from which the scan
+   # should start
+   # @param colCount Zero-based end of column
+   def RowIndices(self, startPos, colCount):
+      (currCol, row) = startPos
+      # the scan never leaves the row, so no bounds checks are needed
+      rowStart = row * self.puzzle.numCols
+      return xrange(rowStart + currCol + 1, rowStart + colCount + 1)
+
    ## Scan a col for heuristic movement costs. Empty sqauare = 1
    # blocked counts for more (blocked == not empty).
    # @param startPos The (col, row) position from which the scan
@@ -230,53 +499,98 @@ class State:
    # @return The total cost of moving along this column
    def ScanCol(self, startPos, rowCount):
       colCost = 0
-      (col, currRow) = startPos
-      currRow += 1
-      while currRow <= rowCount:
-         colCost += self.GetRelaxedCostOfNode((col, currRow))
-         currRow += 1
+      for index in self.ColIndices(startPos, rowCount):
+         colCost += self.GetRelaxedCostOfIndex(index)
       return colCost
 
-   ## Have each wriggler update it's character representation
-   # and put that in the puzzle string itself.
+   ## Return the linear indices of the tiles ScanCol looks at
+   # @param startPos The (col, row) position from which the scan
+   # should start
+   # @param rowCount Zero-based end of rows
+   def ColIndices(self, startPos, rowCount):
+      (col, currRow) = startPos
+      # the scan never leaves the column, so no bounds checks are needed
+      numCols = self.puzzle.numCols
+      return xrange((currRow + 1) * numCols + col, \
+                    rowCount * numCols + col + 1, numCols)
+
+   ## Render the puzzle with every wriggler placed.
    # Return the string representation of this action
    def ConstructSolution(self):
       return str(self)
 
+   ## Return a copy of the static puzzle with every wriggler placed.
+   # Characters come straight from the order of each body's cells.
+   def Render(self):
+      rendered = Puzzle()
+      rendered.CopyFrom(self.puzzle)
+      layout = self.puzzle.GetLayout()
+      for bodyIndex in xrange(len(self.bodies)):
+         PlaceBody(rendered, layout, self.bodies[bodyIndex], \
+                   self.tailIds[bodyIndex])
+      return rendered
+
+   ## Write the puzzle with all wrigglers placed to a file object,
+   # without building the whole string
+   # @param outFile File-like object to write to
+   def WritePuzzle(self, outFile):
+      self.Render().WritePuzzle(outFile)
+
    ## Return a representation of the puzzle with all wrigglers
-   # placed.
+   # placed. The static puzzle is copied, never changed.
    def __str__(self):
-      for wrig in self.wrigglers:
-         numSegs = len(wrig.segments)
-         if numSegs > 0:
-            wrig.head.UpdateSegmentCharacter(wrig.segments[0])
-            for seg in xrange(0, numSegs-1):
-               wrig.segments[seg].UpdateSegmentCharacter(\
-                  wrig.segments[seg+1])
-
-            wrig.segments[-1].UpdateSegmentCharacter(wrig.tail)
-         else:
-            wrig.head.UpdateSegmentCharacter(wrig.tail)
-
-         self.puzzle.PlaceWriggler(wrig)
-      
-      return str(self.puzzle)
+      return str(self.Render())
 
    ## @var puzzle
    # An object with rows and columns that defines an open
    # and closed state of each (col, row) tuple. This object
    # must also have a defniition for lower right corner and
    # be able to bounds check a given (col, row).
+   # Holds only what never moves and is shared by all states.
+
+   ## @var bodies
+   # Per wriggler that may move, a tuple of the linear indices
+   # of its cells from head to tail
 
-   ## @var wrigglers
-   # A list of Wriggler objects
-   # A Wriggler must have a head and tail and must allow
-   # the state to present a (col, row) and determine if
-   # the head or tail resides at that "position"
+   ## @var tailIds
+   # Per wriggler that may move, its tail number, shared by all states
+
+   ## @var indexOfBlue
+   # Position of the blue wriggler in bodies
+
+   ## @var staticClasses
+   # Per cell, the class of the static tile (see TILE_CLASSES),
+   # shared by all states
+
+   ## @var occupancy
+   # Tile classes of the cells the wrigglers occupy, None until needed
 
    ## @var heuristicCost
    # h(n) of this state.
 
+   ## @var scanCosts
+   # Costs of the tile scans from the blue head and tail, movement
+   # scans first, kept so children can reuse them
+
+## Build the initial state of a search
+# @param puzzle The puzzle as read, wrigglers included
+# @param wrigglers The wrigglers that may move, any other wriggler
+# in the puzzle stays where it is as part of the static tiles
+# @return The State, sharing a static copy of puzzle
+def MakeInitialState(puzzle, wrigglers):
+   layout = puzzle.GetLayout()
+   staticPuzzle = Puzzle()
+   staticPuzzle.CopyFrom(puzzle)
+   bodies = []
+   tailIds = []
+   for wriggler in wrigglers:
+      body = GetBody(wriggler, layout)
+      for cell in body:
+         staticPuzzle.ClearIndex(cell)
+      bodies.append(body)
+      tailIds.append(wriggler.GetTailNumber())
+   return State(staticPuzzle, tuple(bodies), tuple(tailIds))
+
 if __name__ == "__main__":
    # test legal move determination
    from PuzzleReader import ReadPuzzle
@@ -284,9 +598,13 @@ if __name__ == "__main__":
 
    puzz = ReadPuzzle('puzz1.pz')
    wrigglers = FindWrigglers(puzz)
-   state = State(puzz, wrigglers)
+   state = MakeInitialState(puzz, wrigglers)
 
    allLegalMoves = state.Actions()
 
-   for move in allLegalMoves:
-      print str(move)
+   print puzz.GetLayout().moves.FormatAll(allLegalMoves)
+
+   # and the corridor macros on top of them
+   for macro in state.MacroActions():
+      print "Macro:"
+      print puzz.GetLayout().moves.FormatAll(macro)
@@ -0,0 +1,122 @@
+## @file TileGrid.py
+# @author Mathew Anderson
+# @brief Copy-on-write grid of puzzle tiles.
+# Generating a child state changes only a handful of tiles, so copying
+# every tile of the parent is wasted work on large puzzles. A TileGrid is
+# split into chunks (one per row); a copy shares all chunks with its
+# source and a chunk is only copied the first time either side writes it.
+
+## The TileGrid class behaves like the flat list of tiles it replaces:
+# it supports indexing by linear index, assignment, len and iteration.
+class TileGrid:
+
+   ## Ctor splits a flat list of tiles into chunks
+   # @param tiles Flat list of tile characters, None for an empty grid
+   # that Copy fills in
+   # @param chunkSize Number of tiles per chunk, usually the row width
+   def __init__(self, tiles, chunkSize):
+      self.chunkSize = max(1, chunkSize)
+      if tiles is None:
+         return
+      self.numTiles = len(tiles)
+      self.chunks = [list(tiles[start:start + self.chunkSize]) \
+                     for start in xrange(0, self.numTiles, self.chunkSize)]
+      self.chunkStrings = [None] * len(self.chunks)
+      # a fresh grid shares nothing, so it may write any chunk in place
+      self.ownedChunks = set(xrange(len(self.chunks)))
+
+   ## Return a grid with the same tiles that shares every chunk with
+   # this one. Costs one reference per chunk, not one per tile.
+   def Copy(self):
+      other = TileGrid(None, self.chunkSize)
+      other.numTiles = self.numTiles
+      other.chunks = self.chunks[:]
+      other.chunkStrings = self.chunkStrings[:]
+      other.ownedChunks = set()
+      # neither side may now write a shared chunk in place
+      if self.ownedChunks:
+         self.ownedChunks = set()
+      return other
+
+   ## Return the tile at a linear index
+   # @param index Linear index of the tile
+   def __getitem__(self, index):
+      return self.chunks[index // self.chunkSize][index % self.chunkSize]
+
+   ## Return the tiles from one linear index up to another as a list
+   # @param start Linear index of the first tile
+   # @param end Linear index one past the last tile
+   def __getslice__(self, start, end):
+      end = min(end, self.numTiles)
+      chunkSize = self.chunkSize
+      tiles = []
+      while start < end:
+         (chunkIndex, offset) = divmod(start, chunkSize)
+         tiles.extend(self.chunks[chunkIndex][offset:offset + end - start])
+         start += chunkSize - offset
+      return tiles
+
+   ## Set the tile at a linear index, copying its chunk if it is shared
+   # @param index Linear index of the tile
+   # @param char Character to store
+   def __setitem__(self, index, char):
+      chunkIndex = index // self.chunkSize
+      if chunkIndex not in self.ownedChunks:
+         self.chunks[chunkIndex] = list(self.chunks[chunkIndex])
+         self.ownedChunks.add(chunkIndex)
+      self.chunks[chunkIndex][index % self.chunkSize] = char
+      self.chunkStrings[chunkIndex] = None
+
+   ## Return the number of tiles
+   def __len__(self):
+      return self.numTiles
+
+   ## Iterate over the tiles in linear order
+   def __iter__(self):
+      for chunk in self.chunks:
+         for tile in chunk:
+            yield tile
+
+   ## Return all tiles joined into one string, one character per tile.
+   # The string of each chunk is remembered until the chunk is written,
+   # and is shared with copies, so only changed chunks are joined again.
+   def Join(self):
+      chunkStrings = self.chunkStrings
+      for chunkIndex in xrange(len(chunkStrings)):
+         if chunkStrings[chunkIndex] is None:
+            chunkStrings[chunkIndex] = ''.join(self.chunks[chunkIndex])
+      return ''.join(chunkStrings)
+
+   ## @var chunkSize
+   # Number of tiles per chunk
+
+   ## @var numTiles
+   # Total number of tiles
+
+   ## @var chunks
+   # Lists of tiles, possibly shared with other grids
+
+   ## @var chunkStrings
+   # Per chunk, its tiles joined into a string, or None if not yet known
+
+   ## @var ownedChunks
+   # Set of the chunk numbers no other grid shares
+
+if __name__ == "__main__":
+   parent = TileGrid(['e', 'x', 'e', '0', '<', 'L'], 3)
+   parent.Join()
+   child = parent.Copy()
+   child[4] = 'e'
+
+   if parent[4] != '<' or child[4] != 'e':
+      print "FAILED to copy the written chunk"
+   if child.chunks[0] is not parent.chunks[0]:
+      print "FAILED to share the unwritten chunk"
+   parent[0] = 'x'
+   if child[0] != 'e':
+      print "FAILED to copy a chunk written by the source"
+   if child[2:5] != ['e', '0', 'e'] or child[4:10] != ['e', 'L']:
+      print "FAILED slicing " + str(child[2:5]) + " and " + str(child[4:10])
+   if child.Join() != 'exe0eL' or list(parent) != list('xxe0<L'):
+      print "FAILED joining " + child.Join() + " and " + ''.join(parent)
+   print "Parent " + parent.Join() + ", child " + child.Join()
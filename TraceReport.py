@@ -0,0 +1,229 @@
+## @file TraceReport.py
+# @author Mathew Anderson
+# @brief Offline analysis of a search trace (see SearchTrace).
+# The report shows where a search spent its expansions:
+#    - per depth, the expansions, the children they generated, how many
+#      of those were duplicates, and the effective branching factor:
+#      the expansions at the next depth over the expansions at this one
+#    - the effective branching factor b* of the whole search, the one a
+#      uniform tree as deep as the solution would need to hold as many
+#      nodes as were expanded
+#    - along the solution path, the heuristic against the true distance
+#      to the goal, which is known exactly there: the cost of the rest of
+#      the path, if the search is optimal, otherwise an upper bound
+#    - along the solution path, when each of its states was expanded and
+#      how many expansions went elsewhere in between
+# Depth is the path cost g, which is the number of moves unless corridor
+# macros are on.
+
+from SearchTrace import ReadTrace, EXPAND, DUPLICATE, PATH
+
+## The TraceReport class gathers the statistics of a trace
+class TraceReport:
+
+   ## Ctor reads a trace through once
+   # @param path Name of the trace file
+   def __init__(self, path):
+      self.tracePath = path
+      self.numExpanded = 0
+      self.numDuplicates = 0
+      self.expandedAt = {}
+      self.childrenAt = {}
+      self.duplicatesAt = {}
+      self.fCounts = {}
+      self.firstExpansion = {}
+      self.path = []
+      for (kind, key, parentKey, g, h, moveCode, frontierSize, \
+           numChildren) in ReadTrace(path):
+         if kind == EXPAND:
+            self.expandedAt[g] = self.expandedAt.get(g, 0) + 1
+            self.childrenAt[g] = self.childrenAt.get(g, 0) + numChildren
+            self.fCounts[g + h] = self.fCounts.get(g + h, 0) + 1
+            if key not in self.firstExpansion:
+               self.firstExpansion[key] = self.numExpanded
+            self.numExpanded += 1
+         elif kind == DUPLICATE:
+            # charged to the depth of the parent, as its children are
+            self.duplicatesAt[g - 1] = self.duplicatesAt.get(g - 1, 0) + 1
+            self.numDuplicates += 1
+         elif kind == PATH:
+            self.path.append((key, g, h))
+
+   ## Return the cost of the solution, None if the trace has none
+   def GetSolutionCost(self):
+      if not self.path:
+         return None
+      return self.path[-1][1]
+
+   ## Return the effective branching factor b* of the whole search:
+   # 1 + b* + b*^2 + ... + b*^d = expansions + 1 for a solution of d
+   # moves, None without a solution
+   def GetEffectiveBranchingFactor(self):
+      depth = self.GetSolutionCost()
+      if not depth:
+         return None
+      target = self.numExpanded + 1
+
+      ## Number of nodes of a uniform tree d deep
+      def TreeSize(branching):
+         return sum([branching ** level for level in xrange(depth + 1)])
+
+      # b*^d alone reaches the target at this bound
+      low = 0.0
+      high = max(1.0, target ** (1.0 / depth))
+      for step in xrange(100):
+         middle = (low + high) / 2
+         if TreeSize(middle) < target:
+            low = middle
+         else:
+            high = middle
+      return (low + high) / 2
+
+   ## Return the depth rows: (depth, expanded, children, duplicates,
+   # duplicate rate, effective branching factor to the next depth)
+   def GetDepthRows(self):
+      rows = []
+      for depth in sorted(self.expandedAt):
+         expanded = self.expandedAt[depth]
+         children = self.childrenAt.get(depth, 0)
+         duplicates = self.duplicatesAt.get(depth, 0)
+         duplicateRate = None
+         if children > 0:
+            duplicateRate = float(duplicates) / children
+         branching = None
+         if depth + 1 in self.expandedAt:
+            branching = float(self.expandedAt[depth + 1]) / expanded
+         rows.append((depth, expanded, children, duplicates, duplicateRate, \
+                      branching))
+      return rows
+
+   ## Return the solution path rows: (depth, h, true distance, expansion
+   # number, expansions since the path state before it)
+   def GetPathRows(self):
+      rows = []
+      cost = self.GetSolutionCost()
+      previousExpansion = None
+      for (key, g, h) in self.path:
+         expansion = self.firstExpansion.get(key)
+         detour = None
+         if expansion is not None and previousExpansion is not None:
+            detour = expansion - previousExpansion - 1
+         if expansion is not None:
+            previousExpansion = expansion
+         rows.append((g, h, cost - g, expansion, detour))
+      return rows
+
+   ## Summarise the heuristic along the solution path
+   # @return (mean error, largest error, number of states where it
+   # overestimates), errors being true distance minus h
+   def GetHeuristicError(self):
+      errors = [trueDistance - h for (g, h, trueDistance, expansion, detour) \
+                in self.GetPathRows()]
+      if not errors:
+         return None
+      return (float(sum(errors)) / len(errors), max(errors), \
+              len([error for error in errors if error < 0]))
+
+   ## Format the report
+   def __str__(self):
+      lines = ["Trace " + self.tracePath + ": " + str(self.numExpanded) + \
+               " expansions, " + str(self.numDuplicates) + " duplicates"]
+      cost = self.GetSolutionCost()
+      if cost is None:
+         lines.append("No solution in the trace")
+      else:
+         branching = self.GetEffectiveBranchingFactor()
+         lines.append("Solution of cost " + str(cost) + \
+                      ", effective branching factor " + \
+                      ('%.3f' % branching if branching is not None else '-'))
+         below = sum([count for (f, count) in self.fCounts.iteritems() \
+                      if f < cost])
+         lines.append("Expansions with f below the solution cost " + \
+                      str(below) + ", at it " + \
+                      str(self.fCounts.get(cost, 0)) + ", above it " + \
+                      str(self.numExpanded - below - \
+                          self.fCounts.get(cost, 0)))
+
+      lines.append("")
+      lines.append("depth  expanded  children  duplicates  dup rate  EBF")
+      for (depth, expanded, children, duplicates, duplicateRate, \
+           branching) in self.GetDepthRows():
+         lines.append('%5d  %8d  %8d  %10d  %8s  %s' % \
+            (depth, expanded, children, duplicates, \
+             '%.3f' % duplicateRate if duplicateRate is not None else '-', \
+             '%.3f' % branching if branching is not None else '-'))
+
+      if cost is not None:
+         (meanError, largestError, numOver) = self.GetHeuristicError()
+         lines.append("")
+         lines.append("Heuristic along the solution path: mean error " + \
+                      ('%.2f' % meanError) + ", largest " + \
+                      str(largestError) + ", overestimates at " + \
+                      str(numOver) + " states")
+         lines.append("depth  h  true  expansion  detour")
+         for (g, h, trueDistance, expansion, detour) in self.GetPathRows():
+            lines.append('%5d  %2d  %4d  %9s  %6s' % \
+               (g, h, trueDistance, \
+                str(expansion) if expansion is not None else '-', \
+                str(detour) if detour is not None else '-'))
+      return '\n'.join(lines)
+
+   ## @var tracePath
+   # Name of the trace file
+
+   ## @var numExpanded
+   # Number of expansions
+
+   ## @var numDuplicates
+   # Number of duplicates generated
+
+   ## @var expandedAt
+   # Expansions per depth
+
+   ## @var childrenAt
+   # Children generated per depth of their parent
+
+   ## @var duplicatesAt
+   # Duplicates generated per depth of their parent
+
+   ## @var fCounts
+   # Expansions per g + h
+
+   ## @var firstExpansion
+   # Number of the first expansion of each state key
+
+   ## @var path
+   # (state key, g, h) of each state of the solution path, from the root
+
+if __name__ == "__main__":
+   from PuzzleReader import ReadPuzzle
+   from WrigglerReader import FindWrigglers
+   from State import MakeInitialState
+   from SearchNode import SearchNode
+   from SearchTrace import SearchTrace
+   from Agent import Agent
+   import os
+   import tempfile
+
+   (handle, fileName) = tempfile.mkstemp(suffix='.trace')
+   os.close(handle)
+   puzz = ReadPuzzle('puzz2.pz')
+   agent = Agent(SearchNode(MakeInitialState(puzz, FindWrigglers(puzz)), \
+                            None, None, 0))
+   agent.hooks = SearchTrace(fileName)
+   result = agent.AStarSearch()
+   agent.hooks.Close()
+   report = TraceReport(fileName)
+   os.remove(fileName)
+   print str(report)
+
+   if report.numExpanded != result.expanded or \
+         report.GetSolutionCost() != result.node.pathCost:
+      print "FAILED to match the search: " + str(result)
+   # h is admissible, and every state of the path but the goal is expanded
+   if report.GetHeuristicError()[2] != 0:
+      print "FAILED, the heuristic overestimates"
+   if [row[3] for row in report.GetPathRows()[:-1]].count(None) != 0:
+      print "FAILED to find the expansions of the path"
+   if sum([row[1] for row in report.GetDepthRows()]) != report.numExpanded:
+      print "FAILED to count the expansions per depth"
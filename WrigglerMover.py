@@ -2,116 +2,131 @@
 # @author Mathew Anderson
 # @brief Definition of routine that can move a wriggler on a puzzle
 
-from Wriggler import Wriggler, HEAD_CHARS, SEGMENT_CHARS
+from Wriggler import HEAD_CHARS, SEGMENT_CHARS
+from Wriggler import UP, RIGHT, DOWN, LEFT
 from Puzzle import Puzzle
 from Move import Move
 
-## Bridges Wriggler, Move, and Puzzle.
-# @param wriggler information about the wriggler being moved
-# @param move Details concerning the move
-# @param puzzle World state
-# @returns (New Wriggler, New World)
-# both of which reflecting the effect of the move
-def MoveWriggler(wriggler, move, puzzle):
-   newPuzzle = Puzzle()
-   newWriggler = None
-   try:
-      # First, update the wriggler itself to get the correct characters
-      # the update method returns a new wriggler
-      newWriggler = UpdateWriggler(wriggler, move)
-      # and now we can clear out the characters from the puzzle
-      # update the puzzle with the new wriggler information
-      newPuzzle.CopyFrom(puzzle)
-      newPuzzle.ClearWriggler(wriggler)
-      newPuzzle.PlaceWriggler(newWriggler)
-
-   except:
-      raise
-
-   return (newWriggler, newPuzzle)
-
-## Given a wriggler and a move, update the positions
-# and all character representations of the segments
-# @param wriggler The wriggler to move
-# @param Information about the move
-# @return A new Wriggler instance that incorporates the move
-# or None on error
-def UpdateWriggler(wriggler, move):
-
-   newWriggler = None
-   # Given valid input
-   try:
-      if move.tailNumber == wriggler.tail.idNumber:
-         newWriggler = Wriggler()
-
-         # copy all information
-         newWriggler.CopyFrom(wriggler)
-
-         nextDest = (move.destColumn, move.destRow)
-
-         #if the head is being moved
-         if move.pieceMoved == Move.HEAD:
-            newWriggler.MoveWrigglerByHead(nextDest)
-
-         elif move.pieceMoved == Move.TAIL:
-            newWriggler.MoveWrigglerByTail(nextDest)
-
-         else:
-            raise Exception ("Invalid pieceMoved set in a move!")
-
-   except:
-      raise
-
-   return newWriggler
+## Return the cells of a wriggler as a body: the tuple of the linear
+# indices of its cells, from head to tail
+# @param wriggler The wriggler
+# @param layout Static tables of the puzzle
+def GetBody(wriggler, layout):
+   body = [layout.GetIndex(wriggler.head.pos)]
+   body.extend([layout.GetIndex(segment.pos) \
+                  for segment in wriggler.segments])
+   body.append(layout.GetIndex(wriggler.tail.pos))
+   return tuple(body)
+
+## Apply a move to a body. The end being moved steps onto the
+# destination and every other cell follows the one before it.
+# @param body Linear indices of the wriggler's cells, head first
+# @param pieceMoved Move.HEAD or Move.TAIL
+# @param destIndex Linear index of the destination
+# @param layout Static tables of the puzzle
+# @return The new body
+def MoveBody(body, pieceMoved, destIndex, layout):
+   if pieceMoved == Move.HEAD:
+      movedEnd = body[0]
+   else:
+      movedEnd = body[-1]
+   # The destination must be a non-wall neighbour of the end being moved
+   if destIndex not in layout.neighbours[movedEnd]:
+      raise Exception("Move destination is not next to the moved piece!")
+
+   if pieceMoved == Move.HEAD:
+      return (destIndex,) + body[:-1]
+   return body[1:] + (destIndex,)
+
+## Apply several moves of one wriggler at once, as for a corridor macro
+# @param body Linear indices of the wriggler's cells, head first
+# @param moves The Moves to apply, in order
+# @param layout Static tables of the puzzle
+# @return The new body
+def MoveBodySteps(body, moves, layout):
+   for move in moves:
+      body = MoveBody(body, move.pieceMoved, \
+                      layout.GetIndex((move.destColumn, move.destRow)), layout)
+   return body
+
+## Return the linear indices of every tile that differs between
+# a wriggler's body before and after it moved
+# @param oldBody The cells of the wriggler before the move
+# @param newBody The cells of the wriggler after the move
+def GetChangedCells(oldBody, newBody):
+   # every cell may have changed from end to segment or back
+   changedCells = set(oldBody)
+   changedCells.update(newBody)
+   return changedCells
+
+## Put the character representation of a body into a puzzle. Each
+# character points at the next cell, as BodySegment works out.
+# @param puzzle The puzzle to update
+# @param layout Static tables of the puzzle
+# @param body Linear indices of the wriggler's cells, head first
+# @param tailNumber Tail number of the wriggler
+def PlaceBody(puzzle, layout, body, tailNumber):
+   numCols = layout.numCols
+   reps = HEAD_CHARS
+   for bodyIndex in xrange(len(body) - 1):
+      delta = body[bodyIndex + 1] - body[bodyIndex]
+      if delta == -numCols:
+         char = reps[UP]
+      elif delta == numCols:
+         char = reps[DOWN]
+      elif delta == -1:
+         char = reps[LEFT]
+      else:
+         char = reps[RIGHT]
+      puzzle.SetIndex(body[bodyIndex], char)
+      reps = SEGMENT_CHARS
+   puzzle.SetIndex(body[-1], tailNumber)
 
 # Simple testing below
 if __name__ == "__main__":
    # load puzzle one to construct the wriggler
    # it's much easier
    from PuzzleReader import ReadPuzzle
-   from WrigglerReader import FindWrigglers
+   from WrigglerReader import FindWrigglers, ExtractWrigglers
    puzz1 = ReadPuzzle('puzz1.pz')
    wrigglers = FindWrigglers(puzz1)
+   layout = puzz1.GetLayout()
 
    # head is at 0, 3
    # tail is at 0, 1
-   # try moving the wriggler by the head to the right
-   rightMove = Move(0, Move.HEAD, 1, 3)
-
-   # print initial state
-   print str(wrigglers[0])
-   # attempt the move
-   newWriggler = UpdateWriggler(wrigglers[0], rightMove)
-   # print post move
-   print str(newWriggler)
-
-   # move it again to the right
-   rightMove = Move(0, Move.HEAD, 2, 3)
-
-   newWriggler = UpdateWriggler(newWriggler, rightMove)
-   print str(newWriggler)
-
-   # Move on to testing the MoveWriggler method
-   # First test case, bad input
-   #updatedWorldState = MoveWriggler(None, None, None)
-   #if updatedWorldState != (None, None):
-   #   print "FAILED bad input test!"
-
-   # and a good test
+   body = GetBody(wrigglers[0], layout)
    puzz1.PrintPuzzle()
-   print ""
-   rightMove = Move(0, Move.HEAD, 1, 3)
-   nextState = MoveWriggler(wrigglers[0], rightMove, puzz1)
-   nextState[1].PrintPuzzle()
 
-   print ""
-   # move the tail up
+   # move the head right, then the tail up and right
+   rightMove = Move(0, Move.HEAD, 1, 3)
    tailUp = Move(0, Move.TAIL, 1, 0)
-   nextState = MoveWriggler(nextState[0], tailUp, nextState[1])
-   nextState[1].PrintPuzzle()
-
-   # Then move the tail right
-   print ""
    tailRight = Move(0, Move.TAIL, 2, 0)
-   nextState = MoveWriggler(nextState[0], tailRight, nextState[1])
-   nextState[1].PrintPuzzle()
+   for move in (rightMove, tailUp, tailRight):
+      body = MoveBody(body, move.pieceMoved, \
+                      layout.GetIndex((move.destColumn, move.destRow)), layout)
+      rendered = Puzzle()
+      rendered.CopyFrom(puzz1)
+      rendered.ClearWriggler(wrigglers[0])
+      PlaceBody(rendered, layout, body, 0)
+      print ""
+      rendered.PrintPuzzle()
+      # the characters placed read back as the same body
+      if ExtractWrigglers(rendered) != [(0, body)]:
+         print "FAILED to place the body: " + str(ExtractWrigglers(rendered))
+   if body != (8, 9, 10, 6, 5, 1, 2):
+      print "FAILED to move the body: " + str(body)
+
+   # the same moves applied at once
+   if MoveBodySteps(GetBody(wrigglers[0], layout), \
+                    [rightMove, tailUp, tailRight], layout) != body:
+      print "FAILED to apply the moves at once"
+   if GetChangedCells((12, 8), (8, 9)) != set([12, 8, 9]):
+      print "FAILED to find the changed cells"
+
+   # destinations not next to the end moved
+   for destIndex in (15, 14):
+      try:
+         MoveBody(GetBody(wrigglers[0], layout), Move.HEAD, destIndex, layout)
+         print "FAILED to reject a move to " + str(destIndex)
+      except Exception:
+         pass
@@ -5,156 +5,157 @@
 from Puzzle import Puzzle
 from Wriggler import BodySegment, Wriggler, HEAD_CHARS, SEGMENT_CHARS
 
+## Tiles that can never be part of a wriggler
+STATIC_CHARS = frozenset([Puzzle.EMPTY_SQUARE, Puzzle.WALL_SQUARE])
+
+## Raised when the wriggler characters of a puzzle do not form
+# well-formed head -> segments -> tail chains
+class WrigglerFormatError(Exception):
+   pass
+
 ## Given a puzzle or world state, extract all Wrigglers
 # returning them in a list
 # @param puzzle The puzzle instance from which wrigglers are desired
+# @note Wrigglers are returned in column-major order of their heads
 def FindWrigglers(puzzle):
    # initialize return value
    wrigglers = []
 
-   # initialize loop variables
-   # zero based due to indexing in Puzzle
-   currCol = 0
-
-   # If Puzzle is valid
    try:
-      # Foreach column
-      while currCol < puzzle.numCols:
-         # foreach row
-         currRow = 0
-         while currRow < puzzle.numRows:
-            # if this puzzle tile indicates a Wriggler head
-            if puzzle.GetTile(currCol, currRow) in HEAD_CHARS:
-               # try to extract it
-               nextWriggler = ExtractWriggler((currCol, currRow), puzzle)
-               # and append it to the list if successful
-               if nextWriggler is not None:
-                  wrigglers.append(nextWriggler)
-            # Look at next row
-            currRow += 1
-         # look at next column
-         currCol += 1
+      for (tailNumber, cells) in ExtractWrigglers(puzzle):
+         wrigglers.append(BuildWriggler(puzzle, tailNumber, cells))
    except AttributeError as e:
       # invalid Puzzle passed, return empty list
       print "Unable to find any Wrigglers in arg passed: " + e.message
       wrigglers = []
-   except Exception as e:
-      # General error handling, return empty list
-      print "Something wrong while extraction specific Wriggler: " + e.message
+   except WrigglerFormatError as e:
+      # malformed wriggler, return empty list
+      print "Something wrong while extracting Wrigglers: " + e.message
       wrigglers = []
    return wrigglers
 
-## Given a (col, row) tuple representation the location of a wriggler
-# head, follow and extract the segments and construct a wriggler
-# @param headLocation A tuple (col, row) into the puzzle where the head character
-# was found
-# @param puzzle The puzzle instance
-def ExtractWriggler(headLocation, puzzle):
-   # It all starts with the head, so extract that character
-   headChar = puzzle.GetTile(headLocation[0], headLocation[1])
-   # Create the new wriggler and store the head info
-   nextWriggler = Wriggler()
-   nextWriggler.head.dirOfNext = headChar
-   nextWriggler.head.pos = headLocation
-
-   # while we haven't found the tail
-   foundTail = False
-   currentChar = headChar
-   currentPos = headLocation
-
-   while not foundTail:
-      # Get the next position to examine
-      nextPos = GetDirectionOfNextSegment(currentChar, currentPos)
-
-      # Get the next character to examine
-      nextChar = puzzle.GetTile(nextPos[0], nextPos[1])
-
-      # if it's a body segment
-      if nextChar in SEGMENT_CHARS:
-         # Create a new body segment
-         nextBodySeg = BodySegment()
-         nextBodySeg.dirOfNext = nextChar
-         nextBodySeg.pos = nextPos
-         nextWriggler.segments.append(nextBodySeg)
-
-         # store the current pos and char
-         currentChar = nextChar
-         currentPos = nextPos
-         # and move on
-      else:
-         # if it's a number, it's the tail
-         try:
-            nextWriggler.tail.idNumber = int(nextChar)
-            nextWriggler.tail.pos = nextPos
-            foundTail = True
-         except:
-            # not the tail and not the body segment => problem
-            raise Exception("Encountered a non-body, non-tail char: " + nextChar)
-
-   return nextWriggler
-
-## Given a head or body segment and a current (col, row) position
-# produce the location of the next segment
-# @param segmentChar Character representation of current segment
-# @param currentPos (col, row) of segmentChar
-def GetDirectionOfNextSegment(segmentChar, currentPos):
-   # start by storing the old position in pieces
-   nextCol = currentPos[0]
-   nextRow = currentPos[1]
-   # then alter the variables according to what the current
-   # character is
-   if segmentChar == 'U' or segmentChar == '^':
-      # move up one row
-      nextRow -= 1
-   elif segmentChar == 'R' or segmentChar == '>':
-      # to the right one col
-      nextCol += 1
-   elif segmentChar == 'D' or segmentChar == 'v':
-      # down a row
-      nextRow += 1
-   elif segmentChar == 'L' or segmentChar == '<':
-      # left one col
-      nextCol -= 1
-   else:
-      raise Exception("Invalid character presented to GetDirectionOfNextSegment!!")
-
-   nextPos = (nextCol, nextRow)
-   return nextPos
+## Extract every wriggler of a puzzle in a single pass over its tiles.
+# @param puzzle The puzzle instance from which wrigglers are desired
+# @return A list of (tail number, cells) tuples in column-major order of
+# the heads, where cells is a tuple of linear indices running from the
+# head to the tail.
+# @throws WrigglerFormatError naming the offending (col, row) when a chain
+# runs off the puzzle, into a non-wriggler tile or back onto itself, when a
+# segment or tail belongs to no head, or when two tails share a number.
+def ExtractWrigglers(puzzle):
+   numCols = puzzle.numCols
+   tiles = puzzle.puzzle
+   numTiles = len(tiles)
+
+   # linear offset of the next segment for every head/segment character
+   offsets = {}
+   for (direction, offset) in enumerate([-numCols, 1, numCols, -1]):
+      offsets[HEAD_CHARS[direction]] = offset
+      offsets[SEGMENT_CHARS[direction]] = offset
+
+   # the only full pass: index every tile that is not empty or a wall
+   occupied = [index for (index, ch) in enumerate(tiles) \
+                  if ch not in STATIC_CHARS]
+
+   heads = []
+   for index in occupied:
+      if tiles[index] in HEAD_CHARS:
+         heads.append(index)
+   # preserve the column-major order of the original scan
+   heads.sort(key=lambda index: (index % numCols, index // numCols))
+
+   claimed = set()
+   tailOwners = {}
+   wrigglers = []
+   for head in heads:
+      cells = [head]
+      claimed.add(head)
+      current = head
+      while True:
+         offset = offsets[tiles[current]]
+         nextCell = current + offset
+         # stepping left/right must not wrap onto the adjacent row
+         if nextCell < 0 or nextCell >= numTiles or \
+               (offset == 1 and nextCell % numCols == 0) or \
+               (offset == -1 and current % numCols == 0):
+            raise WrigglerFormatError("Wriggler with head at " \
+               + str(_Position(head, numCols)) + " runs off the puzzle at " \
+               + str(_Position(current, numCols)))
+         if nextCell in claimed:
+            raise WrigglerFormatError("Wriggler with head at " \
+               + str(_Position(head, numCols)) + " loops back onto " \
+               + str(_Position(nextCell, numCols)))
+
+         nextChar = tiles[nextCell]
+         cells.append(nextCell)
+         claimed.add(nextCell)
+         if nextChar in SEGMENT_CHARS:
+            current = nextCell
+         elif nextChar.isdigit():
+            tailNumber = int(nextChar)
+            if tailNumber in tailOwners:
+               raise WrigglerFormatError("Tail number " + nextChar \
+                  + " at " + str(_Position(nextCell, numCols)) \
+                  + " duplicates the tail at " \
+                  + str(_Position(tailOwners[tailNumber], numCols)))
+            tailOwners[tailNumber] = nextCell
+            break
+         else:
+            raise WrigglerFormatError("Wriggler with head at " \
+               + str(_Position(head, numCols)) \
+               + " reaches a non-body, non-tail char '" + nextChar \
+               + "' at " + str(_Position(nextCell, numCols)))
+
+      wrigglers.append((tailNumber, tuple(cells)))
+
+   # anything left over is a segment or tail no head leads to
+   if len(claimed) != len(occupied):
+      for index in occupied:
+         if index not in claimed:
+            raise WrigglerFormatError("Dangling wriggler character '" \
+               + tiles[index] + "' at " + str(_Position(index, numCols)))
+
+   return wrigglers
 
+## Construct a Wriggler instance from the compact form
+# produced by ExtractWrigglers
+# @param puzzle The puzzle the wriggler was extracted from
+# @param tailNumber The number on the wriggler's tail
+# @param cells Linear indices of the wriggler, head first
+def BuildWriggler(puzzle, tailNumber, cells):
+   numCols = puzzle.numCols
+   newWriggler = Wriggler()
+   newWriggler.head.dirOfNext = puzzle.puzzle[cells[0]]
+   newWriggler.head.pos = _Position(cells[0], numCols)
+
+   for cell in cells[1:-1]:
+      nextBodySeg = BodySegment()
+      nextBodySeg.dirOfNext = puzzle.puzzle[cell]
+      nextBodySeg.pos = _Position(cell, numCols)
+      newWriggler.segments.append(nextBodySeg)
+
+   newWriggler.tail.idNumber = tailNumber
+   newWriggler.tail.pos = _Position(cells[-1], numCols)
+   return newWriggler
+
+## Convert a linear index into a (col, row) position
+def _Position(index, numCols):
+   return (index % numCols, index // numCols)
 
 # Simple testing below
 if __name__ == "__main__":
 
-   # first test GetDirectionOfNextSegment
-   nextDir = GetDirectionOfNextSegment('U', (1, 1))
-   if nextDir != (1, 0):
-      print "FAILED to move up a row!"
-   else:
-      print "(1, 1) + U = " + str(nextDir)
-
-   nextDir = GetDirectionOfNextSegment('>', (1, 1))
-   if nextDir != (2, 1):
-      print "FAILED to move right a column!"
-   else:
-      print "(1, 1) + > = " + str(nextDir)
-
-   nextDir = GetDirectionOfNextSegment('v', (1, 1))
-   if nextDir != (1, 2):
-      print "FAILED to move down a row!"
-   else:
-      print "(1, 1) + v = " + str(nextDir)
-
-   nextDir = GetDirectionOfNextSegment('L', (1, 1))
-   if nextDir != (0, 1):
-      print "FAILED to move left a column!"
-   else:
-      print "(1, 1) + L = " + str(nextDir)
-
-   # Next try extract a wriggler from a known location
+   # extract the wriggler of a puzzle with one
    import PuzzleReader
    tstPuzz = PuzzleReader.ReadPuzzle('puzz1.pz')
 
-   theWriggler = ExtractWriggler((0, 3), tstPuzz)
+   if ExtractWrigglers(tstPuzz) != [(0, (12, 8, 9, 10, 6, 5, 4))]:
+      print "FAILED to extract the wriggler of puzz1: " + \
+         str(ExtractWrigglers(tstPuzz))
+   theWriggler = FindWrigglers(tstPuzz)[0]
+   if theWriggler.head.pos != (0, 3) or theWriggler.tail.pos != (0, 1) or \
+         len(theWriggler.segments) != 5:
+      print "FAILED to build the wriggler of puzz1"
 
    print theWriggler
 
@@ -165,3 +166,28 @@ if __name__ == "__main__":
 
    for wrig in wrigglers:
       print wrig
+
+   # Malformed chains are reported rather than silently dropped
+   badPuzz = Puzzle()
+   badPuzz.numCols = 3
+   badPuzz.numRows = 2
+   badPuzz.puzzle = ['R', '>', 'v', 'e', '^', '<']
+   try:
+      ExtractWrigglers(badPuzz)
+      print "FAILED to detect a loop!"
+   except WrigglerFormatError as e:
+      print "Detected: " + e.message
+
+   badPuzz.puzzle = ['R', '0', 'e', '>', '1', 'e']
+   try:
+      ExtractWrigglers(badPuzz)
+      print "FAILED to detect a dangling segment!"
+   except WrigglerFormatError as e:
+      print "Detected: " + e.message
+
+   badPuzz.puzzle = ['R', '0', 'e', 'R', '0', 'e']
+   try:
+      ExtractWrigglers(badPuzz)
+      print "FAILED to detect a duplicate tail!"
+   except WrigglerFormatError as e:
+      print "Detected: " + e.message